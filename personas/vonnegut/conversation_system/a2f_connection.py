@@ -0,0 +1,245 @@
+"""
+Managed websocket connection to Audio2Face.
+Keeps one connection open for the life of the server: reconnects with
+exponential backoff (plus jitter) after every failed attempt or drop, and
+only resets the backoff once a connection has stayed up for a while, so
+a peer that accepts and then closes at once (e.g. rejecting the API key)
+is not hammered. Replays the configure
+message on every (re)connect, measures round-trip latency with a
+heartbeat ping, and buffers a bounded amount of outbound data while the
+connection is down. The oldest buffered data is dropped first, since
+stale audio is useless for lip sync.
+
+Works against the real Audio2Face stream endpoint or a2f_mock_server.py.
+"""
+
+import asyncio
+import logging
+import random
+from collections import deque
+from typing import Callable, Dict, Optional, Union
+
+import websockets
+from websockets.exceptions import ConnectionClosed
+
+from metrics import LatencyStats
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ConnectionState:
+    """Lifecycle states of the Audio2Face connection."""
+    DISCONNECTED = 'disconnected'
+    CONNECTING = 'connecting'
+    CONNECTED = 'connected'
+    CLOSED = 'closed'
+
+class A2FConnection:
+    """Self-healing websocket session with heartbeat and bounded send buffer."""
+    
+    def __init__(self, url: str, config_message: Callable[[], str],
+                 max_buffer_bytes: int = 256 * 1024, heartbeat_interval: float = 5.0,
+                 heartbeat_timeout: float = 5.0, min_backoff: float = 0.5, max_backoff: float = 30.0,
+                 stable_after: float = 10.0):
+        """
+        Initialize connection (call start() to connect).
+        
+        Args:
+            url: Audio2Face websocket endpoint
+            config_message: Returns the configure message sent on every (re)connect
+            max_buffer_bytes: Outbound data kept while disconnected; oldest is dropped beyond it
+            heartbeat_interval: Seconds between pings
+            heartbeat_timeout: Seconds to wait for a pong before reconnecting
+            min_backoff: First reconnect delay in seconds
+            max_backoff: Longest reconnect delay in seconds
+            stable_after: Seconds a connection must stay up before the backoff is reset
+        """
+        self.url = url
+        self.config_message = config_message
+        self.max_buffer_bytes = max_buffer_bytes
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        
+        self.state = ConnectionState.DISCONNECTED
+        self.websocket = None
+        self.connected_event = asyncio.Event()
+        self.run_task: Optional[asyncio.Task] = None
+        
+        self.buffer: deque = deque()
+        self.buffered_bytes = 0
+        
+        self.rtt = LatencyStats()
+        self.connects = 0
+        self.failed_attempts = 0
+        self.disconnects = 0
+        self.sent = 0
+        self.dropped = 0
+        self.last_error = None
+    
+    def start(self):
+        """Start connecting in the background."""
+        if self.run_task is None or self.run_task.done():
+            self.run_task = asyncio.create_task(self.run())
+    
+    async def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the connection is up; False on timeout."""
+        try:
+            await asyncio.wait_for(self.connected_event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+    
+    @property
+    def connected(self) -> bool:
+        """Whether messages are currently being delivered."""
+        return self.state == ConnectionState.CONNECTED
+    
+    async def run(self):
+        """Connection loop: connect, serve until the connection drops, back off, repeat."""
+        loop = asyncio.get_running_loop()
+        backoff = self.min_backoff
+        
+        while self.state != ConnectionState.CLOSED:
+            self.state = ConnectionState.CONNECTING
+            try:
+                websocket = await websockets.connect(self.url, ping_interval=None, max_size=None)
+            except Exception as e:
+                self.failed_attempts += 1
+                self.last_error = str(e)
+                self.state = ConnectionState.DISCONNECTED
+                delay = backoff * random.uniform(0.8, 1.2)
+                logger.warning(f"Audio2Face connection failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            
+            connected_at = loop.time()
+            try:
+                await websocket.send(self.config_message())
+                self.websocket = websocket
+                self.state = ConnectionState.CONNECTED
+                self.connected_event.set()
+                self.connects += 1
+                logger.info(f"Connected to Audio2Face at {self.url}")
+                
+                await self.flush_buffer()
+                await self.serve(websocket)
+                self.last_error = f"closed by peer (code {getattr(websocket, 'close_code', None)})"
+            except ConnectionClosed as e:
+                self.last_error = str(e)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Audio2Face connection error: {e}")
+            finally:
+                self.websocket = None
+                self.connected_event.clear()
+                await websocket.close()
+            
+            if self.state != ConnectionState.CLOSED:
+                self.state = ConnectionState.DISCONNECTED
+                self.disconnects += 1
+                
+                # A connection that is dropped straight away counts as a failed attempt
+                if loop.time() - connected_at >= self.stable_after:
+                    backoff = self.min_backoff
+                delay = backoff * random.uniform(0.8, 1.2)
+                logger.warning(f"Audio2Face connection lost ({self.last_error}), reconnecting in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                backoff = min(backoff * 2, self.max_backoff)
+    
+    async def serve(self, websocket):
+        """Read incoming messages and ping until the connection drops."""
+        heartbeat = asyncio.create_task(self.heartbeat(websocket))
+        try:
+            async for message in websocket:
+                logger.debug(f"Audio2Face: {message if isinstance(message, str) else f'{len(message)} bytes'}")
+        finally:
+            heartbeat.cancel()
+    
+    async def heartbeat(self, websocket):
+        """Ping periodically; a missing pong closes the connection so it is re-established."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                pong = await websocket.ping()
+                sent_at = loop.time()
+                await asyncio.wait_for(pong, self.heartbeat_timeout)
+                self.rtt.record(loop.time() - sent_at)
+            except asyncio.TimeoutError:
+                self.rtt.record_error()
+                self.last_error = "heartbeat timeout"
+                await websocket.close()
+                return
+            except ConnectionClosed:
+                return
+    
+    async def send(self, message: Union[str, bytes]) -> bool:
+        """
+        Send a message, or buffer it while the connection is down.
+        
+        Returns:
+            True if sent now, False if buffered
+        """
+        websocket = self.websocket
+        if websocket is not None and not self.buffer:
+            try:
+                await websocket.send(message)
+                self.sent += 1
+                return True
+            except ConnectionClosed:
+                pass  # The connection loop notices and reconnects
+        
+        self.enqueue(message)
+        return False
+    
+    def enqueue(self, message: Union[str, bytes]):
+        """Buffer a message, dropping the oldest beyond the byte budget."""
+        size = len(message)
+        self.buffer.append(message)
+        self.buffered_bytes += size
+        
+        while self.buffered_bytes > self.max_buffer_bytes and self.buffer:
+            self.buffered_bytes -= len(self.buffer.popleft())
+            self.dropped += 1
+    
+    async def flush_buffer(self):
+        """Send what was buffered while disconnected, in order."""
+        while self.buffer:
+            message = self.buffer[0]
+            await self.websocket.send(message)
+            self.buffer.popleft()
+            self.buffered_bytes -= len(message)
+            self.sent += 1
+    
+    async def close(self):
+        """Close the connection and stop reconnecting."""
+        self.state = ConnectionState.CLOSED
+        if self.websocket is not None:
+            await self.websocket.close()
+        if self.run_task is not None:
+            self.run_task.cancel()
+            try:
+                await self.run_task
+            except asyncio.CancelledError:
+                pass
+    
+    def get_stats(self) -> Dict:
+        """Get connection state and statistics."""
+        return {
+            'state': self.state,
+            'url': self.url,
+            'connects': self.connects,
+            'failed_attempts': self.failed_attempts,
+            'disconnects': self.disconnects,
+            'sent': self.sent,
+            'buffered': len(self.buffer),
+            'buffered_bytes': self.buffered_bytes,
+            'dropped': self.dropped,
+            'rtt': self.rtt.get_stats(),
+            'last_error': self.last_error
+        }
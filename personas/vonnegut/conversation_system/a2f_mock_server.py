@@ -0,0 +1,142 @@
+"""
+Local stand-in for the Audio2Face stream endpoint.
+Accepts the configure / start_stream / binary audio frame / end_stream
+protocol spoken by Audio2FaceIntegration, checks frame sequence numbers
+and logs how much audio arrived and how evenly it was paced. It can drop
+connections periodically to exercise reconnection.
+
+Usage: python a2f_mock_server.py [--port 8011] [--drop-every SECONDS]
+"""
+
+import asyncio
+import json
+import logging
+import sys
+from typing import Dict, Optional
+
+import websockets
+
+from paced_streamer import FRAME_HEADER
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class MockA2FServer:
+    """Records what a client streams; optionally drops connections."""
+    
+    def __init__(self, port: int = 8011, drop_every: Optional[float] = None):
+        """
+        Initialize mock server.
+        
+        Args:
+            port: Port to listen on (ws://localhost:<port>/A2F/Stream)
+            drop_every: Close each connection after this many seconds (None to keep it)
+        """
+        self.port = port
+        self.drop_every = drop_every
+        
+        self.connections = 0
+        self.configs = 0
+        self.streams = 0
+        self.frames = 0
+        self.samples = 0
+        self.sequence_errors = 0
+    
+    async def handler(self, websocket, path: str = None):
+        """Serve one client connection."""
+        self.connections += 1
+        sample_rate = None
+        expected_sequence = 0
+        first_arrival = None
+        
+        dropper = None
+        if self.drop_every:
+            dropper = asyncio.create_task(self.drop_later(websocket))
+        
+        loop = asyncio.get_running_loop()
+        try:
+            async for message in websocket:
+                if isinstance(message, bytes):
+                    sequence, timestamp = FRAME_HEADER.unpack_from(message)
+                    if sequence != expected_sequence:
+                        self.sequence_errors += 1
+                    expected_sequence = sequence + 1
+                    self.frames += 1
+                    self.samples += (len(message) - FRAME_HEADER.size) // 2
+                    
+                    # Frames should arrive in step with their stream timestamps
+                    if first_arrival is None:
+                        first_arrival = loop.time() - timestamp
+                    skew = loop.time() - first_arrival - timestamp
+                    if abs(skew) > 0.1:
+                        logger.debug(f"Frame {sequence} arrived {skew * 1000:.0f} ms off its timestamp")
+                    continue
+                
+                data: Dict = json.loads(message)
+                if data.get('type') == 'configure':
+                    self.configs += 1
+                    sample_rate = data.get('sample_rate')
+                elif data.get('type') == 'start_stream':
+                    self.streams += 1
+                    sample_rate = data.get('sample_rate', sample_rate)
+                    expected_sequence = 0
+                    first_arrival = None
+                elif data.get('type') == 'end_stream':
+                    seconds = self.samples / sample_rate if sample_rate else 0.0
+                    logger.info(f"Stream ended: {data.get('frames')} frames, {seconds:.2f}s of audio received in total")
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            if dropper is not None:
+                dropper.cancel()
+    
+    async def drop_later(self, websocket):
+        """Close a connection after drop_every seconds."""
+        await asyncio.sleep(self.drop_every)
+        logger.info("Dropping connection")
+        await websocket.close()
+    
+    async def serve(self):
+        """Run until cancelled."""
+        async with websockets.serve(self.handler, "localhost", self.port):
+            logger.info(f"Mock Audio2Face listening on ws://localhost:{self.port}/A2F/Stream")
+            await asyncio.Future()
+    
+    def get_stats(self) -> Dict:
+        """Get what the server has received."""
+        return {
+            'connections': self.connections,
+            'configs': self.configs,
+            'streams': self.streams,
+            'frames': self.frames,
+            'samples': self.samples,
+            'sequence_errors': self.sequence_errors
+        }
+
+def main():
+    """Run the mock server."""
+    args = sys.argv[1:]
+    options = {'port': '8011', 'drop-every': None}
+    
+    for name in list(options):
+        flag = f"--{name}"
+        if flag in args:
+            index = args.index(flag)
+            options[name] = args[index + 1]
+            del args[index:index + 2]
+    
+    if args:
+        print(__doc__)
+        return
+    
+    drop_every = float(options['drop-every']) if options['drop-every'] else None
+    server = MockA2FServer(int(options['port']), drop_every)
+    
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        logger.info(f"Mock Audio2Face stopped: {server.get_stats()}")
+
+if __name__ == "__main__":
+    main()
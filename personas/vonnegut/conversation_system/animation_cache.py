@@ -0,0 +1,172 @@
+"""
+Cache of Audio2Face facial animations.
+Animations are keyed by a hash of the audio samples, the emotion and the
+face model, so the same rendered answer always finds its animation and a
+different rendering of the same text never does. Memory is bounded by a
+byte budget with LRU eviction; an optional directory keeps animations
+across restarts, so pre-rendered FAQ answers are animated only once.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from blendshape_timeline import decode_json, encode_json
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def animation_key(audio_data: np.ndarray, emotion: str, face_model: str) -> str:
+    """Stable cache key of an animation request."""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(audio_data, dtype='<f4').tobytes())
+    digest.update(f"\0{emotion}\0{face_model}".encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+class AnimationCache:
+    """LRU animation cache bounded by memory, with an optional on-disk tier."""
+    
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, cache_dir: Optional[str] = None,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        """
+        Initialize animation cache.
+        
+        Args:
+            max_bytes: Memory budget (serialized size); least recently used animations are evicted beyond it
+            cache_dir: Directory for the persistent tier (None for memory only)
+            max_disk_bytes: Disk budget; least recently used files are removed beyond it
+        """
+        self.max_bytes = max_bytes
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        
+        self.animations: "OrderedDict[str, Tuple[Dict, int]]" = OrderedDict()  # key -> (animation, bytes)
+        self.total_bytes = 0
+        self.disk_bytes = 0
+        
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self.disk_bytes = sum(path.stat().st_size for path in self.cache_dir.glob('*.json'))
+    
+    def disk_path(self, key: str) -> Path:
+        """File of a key in the disk tier."""
+        return self.cache_dir / f"{key}.json"
+    
+    async def get(self, key: str) -> Optional[Dict]:
+        """Cached animation for a key, from memory or disk."""
+        cached = self.animations.get(key)
+        if cached is not None:
+            self.animations.move_to_end(key)
+            self.memory_hits += 1
+            return cached[0]
+        
+        if self.cache_dir is not None:
+            try:
+                payload = await asyncio.to_thread(self.read_file, key)
+            except Exception as e:
+                logger.error(f"Error reading cached animation {key}: {e}")
+                payload = None
+            
+            if payload is not None:
+                self.disk_hits += 1
+                animation = json.loads(payload, object_hook=decode_json)
+                self.remember(key, animation, len(payload))
+                return animation
+        
+        self.misses += 1
+        return None
+    
+    async def put(self, key: str, animation: Dict):
+        """Cache an animation in memory and, if enabled, on disk."""
+        payload = json.dumps(animation, ensure_ascii=False, default=encode_json)
+        self.remember(key, animation, len(payload))
+        
+        if self.cache_dir is not None:
+            try:
+                await asyncio.to_thread(self.write_file, key, payload)
+            except Exception as e:
+                logger.error(f"Error writing cached animation {key}: {e}")
+    
+    def remember(self, key: str, animation: Dict, size: int):
+        """Insert into the memory tier and evict least recently used animations beyond the budget."""
+        if size > self.max_bytes:
+            return
+        
+        if key in self.animations:
+            self.total_bytes -= self.animations.pop(key)[1]
+        
+        self.animations[key] = (animation, size)
+        self.total_bytes += size
+        
+        while self.total_bytes > self.max_bytes:
+            _, (_, old_size) = self.animations.popitem(last=False)
+            self.total_bytes -= old_size
+            self.evictions += 1
+    
+    def read_file(self, key: str) -> Optional[str]:
+        """Read an animation from the disk tier (blocking)."""
+        path = self.disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                payload = f.read()
+        except FileNotFoundError:
+            return None
+        
+        os.utime(path)  # Recently used files are pruned last
+        return payload
+    
+    def write_file(self, key: str, payload: str):
+        """Write an animation to the disk tier atomically (blocking)."""
+        path = self.disk_path(key)
+        tmp_path = path.with_name(path.name + '.tmp')
+        
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        
+        if path.exists():
+            self.disk_bytes -= path.stat().st_size
+        os.replace(tmp_path, path)
+        self.disk_bytes += len(payload.encode('utf-8'))
+        
+        if self.disk_bytes > self.max_disk_bytes:
+            self.prune_disk()
+    
+    def prune_disk(self):
+        """Remove least recently used files until the disk tier is within budget (blocking)."""
+        files = sorted(self.cache_dir.glob('*.json'), key=lambda path: path.stat().st_mtime)
+        self.disk_bytes = sum(path.stat().st_size for path in files)
+        
+        for path in files:
+            if self.disk_bytes <= self.max_disk_bytes * 0.9:
+                break
+            self.disk_bytes -= path.stat().st_size
+            path.unlink()
+    
+    def get_stats(self) -> Dict:
+        """Get cache statistics."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        
+        return {
+            'animations': len(self.animations),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'disk_bytes': self.disk_bytes if self.cache_dir is not None else None,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else None,
+            'evictions': self.evictions
+        }
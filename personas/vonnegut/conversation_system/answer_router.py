@@ -0,0 +1,254 @@
+"""
+Tiered answer routing for visitor turns.
+Every turn, spoken or typed, is answered by the cheapest tier that can:
+
+1. faq      - FAQ match, usually with pre-rendered audio
+2. cache    - a model answer given earlier to the same (normalized) opening question
+3. llm      - the chatbot model
+4. fallback - an offline line, when the model overran its budget
+
+Each tier has a latency budget. A lookup tier that overruns its budget is
+counted, and the next tier is used. A model call that overruns is abandoned
+for an offline fallback line. Hit rates and latencies are reported per tier.
+
+Model answers depend on the visitor's conversation so far, so only answers
+to a visitor's first turn are cached, and the cache is only consulted on a
+first turn.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from faq_index import tokenize
+from metrics import LatencyStats
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TIERS = ('faq', 'cache', 'llm', 'fallback')
+
+class ResponseCache:
+    """LRU cache of context-free model answers keyed by normalized question text."""
+    
+    def __init__(self, max_entries: int = 2000, ttl: float = 24 * 3600.0, min_words: int = 3):
+        """
+        Initialize response cache.
+        
+        Args:
+            max_entries: Answers kept; least recently used ones are dropped beyond it
+            ttl: Seconds an answer may be reused
+            min_words: Shorter questions ("why?", "what do you mean") depend on the
+                conversation and are never cached
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.min_words = min_words
+        self.entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+    
+    def key(self, text: str) -> Optional[str]:
+        """Normalized question, or None if it is too short to cache."""
+        words = tokenize(text)
+        if len(words) < self.min_words:
+            return None
+        return ' '.join(words)
+    
+    def get(self, text: str) -> Optional[str]:
+        """Cached answer for a question, if any."""
+        key = self.key(text)
+        if key is None or key not in self.entries:
+            return None
+        
+        response, stored_at = self.entries[key]
+        if time.monotonic() - stored_at > self.ttl:
+            del self.entries[key]
+            return None
+        
+        self.entries.move_to_end(key)
+        return response
+    
+    def put(self, text: str, response: str):
+        """Remember the answer to a question."""
+        key = self.key(text)
+        if key is None:
+            return
+        
+        self.entries[key] = (response, time.monotonic())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+
+class TierStats:
+    """Hit rate and latency of one tier."""
+    
+    def __init__(self):
+        self.latency = LatencyStats()
+        self.hits = 0
+        self.misses = 0
+        self.over_budget = 0
+    
+    def get_stats(self) -> Dict:
+        """Get tier statistics."""
+        attempts = self.hits + self.misses
+        stats = {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / attempts, 3) if attempts else None,
+            'over_budget': self.over_budget
+        }
+        stats.update(self.latency.get_stats())
+        return stats
+
+class AnswerRouter:
+    """Answers a visitor turn from the FAQ, the response cache or the model, in that order."""
+    
+    def __init__(self, faq_router, generate: Callable[[str, str], Awaitable[str]],
+                 fallback: Callable[[str], str], cacheable: Callable[[str], bool] = lambda response: True,
+                 has_history: Callable[[str], bool] = lambda client_id: False,
+                 response_cache: Optional[ResponseCache] = None,
+                 faq_budget: float = 0.05, cache_budget: float = 0.01, llm_budget: float = 12.0):
+        """
+        Initialize answer router.
+        
+        Args:
+            faq_router: FAQRouter (or None to skip the FAQ tier)
+            generate: Model call, generate(text, client_id) -> response text
+            fallback: Offline answer used when the model overruns its budget
+            cacheable: Whether a model answer may be reused (not error or offline lines)
+            has_history: Whether a client has earlier exchanges, has_history(client_id);
+                the cache is skipped for them, since the model's answer depends on them
+            response_cache: Cache of model answers (a new one by default)
+            faq_budget: Seconds the FAQ lookup may take
+            cache_budget: Seconds the cache lookup may take
+            llm_budget: Seconds the model may take before the fallback is used
+        """
+        self.faq_router = faq_router
+        self.generate = generate
+        self.fallback = fallback
+        self.cacheable = cacheable
+        self.has_history = has_history
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        self.budgets = {'faq': faq_budget, 'cache': cache_budget, 'llm': llm_budget}
+        
+        self.tier_stats = {tier: TierStats() for tier in TIERS}
+        self.total_latency = LatencyStats()
+        self.cache_skipped = 0  # Turns with conversation history
+    
+    async def answer(self, text: str, client_id: str) -> Dict:
+        """
+        Answer one visitor turn.
+        
+        Returns:
+            Dict with 'text', 'tier', 'audio_file' (pre-rendered audio or None)
+            and 'confidence' (FAQ match score or None)
+        """
+        with self.total_latency.timer():
+            # Decided before the model call, which records the exchange
+            first_turn = not self.has_history(client_id)
+            
+            answer = await self.check_faq(text)
+            if answer is None:
+                if first_turn:
+                    answer = self.check_cache(text)
+                else:
+                    self.cache_skipped += 1
+            if answer is None:
+                answer = await self.ask_model(text, client_id, first_turn)
+        
+        logger.info(f"Answered from {answer['tier']} tier")
+        return answer
+    
+    async def check_faq(self, text: str) -> Optional[Dict]:
+        """Tier 1: FAQ match."""
+        if self.faq_router is None:
+            return None
+        
+        stats = self.tier_stats['faq']
+        start = time.perf_counter()
+        try:
+            match = await asyncio.wait_for(self.faq_router.check_faq(text), self.budgets['faq'])
+        except asyncio.TimeoutError:
+            stats.over_budget += 1
+            stats.misses += 1
+            logger.warning(f"FAQ lookup exceeded its {self.budgets['faq'] * 1000:.0f} ms budget")
+            return None
+        except Exception as e:
+            stats.latency.record_error()
+            logger.error(f"Error checking FAQ: {e}")
+            return None
+        
+        self.record('faq', start, match is not None)
+        if match is None:
+            return None
+        
+        return {
+            'text': match['text'],
+            'tier': 'faq',
+            'audio_file': match.get('audio_file'),
+            'confidence': match.get('confidence', 0.0)
+        }
+    
+    def check_cache(self, text: str) -> Optional[Dict]:
+        """Tier 2: earlier model answer to the same question."""
+        start = time.perf_counter()
+        response = self.response_cache.get(text)
+        self.record('cache', start, response is not None)
+        
+        if response is None:
+            return None
+        return {'text': response, 'tier': 'cache', 'audio_file': None, 'confidence': None}
+    
+    async def ask_model(self, text: str, client_id: str, cache: bool = True) -> Dict:
+        """Tier 3: the chatbot model, with an offline answer (tier 4) if it is too slow."""
+        stats = self.tier_stats['llm']
+        start = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(self.generate(text, client_id), self.budgets['llm'])
+        except asyncio.TimeoutError:
+            stats.over_budget += 1
+            stats.misses += 1
+            stats.latency.record_error()
+            logger.warning(f"Chatbot exceeded its {self.budgets['llm']:g} s budget, using fallback answer")
+            
+            response = self.fallback(text)
+            self.record('fallback', start, True)
+            return {'text': response, 'tier': 'fallback', 'audio_file': None, 'confidence': None}
+        
+        self.record('llm', start, True)
+        if cache and self.cacheable(response):
+            self.response_cache.put(text, response)
+        
+        return {'text': response, 'tier': 'llm', 'audio_file': None, 'confidence': None}
+    
+    def record(self, tier: str, start: float, hit: bool):
+        """Record a tier lookup, noting overruns of its budget."""
+        stats = self.tier_stats[tier]
+        elapsed = time.perf_counter() - start
+        stats.latency.record(elapsed)
+        if hit:
+            stats.hits += 1
+        else:
+            stats.misses += 1
+        if tier in self.budgets and elapsed > self.budgets[tier]:
+            stats.over_budget += 1
+    
+    def get_stats(self) -> Dict:
+        """Get per-tier hit rates and latencies."""
+        answered = {tier: self.tier_stats[tier].hits for tier in TIERS}
+        turns = self.total_latency.count
+        
+        return {
+            'turns': turns,
+            'without_model': round((answered['faq'] + answered['cache']) / turns, 3) if turns else None,
+            'latency': self.total_latency.get_stats(),
+            'cached_responses': len(self.response_cache),
+            'cache_skipped': self.cache_skipped,
+            'budgets_ms': {tier: round(budget * 1000.0) for tier, budget in self.budgets.items()},
+            'tiers': {tier: self.tier_stats[tier].get_stats() for tier in TIERS}
+        }
@@ -14,6 +14,9 @@ from pathlib import Path
 import soundfile as sf
 from io import BytesIO
 
+from animation_cache import AnimationCache, animation_key
+from blendshape_timeline import BlendshapeTimeline, encode_json
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -53,7 +56,7 @@ class Audio2FaceAPI:
             audio_data: Audio as numpy array
             emotion: Emotion preset (neutral, happy, sad, angry)
             face_model: Face model to use (mark, claire, etc.)
-            
+        
         Returns:
             Animation data with blendshapes and timing
         """
@@ -99,7 +102,7 @@ class Audio2FaceAPI:
                         error = await response.text()
                         logger.error(f"API error {response.status}: {error}")
                         return None
-                        
+        
         except Exception as e:
             logger.error(f"Error generating facial animation: {e}")
             return None
@@ -121,55 +124,32 @@ class Audio2FaceAPI:
         return buffer.read()
     
     def parse_animation_data(self, api_response: Dict) -> Dict:
-        """Parse API response into usable animation data."""
+        """Parse API response into usable animation data (a columnar blendshape timeline)."""
         try:
-            animation_data = {
+            fps = api_response.get("fps", 30)
+            frames = api_response["animation"]["frames"] if "animation" in api_response else []
+            
+            return {
                 "duration": api_response.get("duration", 0),
-                "fps": api_response.get("fps", 30),
-                "blendshapes": [],
+                "fps": fps,
+                "timeline": BlendshapeTimeline.from_frames(frames, fps),
                 "metadata": api_response.get("metadata", {})
             }
-            
-            # Extract blendshape animation curves
-            if "animation" in api_response:
-                for frame in api_response["animation"]["frames"]:
-                    frame_data = {
-                        "time": frame["timestamp"],
-                        "blendshapes": frame["blendshapes"],
-                        "head_rotation": frame.get("head_rotation", [0, 0, 0]),
-                        "eye_gaze": frame.get("eye_gaze", [0, 0])
-                    }
-                    animation_data["blendshapes"].append(frame_data)
-            
-            # Extract key blendshape channels
-            animation_data["channels"] = {
-                "jawOpen": [],
-                "mouthSmile": [],
-                "browInnerUp": [],
-                "eyeBlink": []
-            }
-            
-            for frame in animation_data["blendshapes"]:
-                bs = frame["blendshapes"]
-                animation_data["channels"]["jawOpen"].append(bs.get("jawOpen", 0))
-                animation_data["channels"]["mouthSmile"].append(bs.get("mouthSmileLeft", 0))
-                animation_data["channels"]["browInnerUp"].append(bs.get("browInnerUp", 0))
-                animation_data["channels"]["eyeBlink"].append(bs.get("eyeBlinkLeft", 0))
-            
-            return animation_data
-            
+        
         except Exception as e:
             logger.error(f"Error parsing animation data: {e}")
             return None
     
-    async def generate_from_text_and_audio(self, text: str, audio_data: np.ndarray) -> Optional[Dict]:
+    async def generate_from_text_and_audio(self, text: str, audio_data: np.ndarray,
+                                           face_model: str = "mark") -> Optional[Dict]:
         """
         Generate animation with text context for better lip sync.
         
         Args:
             text: The spoken text
             audio_data: The audio data
-            
+            face_model: Face model to use
+        
         Returns:
             Animation data
         """
@@ -177,14 +157,14 @@ class Audio2FaceAPI:
         emotion = self.analyze_emotion(text)
         
         # Generate animation
-        animation = await self.generate_facial_animation(audio_data, emotion)
+        animation = await self.generate_facial_animation(audio_data, emotion, face_model)
         
         if animation:
             # Add text-based enhancements
             animation["text"] = text
             animation["words"] = text.split()
             animation["emotion"] = emotion
-            
+        
         return animation
     
     def analyze_emotion(self, text: str) -> str:
@@ -203,7 +183,7 @@ class Audio2FaceAPI:
     def export_to_json(self, animation_data: Dict, output_path: str):
         """Export animation data to JSON for use in other applications."""
         with open(output_path, 'w') as f:
-            json.dump(animation_data, f, indent=2)
+            json.dump(animation_data, f, indent=2, default=encode_json)
         logger.info(f"Exported animation to {output_path}")
     
     def export_to_csv(self, animation_data: Dict, output_path: str):
@@ -214,16 +194,12 @@ class Audio2FaceAPI:
             writer = csv.writer(f)
             
             # Header
-            channels = list(animation_data["channels"].keys())
-            writer.writerow(["time"] + channels)
+            timeline = animation_data["timeline"]
+            writer.writerow(["time"] + timeline.channels)
             
             # Data
-            num_frames = len(animation_data["blendshapes"])
-            for i in range(num_frames):
-                row = [animation_data["blendshapes"][i]["time"]]
-                for channel in channels:
-                    row.append(animation_data["channels"][channel][i])
-                writer.writerow(row)
+            for time, values in zip(timeline.times.tolist(), timeline.values.tolist()):
+                writer.writerow([time] + values)
         
         logger.info(f"Exported animation curves to {output_path}")
 
@@ -231,10 +207,22 @@ class Audio2FaceAPI:
 class VoiceToFacebridge:
     """Bridge between TTS output and Audio2Face API."""
     
-    def __init__(self, api_key: str = None):
-        self.a2f_api = Audio2FaceAPI(api_key)
-        self.animation_cache = {}
+    def __init__(self, api_key: str = None, face_model: str = "mark",
+                 cache_bytes: int = 32 * 1024 * 1024, cache_dir: Optional[str] = None):
+        """
+        Initialize bridge.
         
+        Args:
+            api_key: NVIDIA API key (nvapi-...)
+            face_model: Face model to animate
+            cache_bytes: Memory budget of the animation cache
+            cache_dir: Directory keeping animations across restarts (None, the default,
+                for memory only)
+        """
+        self.a2f_api = Audio2FaceAPI(api_key)
+        self.face_model = face_model
+        self.animation_cache = AnimationCache(max_bytes=cache_bytes, cache_dir=cache_dir)
+    
     async def process_response(self, text: str, audio_data: np.ndarray) -> Dict:
         """
         Process a voice response to generate facial animation.
@@ -242,22 +230,23 @@ class VoiceToFacebridge:
         Args:
             text: The spoken text
             audio_data: TTS audio output
-            
+        
         Returns:
             Complete response package with audio and animation
         """
-        # Check cache first
-        cache_key = hash(text[:50])  # Simple cache key
-        if cache_key in self.animation_cache:
+        # Check cache first: the same audio with the same emotion and face animates the same
+        emotion = self.a2f_api.analyze_emotion(text)
+        cache_key = animation_key(audio_data, emotion, self.face_model)
+        animation = await self.animation_cache.get(cache_key)
+        
+        if animation is not None:
             logger.info("Using cached animation")
-            animation = self.animation_cache[cache_key]
         else:
             # Generate new animation
-            animation = await self.a2f_api.generate_from_text_and_audio(text, audio_data)
+            animation = await self.a2f_api.generate_from_text_and_audio(text, audio_data, self.face_model)
             
-            # Cache for common responses
-            if animation and len(self.animation_cache) < 100:
-                self.animation_cache[cache_key] = animation
+            if animation:
+                await self.animation_cache.put(cache_key, animation)
         
         return {
             "text": text,
@@ -267,19 +256,40 @@ class VoiceToFacebridge:
             "ready": animation is not None
         }
     
-    def get_blendshape_at_time(self, animation: Dict, time: float) -> Dict:
+    def get_blendshape_at_time(self, animation: Dict, time: float, method: str = 'linear') -> Dict:
         """Get interpolated blendshape values at specific time."""
-        if not animation or not animation.get("blendshapes"):
+        if not animation or not animation.get("timeline"):
             return {}
         
-        frames = animation["blendshapes"]
-        fps = animation.get("fps", 30)
-        frame_num = int(time * fps)
+        # Blendshapes only: head rotation and eye gaze are separate channels of the track
+        timeline = animation["timeline"]
+        return timeline.at(time, method, timeline.blendshape_channels)
+    
+    def get_blendshapes_for_tick(self, animation: Dict, times, channels: Optional[List[str]] = None,
+                                 method: str = 'cubic') -> np.ndarray:
+        """
+        Interpolate many timestamps at once (e.g. every display frame of a render tick).
         
-        if frame_num >= len(frames):
-            return frames[-1]["blendshapes"] if frames else {}
+        Args:
+            animation: Animation from process_response
+            times: Timestamps in seconds
+            channels: Channel names to return (all by default)
+            method: 'linear', 'cubic' or 'nearest'
         
-        return frames[frame_num]["blendshapes"]
+        Returns:
+            Array of shape (len(times), channels)
+        """
+        if not animation or not animation.get("timeline"):
+            return np.zeros((len(np.atleast_1d(times)), len(channels or [])), dtype=np.float32)
+        
+        return animation["timeline"].sample(times, channels, method)
+    
+    def get_stats(self) -> Dict:
+        """Get bridge statistics."""
+        return {
+            'face_model': self.face_model,
+            'animation_cache': self.animation_cache.get_stats()
+        }
 
 # Example usage
 async def test_audio2face_api():
@@ -302,7 +312,7 @@ async def test_audio2face_api():
         print("Animation generated successfully!")
         print(f"Duration: {result['animation']['duration']}s")
         print(f"FPS: {result['animation']['fps']}")
-        print(f"Frames: {len(result['animation']['blendshapes'])}")
+        print(f"Frames: {len(result['animation']['timeline'])}")
         
         # Export for testing
         bridge.a2f_api.export_to_json(result["animation"], "test_animation.json")
@@ -5,15 +5,19 @@ Sends TTS audio to Audio2Face for real-time facial animation and lip sync
 
 import asyncio
 import aiohttp
-import base64
 import json
 import numpy as np
 import soundfile as sf
 from pathlib import Path
 from typing import Optional, Dict, Any
 import logging
+import time
 from io import BytesIO
-import struct
+
+from paced_streamer import PacedAudioStreamer, FRAME_HEADER
+from a2f_connection import A2FConnection
+from audio_features import AudioFeatureExtractor, AudioFeatures
+from osc_bundle import OSCSender, loop_to_unix
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -42,9 +46,12 @@ class Audio2FaceIntegration:
             'amused': {'arousal': 0.6, 'valence': 0.7}
         }
         
-        # WebSocket for real-time communication
+        # WebSocket for real-time communication; reconnects on its own once started
         self.ws_endpoint = self.config['audio2face'].get('ws_endpoint', 'ws://localhost:8011/A2F/Stream')
-        self.ws_connection = None
+        self.connection = A2FConnection(self.ws_endpoint, self.config_message)
+        
+        # Audio is streamed as binary int16 frames in step with playback
+        self.streamer = PacedAudioStreamer(self.send_frame, self.sample_rate)
         
         logger.info("Audio2Face integration initialized")
     
@@ -64,29 +71,29 @@ class Audio2FaceIntegration:
             with open(config_file, 'w') as f:
                 json.dump(default_config, f, indent=2)
             logger.warning(f"Created default config at {config_path}")
-            
+        
         with open(config_file, 'r') as f:
             return json.load(f)
     
-    async def connect_websocket(self):
-        """Establish WebSocket connection for real-time streaming."""
-        try:
-            import websockets
-            self.ws_connection = await websockets.connect(self.ws_endpoint)
+    def config_message(self) -> str:
+        """Configuration sent on every (re)connect."""
+        return json.dumps({
+            "type": "configure",
+            "api_key": self.api_key,
+            "instance": self.instance_name,
+            "sample_rate": self.sample_rate
+        })
+    
+    async def connect_websocket(self, timeout: float = 5.0) -> bool:
+        """Start the managed WebSocket connection and wait briefly for it to come up."""
+        self.connection.start()
+        
+        if await self.connection.wait_connected(timeout):
             logger.info("Connected to Audio2Face WebSocket")
-            
-            # Send initial configuration
-            config_msg = {
-                "type": "configure",
-                "api_key": self.api_key,
-                "instance": self.instance_name,
-                "sample_rate": self.sample_rate
-            }
-            await self.ws_connection.send(json.dumps(config_msg))
-            
-        except Exception as e:
-            logger.error(f"Failed to connect WebSocket: {e}")
-            self.ws_connection = None
+            return True
+        
+        logger.warning(f"Audio2Face WebSocket not reachable yet ({self.connection.last_error}); retrying in the background")
+        return False
     
     async def send_audio_to_a2f(self, audio_data: np.ndarray, emotion: str = "neutral") -> bool:
         """
@@ -95,7 +102,7 @@ class Audio2FaceIntegration:
         Args:
             audio_data: Audio samples as numpy array
             emotion: Emotional state for expression mapping
-            
+        
         Returns:
             Success status
         """
@@ -108,54 +115,58 @@ class Audio2FaceIntegration:
             audio_data = np.clip(audio_data, -1.0, 1.0)
             
             # If WebSocket is available, use real-time streaming
-            if self.ws_connection:
+            if self.connection.connected:
                 return await self.stream_audio_realtime(audio_data, emotion)
             else:
                 # Fall back to HTTP API
                 return await self.send_audio_http(audio_data, emotion)
-                
+        
         except Exception as e:
             logger.error(f"Error sending audio to Audio2Face: {e}")
             return False
     
-    async def stream_audio_realtime(self, audio_data: np.ndarray, emotion: str) -> bool:
-        """Stream audio in real-time via WebSocket."""
+    async def stream_audio_realtime(self, audio_data: np.ndarray, emotion: str,
+                                    playback_start: Optional[float] = None) -> bool:
+        """
+        Stream audio in real-time via WebSocket.
+        
+        Args:
+            audio_data: Audio samples at self.sample_rate
+            emotion: Emotional state for expression mapping
+            playback_start: Event loop time the audio starts playing (by default one
+                streamer lookahead from now, so the first frame goes out at once)
+        """
         try:
             # Get emotion parameters
             emotion_params = self.emotion_map.get(emotion, self.emotion_map['neutral'])
             
-            # Chunk audio for streaming (100ms chunks)
-            chunk_size = int(self.sample_rate * 0.1)  # 100ms
+            # Describe the binary frames that follow
+            await self.connection.send(json.dumps({
+                "type": "start_stream",
+                "sample_rate": self.sample_rate,
+                "encoding": "pcm_s16le",
+                "frame_header": {"format": FRAME_HEADER.format, "fields": ["sequence", "timestamp"]},
+                "emotion": emotion_params
+            }))
             
-            for i in range(0, len(audio_data), chunk_size):
-                chunk = audio_data[i:i + chunk_size]
-                
-                # Convert to bytes
-                audio_bytes = chunk.tobytes()
-                
-                # Create message
-                message = {
-                    "type": "audio_chunk",
-                    "data": base64.b64encode(audio_bytes).decode('utf-8'),
-                    "timestamp": i / self.sample_rate,
-                    "emotion": emotion_params
-                }
-                
-                await self.ws_connection.send(json.dumps(message))
-                
-                # Small delay to simulate real-time
-                await asyncio.sleep(0.05)
+            frames = await self.streamer.stream(audio_data, playback_start)
             
             # Send end-of-stream marker
-            await self.ws_connection.send(json.dumps({"type": "end_stream"}))
+            await self.connection.send(json.dumps({"type": "end_stream", "frames": frames}))
             
-            logger.info(f"Streamed {len(audio_data)/self.sample_rate:.2f}s of audio to Audio2Face")
+            logger.info(f"Streamed {len(audio_data)/self.sample_rate:.2f}s of audio to Audio2Face "
+                        f"(drift {self.streamer.last_drift * 1000 if self.streamer.last_drift is not None else 0:.1f} ms, "
+                        f"{self.streamer.underruns} underruns total)")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Error in real-time streaming: {e}")
             return False
     
+    async def send_frame(self, frame: bytes):
+        """Send one binary audio frame; waits while the socket's write buffer is full."""
+        await self.connection.send(frame)
+    
     async def send_audio_http(self, audio_data: np.ndarray, emotion: str) -> bool:
         """Send audio via HTTP API (fallback method)."""
         try:
@@ -195,7 +206,7 @@ class Audio2FaceIntegration:
                         error = await response.text()
                         logger.error(f"Audio2Face API error: {response.status} - {error}")
                         return False
-                        
+        
         except Exception as e:
             logger.error(f"Error sending audio via HTTP: {e}")
             return False
@@ -208,16 +219,16 @@ class Audio2FaceIntegration:
             blendshapes: Dictionary of blendshape names and values (0-1)
         """
         try:
-            if self.ws_connection:
+            if self.connection.connected:
                 message = {
                     "type": "blendshapes",
                     "data": blendshapes,
                     "timestamp": asyncio.get_event_loop().time()
                 }
-                await self.ws_connection.send(json.dumps(message))
+                await self.connection.send(json.dumps(message))
             else:
                 logger.warning("No WebSocket connection for blendshape data")
-                
+        
         except Exception as e:
             logger.error(f"Error sending blendshape data: {e}")
     
@@ -227,7 +238,7 @@ class Audio2FaceIntegration:
         
         Args:
             text: The text being spoken
-            
+        
         Returns:
             Emotion label
         """
@@ -252,7 +263,7 @@ class Audio2FaceIntegration:
         Args:
             text: The text that was spoken
             audio_data: The generated audio
-            
+        
         Returns:
             Success status
         """
@@ -265,7 +276,7 @@ class Audio2FaceIntegration:
             success = await self.send_audio_to_a2f(audio_data, emotion)
             
             # Send additional expression data based on punctuation
-            if self.ws_connection:
+            if self.connection.connected:
                 # Eyebrow raise on questions
                 if '?' in text:
                     await self.send_blendshape_data({
@@ -281,7 +292,7 @@ class Audio2FaceIntegration:
                     })
             
             return success
-            
+        
         except Exception as e:
             logger.error(f"Error processing TTS with A2F: {e}")
             return False
@@ -289,24 +300,30 @@ class Audio2FaceIntegration:
     async def set_idle_animation(self):
         """Set idle animation when not speaking."""
         try:
-            if self.ws_connection:
+            if self.connection.connected:
                 # Subtle breathing animation
                 message = {
                     "type": "idle_animation",
                     "preset": "breathing",
                     "intensity": 0.3
                 }
-                await self.ws_connection.send(json.dumps(message))
-                
+                await self.connection.send(json.dumps(message))
+        
         except Exception as e:
             logger.error(f"Error setting idle animation: {e}")
     
+    def get_stats(self) -> Dict:
+        """Get streaming statistics."""
+        return {
+            'connection': self.connection.get_stats(),
+            'streaming': self.streamer.get_stats()
+        }
+    
     async def disconnect(self):
         """Clean up connections."""
         try:
-            if self.ws_connection:
-                await self.ws_connection.close()
-                logger.info("Disconnected from Audio2Face")
+            await self.connection.close()
+            logger.info("Disconnected from Audio2Face")
         except Exception as e:
             logger.error(f"Error disconnecting: {e}")
 
@@ -314,52 +331,133 @@ class Audio2FaceIntegration:
 class TouchDesignerBridge:
     """Bridge between Audio2Face and TouchDesigner for particle effects."""
     
-    def __init__(self, osc_port: int = 9000):
-        """Initialize OSC communication with TouchDesigner."""
+    def __init__(self, osc_port: int = 9000, frame_rate: float = 60.0):
+        """
+        Initialize OSC communication with TouchDesigner.
+        
+        Args:
+            osc_port: TouchDesigner OSC port
+            frame_rate: Audio feature frames sent per second of playback
+        """
+        self.frame_rate = frame_rate
+        self.extractors: Dict[int, AudioFeatureExtractor] = {}
+        self.emit_task: Optional[asyncio.Task] = None
+        
+        self.blendshape_addresses: Dict[tuple, list] = {}
+        
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.analysis_seconds = 0.0
+        self.audio_seconds = 0.0
+        
+        # One timetagged bundle per frame rather than one datagram per value
         try:
-            from pythonosc import udp_client
-            self.osc_client = udp_client.SimpleUDPClient("localhost", osc_port)
+            self.osc = OSCSender("localhost", osc_port)
             self.enabled = True
             logger.info(f"TouchDesigner OSC bridge initialized on port {osc_port}")
-        except ImportError:
-            logger.warning("python-osc not installed. TouchDesigner bridge disabled.")
+        except OSError as e:
+            logger.warning(f"OSC socket unavailable ({e}). TouchDesigner bridge disabled.")
             self.enabled = False
     
-    def send_audio_features(self, audio_data: np.ndarray):
-        """Send audio analysis to TouchDesigner."""
+    def analyze(self, audio_data: np.ndarray, sample_rate: int) -> AudioFeatures:
+        """Compute the feature frames of a response."""
+        extractor = self.extractors.get(sample_rate)
+        if extractor is None:
+            extractor = self.extractors[sample_rate] = AudioFeatureExtractor(sample_rate, self.frame_rate)
+        
+        start = time.perf_counter()
+        features = extractor.extract(audio_data)
+        self.analysis_seconds += time.perf_counter() - start
+        self.audio_seconds += len(audio_data) / sample_rate
+        return features
+    
+    def send_audio_features(self, audio_data: np.ndarray, sample_rate: int = 22050,
+                            start_time: Optional[float] = None) -> Optional[asyncio.Task]:
+        """
+        Send audio analysis to TouchDesigner, one feature frame per display frame in step with playback.
+        
+        Args:
+            audio_data: Response audio
+            sample_rate: Its sample rate
+            start_time: Event loop time playback starts (now by default)
+        
+        Returns:
+            The task emitting the frames (replaces any previous response's)
+        """
         if not self.enabled:
-            return
-            
+            return None
+        
         try:
-            # Simple audio analysis
-            rms = np.sqrt(np.mean(audio_data**2))
-            
-            # Frequency analysis (simple version)
-            fft = np.fft.rfft(audio_data)
-            freqs = np.fft.rfftfreq(len(audio_data), 1/22050)
-            
-            # Band analysis
-            low = np.mean(np.abs(fft[(freqs < 250)]))
-            mid = np.mean(np.abs(fft[(freqs >= 250) & (freqs < 2000)]))
-            high = np.mean(np.abs(fft[(freqs >= 2000)]))
+            features = self.analyze(audio_data, sample_rate)
             
-            # Send to TouchDesigner
-            self.osc_client.send_message("/audio/level", float(rms))
-            self.osc_client.send_message("/audio/low", float(low))
-            self.osc_client.send_message("/audio/mid", float(mid))
-            self.osc_client.send_message("/audio/high", float(high))
+            if self.emit_task is not None and not self.emit_task.done():
+                self.emit_task.cancel()
+            self.emit_task = asyncio.create_task(self.emit_features(features, start_time))
+            return self.emit_task
+        
+        except Exception as e:
+            logger.error(f"Error sending to TouchDesigner: {e}")
+            return None
+    
+    async def emit_features(self, features: AudioFeatures, start_time: Optional[float] = None):
+        """Send each feature frame at its playback time; frames already overdue are skipped."""
+        loop = asyncio.get_running_loop()
+        if start_time is None:
+            start_time = loop.time()
+        frame_duration = 1.0 / features.frame_rate
+        
+        addresses = ["/audio/level", "/audio/onset"] + [f"/audio/{name}" for name in features.band_names]
+        rows = np.column_stack([features.rms, features.onset, features.bands]) if len(features) else []
+        
+        try:
+            for index, frame_time in enumerate(features.times.tolist()):
+                delay = start_time + frame_time - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif -delay > frame_duration and index + 1 < len(features):
+                    # A newer frame is already due: only the latest value matters
+                    self.frames_skipped += 1
+                    continue
+                
+                self.osc.send_bundle(addresses, rows[index], loop_to_unix(start_time + frame_time, loop))
+                self.frames_sent += 1
             
+            # Settle the particles once the answer is over
+            self.osc.send_bundle(addresses, np.zeros(len(addresses)))
+        
         except Exception as e:
             logger.error(f"Error sending to TouchDesigner: {e}")
     
-    def send_blendshapes(self, blendshapes: Dict[str, float]):
-        """Send Audio2Face blendshapes to TouchDesigner."""
+    def get_stats(self) -> Dict:
+        """Get feature streaming statistics."""
+        return {
+            'enabled': self.enabled,
+            'frame_rate': self.frame_rate,
+            'frames_sent': self.frames_sent,
+            'frames_skipped': self.frames_skipped,
+            'analysis_ms_per_audio_second': round(self.analysis_seconds / self.audio_seconds * 1000.0, 3) if self.audio_seconds else None,
+            'osc': self.osc.get_stats() if self.enabled else None
+        }
+    
+    def send_blendshapes(self, blendshapes: Dict[str, float], unix_time: Optional[float] = None):
+        """
+        Send Audio2Face blendshapes to TouchDesigner as one bundle.
+        
+        Args:
+            blendshapes: Blendshape weights by name
+            unix_time: Time the frame applies to, for the bundle timetag (None: immediately)
+        """
         if not self.enabled:
             return
-            
+        
         try:
-            for name, value in blendshapes.items():
-                self.osc_client.send_message(f"/a2f/blendshape/{name}", float(value))
+            names = tuple(blendshapes)
+            addresses = self.blendshape_addresses.get(names)
+            if addresses is None:
+                if len(self.blendshape_addresses) >= self.osc.max_layouts:
+                    self.blendshape_addresses.clear()
+                addresses = self.blendshape_addresses[names] = [f"/a2f/blendshape/{name}" for name in names]
+            self.osc.send_bundle(addresses, list(blendshapes.values()), unix_time)
         except Exception as e:
             logger.error(f"Error sending blendshapes: {e}")
 
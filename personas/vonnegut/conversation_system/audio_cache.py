@@ -0,0 +1,209 @@
+"""
+In-memory cache of pre-recorded audio clips for the conversation system.
+Clips (pre-rendered FAQ answers and other canned audio) are decoded,
+downmixed, resampled to the server rate and encoded to int16 PCM and
+base64 once; replaying a cached clip does no file reads or DSP.
+"""
+
+import asyncio
+import base64
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from audio_utils import float_to_pcm16, resample, to_mono
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class AudioClip:
+    """A decoded clip, ready to send."""
+    
+    __slots__ = ('path', 'sample_rate', 'pcm16', 'audio_b64')
+    
+    def __init__(self, path: str, sample_rate: int, pcm16: np.ndarray):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.pcm16 = pcm16  # int16 samples at sample_rate
+        self.audio_b64 = base64.b64encode(pcm16.astype('<i2', copy=False).tobytes()).decode('ascii')
+    
+    @property
+    def duration(self) -> float:
+        return len(self.pcm16) / self.sample_rate
+    
+    @property
+    def nbytes(self) -> int:
+        return self.pcm16.nbytes + len(self.audio_b64)
+
+class AudioClipCache:
+    """LRU cache of decoded clips keyed by (path, mtime), bounded by memory."""
+    
+    def __init__(self, sample_rate: int, max_bytes: int = 64 * 1024 * 1024,
+                 revalidate_interval: float = 5.0):
+        """
+        Initialize clip cache.
+        
+        Args:
+            sample_rate: Rate clips are resampled to (the server's rate)
+            max_bytes: Memory budget; least recently used clips are evicted beyond it
+            revalidate_interval: Seconds before a cached clip's mtime is checked again
+        """
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.revalidate_interval = revalidate_interval
+        
+        self.clips: "OrderedDict[Tuple[str, int], AudioClip]" = OrderedDict()
+        self.current_keys: Dict[str, Tuple[str, int]] = {}  # path -> key of its cached version
+        self.checked_at: Dict[str, float] = {}
+        self.total_bytes = 0
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_errors = 0
+    
+    def stat_key(self, path: str) -> Optional[Tuple[str, int]]:
+        """Cache key of the file as it is on disk now, or None if it does not exist."""
+        try:
+            return path, os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+    
+    def lookup(self, path: str) -> Optional[AudioClip]:
+        """Return the cached clip for path if it is still current (no decoding)."""
+        key = self.current_keys.get(path)
+        
+        if key is not None and time.monotonic() - self.checked_at.get(path, 0.0) < self.revalidate_interval:
+            clip = self.clips.get(key)
+        else:
+            key = self.stat_key(path)
+            clip = self.clips.get(key) if key is not None else None
+            self.checked_at[path] = time.monotonic()
+            
+            if clip is None and path in self.current_keys:
+                # The file changed or disappeared: drop the old version
+                self.discard(self.current_keys.pop(path))
+        
+        if clip is not None:
+            self.clips.move_to_end(key)
+        return clip
+    
+    def decode(self, path: str) -> AudioClip:
+        """Read and convert a clip (blocking; runs in a worker thread)."""
+        audio, sr = sf.read(path, dtype='float32')
+        audio = resample(to_mono(audio), sr, self.sample_rate)
+        return AudioClip(path, self.sample_rate, float_to_pcm16(audio))
+    
+    async def get(self, path: str) -> Optional[AudioClip]:
+        """
+        Get a clip, decoding it off the event loop on a miss.
+        
+        Returns:
+            The clip, or None if the file is missing or unreadable
+        """
+        clip = self.lookup(path)
+        if clip is not None:
+            self.hits += 1
+            return clip
+        
+        self.misses += 1
+        key = self.stat_key(path)
+        if key is None:
+            return None
+        
+        try:
+            clip = await asyncio.to_thread(self.decode, path)
+        except Exception as e:
+            self.load_errors += 1
+            logger.error(f"Error loading audio file {path}: {e}")
+            return None
+        
+        self.store(key, clip)
+        return clip
+    
+    def store(self, key: Tuple[str, int], clip: AudioClip):
+        """Insert a clip and evict least recently used ones beyond the budget."""
+        if clip.nbytes > self.max_bytes:
+            logger.warning(f"Audio clip {clip.path} ({clip.nbytes} bytes) exceeds the cache budget, not cached")
+            return
+        
+        path = key[0]
+        if path in self.current_keys:
+            self.discard(self.current_keys[path])
+        
+        self.clips[key] = clip
+        self.current_keys[path] = key
+        self.checked_at[path] = time.monotonic()
+        self.total_bytes += clip.nbytes
+        
+        while self.total_bytes > self.max_bytes:
+            old_key, _ = next(iter(self.clips.items()))
+            self.discard(old_key)
+            self.current_keys.pop(old_key[0], None)
+            self.evictions += 1
+    
+    def discard(self, key: Tuple[str, int]):
+        """Remove one cached clip."""
+        clip = self.clips.pop(key, None)
+        if clip is not None:
+            self.total_bytes -= clip.nbytes
+    
+    async def preload(self, paths: Iterable[str]) -> int:
+        """
+        Load clips in priority order (hottest first) until the budget is full.
+        
+        Returns:
+            Number of clips cached
+        """
+        loaded = []
+        
+        for path in dict.fromkeys(paths):
+            if self.lookup(path) is not None:
+                loaded.append(path)
+                continue
+            
+            key = self.stat_key(path)
+            if key is None:
+                continue
+            
+            try:
+                clip = await asyncio.to_thread(self.decode, path)
+            except Exception as e:
+                self.load_errors += 1
+                logger.error(f"Error loading audio file {path}: {e}")
+                continue
+            
+            # Stop at the budget rather than evicting the hotter clips loaded before
+            if self.total_bytes + clip.nbytes > self.max_bytes:
+                break
+            
+            self.store(key, clip)
+            loaded.append(path)
+        
+        # Hottest clips are evicted last
+        for path in reversed(loaded):
+            self.clips.move_to_end(self.current_keys[path])
+        
+        logger.info(f"Preloaded {len(loaded)} audio clips ({self.total_bytes / 1e6:.1f} MB)")
+        return len(loaded)
+    
+    def get_stats(self) -> Dict:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        
+        return {
+            'clips': len(self.clips),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            'evictions': self.evictions,
+            'load_errors': self.load_errors
+        }
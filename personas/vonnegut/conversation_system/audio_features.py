@@ -0,0 +1,113 @@
+"""
+Frame-wise audio features for driving visuals.
+Computes, at a fixed frame rate (60 Hz by default), the RMS level, the
+energy in a few frequency bands and an onset strength (positive spectral
+flux) from a windowed STFT. The whole answer is analysed in one
+vectorized pass: frames are strided views of the signal, transformed
+together, and band energies are one matrix product.
+"""
+
+import logging
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from audio_utils import to_mono
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# (name, low Hz, high Hz); None is the Nyquist frequency
+DEFAULT_BANDS = (('low', 0.0, 250.0), ('mid', 250.0, 2000.0), ('high', 2000.0, None))
+
+@lru_cache(maxsize=16)
+def band_matrix(fft_size: int, sample_rate: int, bands: Tuple) -> np.ndarray:
+    """(bins x bands) 0/1 matrix: power spectrum @ matrix = power per band."""
+    freqs = np.fft.rfftfreq(fft_size, 1.0 / sample_rate)
+    matrix = np.zeros((len(freqs), len(bands)), dtype=np.float32)
+    
+    for column, (_, low, high) in enumerate(bands):
+        mask = (freqs >= low) & (freqs < (high if high is not None else np.inf))
+        if mask.any():
+            matrix[mask, column] = 1.0
+    
+    return matrix
+
+class AudioFeatures:
+    """Feature frames of one signal; row i describes the audio around times[i]."""
+    
+    __slots__ = ('frame_rate', 'times', 'rms', 'bands', 'band_names', 'onset')
+    
+    def __init__(self, frame_rate: float, times: np.ndarray, rms: np.ndarray,
+                 bands: np.ndarray, band_names: Sequence[str], onset: np.ndarray):
+        self.frame_rate = frame_rate
+        self.times = times
+        self.rms = rms
+        self.bands = bands  # (frames x bands)
+        self.band_names = list(band_names)
+        self.onset = onset
+    
+    def __len__(self) -> int:
+        return len(self.times)
+    
+    def frame(self, index: int) -> Dict[str, float]:
+        """One frame's features by name."""
+        features = {'level': float(self.rms[index]), 'onset': float(self.onset[index])}
+        for column, name in enumerate(self.band_names):
+            features[name] = float(self.bands[index, column])
+        return features
+
+class AudioFeatureExtractor:
+    """Windowed STFT analysis at a fixed frame rate."""
+    
+    def __init__(self, sample_rate: int, frame_rate: float = 60.0, window_duration: float = 0.04,
+                 bands: Sequence[Tuple[str, float, Optional[float]]] = DEFAULT_BANDS):
+        """
+        Initialize extractor.
+        
+        Args:
+            sample_rate: Sample rate of the analysed audio
+            frame_rate: Feature frames per second
+            window_duration: Analysis window length in seconds (rounded up to a power of two)
+            bands: (name, low Hz, high Hz) frequency bands
+        """
+        self.sample_rate = sample_rate
+        self.frame_rate = frame_rate
+        self.bands = tuple(bands)
+        self.fft_size = 1 << int(np.ceil(np.log2(max(2, window_duration * sample_rate))))
+        self.window = np.hanning(self.fft_size).astype(np.float32)
+        
+        # Parseval: band values are the RMS level of the audio in each band
+        self.power_scale = 2.0 / (self.fft_size * float(np.sum(np.square(self.window))))
+    
+    def extract(self, audio: np.ndarray) -> AudioFeatures:
+        """Analyse a whole signal (any dtype or channel count)."""
+        audio = to_mono(audio)
+        n_frames = int(np.ceil(len(audio) / self.sample_rate * self.frame_rate)) if len(audio) else 0
+        names = [name for name, _, _ in self.bands]
+        
+        if n_frames == 0:
+            empty = np.zeros(0, dtype=np.float32)
+            return AudioFeatures(self.frame_rate, empty, empty, np.zeros((0, len(names)), dtype=np.float32), names, empty)
+        
+        # Windows centred on each frame time; the hop may be fractional (22050 / 60)
+        half = self.fft_size // 2
+        padded = np.pad(audio, (half, half + self.fft_size))
+        times = np.arange(n_frames) / self.frame_rate
+        starts = np.round(times * self.sample_rate).astype(np.int64)
+        frames = np.lib.stride_tricks.sliding_window_view(padded, self.fft_size)[starts]
+        
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        
+        magnitude = np.abs(np.fft.rfft(frames * self.window, axis=1)).astype(np.float32)
+        power = np.square(magnitude) * self.power_scale
+        bands = np.sqrt(power @ band_matrix(self.fft_size, self.sample_rate, self.bands))
+        
+        # Onset strength: mean rise of the log spectrum since the previous frame
+        log_magnitude = np.log1p(magnitude)
+        flux = np.maximum(np.diff(log_magnitude, axis=0, prepend=log_magnitude[:1]), 0.0)
+        onset = flux.mean(axis=1)
+        
+        return AudioFeatures(self.frame_rate, times, rms, bands, names, onset)
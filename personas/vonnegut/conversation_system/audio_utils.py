@@ -0,0 +1,225 @@
+"""
+Shared audio utilities for the conversation system.
+Polyphase resampling with cached filters (offline and streaming),
+float/int16 PCM conversion with clipping, mono downmix and framing.
+"""
+
+import logging
+from functools import lru_cache
+from math import gcd
+from typing import Dict
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Resampling filter: zero crossings of the windowed sinc on each side and
+# Kaiser window shape (same defaults as scipy.signal.resample_poly)
+FILTER_ZERO_CROSSINGS = 10
+FILTER_KAISER_BETA = 5.0
+
+def to_float32(audio: np.ndarray) -> np.ndarray:
+    """Convert int16 PCM or any float array to float32 in [-1, 1]; no copy if already float32."""
+    audio = np.asarray(audio)
+    
+    if audio.dtype == np.int16:
+        return np.multiply(audio, np.float32(1.0 / 32768.0), dtype=np.float32)
+    
+    return audio.astype(np.float32, copy=False)
+
+def pcm16_to_float(data: bytes) -> np.ndarray:
+    """Decode little-endian 16-bit PCM bytes to float32 samples."""
+    return to_float32(np.frombuffer(data, dtype='<i2'))
+
+def float_to_pcm16(audio: np.ndarray) -> np.ndarray:
+    """Convert float samples to int16 PCM, clipping instead of wrapping around."""
+    scaled = np.multiply(audio, np.float32(32767.0), dtype=np.float32)
+    np.clip(scaled, -32768.0, 32767.0, out=scaled)
+    np.rint(scaled, out=scaled)
+    return scaled.astype(np.int16)
+
+def to_mono(audio: np.ndarray) -> np.ndarray:
+    """Downmix (samples x channels) audio to a 1-D float32 signal."""
+    audio = np.asarray(audio)
+    
+    if audio.ndim == 1:
+        return to_float32(audio)
+    
+    if audio.shape[1] == 1:
+        return to_float32(audio[:, 0])
+    
+    return to_float32(audio).mean(axis=1, dtype=np.float32)
+
+def frame_signal(audio: np.ndarray, frame_size: int, hop_size: int) -> np.ndarray:
+    """
+    Return a (frames x frame_size) strided view of a 1-D signal.
+    
+    No samples are copied; trailing samples that do not fill a whole frame
+    are ignored.
+    """
+    if len(audio) < frame_size:
+        return np.zeros((0, frame_size), dtype=audio.dtype)
+    
+    return np.lib.stride_tricks.sliding_window_view(audio, frame_size)[::hop_size]
+
+@lru_cache(maxsize=32)
+def resampling_plan(src_rate: int, dst_rate: int) -> Dict:
+    """
+    Design (once per rate pair) the polyphase filter bank for a rational resampling.
+    
+    The Kaiser-windowed sinc prototype runs at ``up`` times the input rate
+    with its cutoff below both Nyquist frequencies, and is split into
+    ``up`` phase filters of ``taps`` coefficients each (stored reversed,
+    ready for a dot product with the input window).
+    """
+    divisor = gcd(int(src_rate), int(dst_rate))
+    up = int(dst_rate) // divisor
+    down = int(src_rate) // divisor
+    
+    max_rate = max(up, down)
+    half_len = FILTER_ZERO_CROSSINGS * max_rate
+    n = np.arange(2 * half_len + 1) - half_len
+    cutoff = 1.0 / max_rate  # relative to the upsampled Nyquist
+    prototype = np.sinc(cutoff * n) * np.kaiser(len(n), FILTER_KAISER_BETA)
+    prototype *= up / prototype.sum()  # unity gain at DC after zero-stuffing
+    
+    taps = -(-len(prototype) // up)
+    padded = np.zeros(taps * up)
+    padded[:len(prototype)] = prototype
+    
+    # Output m = j + q*up uses phase (j*down + half_len) % up and input
+    # samples ending at (j*down + half_len) // up + q*down
+    offsets = np.arange(up) * down + half_len
+    
+    return {
+        'up': up,
+        'down': down,
+        'taps': taps,
+        'half_len': half_len,
+        'filters': np.ascontiguousarray(padded.reshape(taps, up).T[:, ::-1], dtype=np.float32),
+        'phases': offsets % up,
+        'bases': offsets // up
+    }
+
+def polyphase_outputs(padded: np.ndarray, offset: int, m_start: int, m_stop: int, plan: Dict) -> np.ndarray:
+    """
+    Compute outputs ``m_start`` to ``m_stop`` of a polyphase resampling.
+    
+    ``padded`` is the input preceded by ``taps - 1`` zeros, starting at
+    index ``offset`` of that zero-padded signal.
+    """
+    up, down, taps = plan['up'], plan['down'], plan['taps']
+    out = np.zeros(max(m_stop - m_start, 0), dtype=np.float32)
+    if len(out) == 0:
+        return out
+    
+    windows = np.lib.stride_tricks.sliding_window_view(padded, taps)
+    
+    if len(out) < 8 * up:
+        # Short blocks (streaming): gather each output's window and filter directly
+        m = np.arange(m_start, m_stop)
+        j = m % up
+        starts = plan['bases'][j] + (m // up) * down - offset
+        return np.einsum('ij,ij->i', windows[starts], plan['filters'][plan['phases'][j]])
+    
+    # Outputs with the same index modulo up share a phase filter and read
+    # input windows spaced down samples apart
+    for first in range(m_start, min(m_start + up, m_stop)):
+        j = first % up
+        count = len(range(first, m_stop, up))
+        start = plan['bases'][j] + (first // up) * down - offset
+        
+        out[first - m_start::up] = windows[start:start + (count - 1) * down + 1:down] @ plan['filters'][plan['phases'][j]]
+    
+    return out
+
+def resample(audio: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """
+    Resample a 1-D signal with an anti-aliased polyphase filter.
+    
+    Args:
+        audio: Samples at ``src_rate`` (int16 or float)
+        src_rate: Input sample rate
+        dst_rate: Output sample rate
+    
+    Returns:
+        float32 samples at ``dst_rate``
+    """
+    audio = to_float32(audio)
+    if src_rate == dst_rate or len(audio) == 0:
+        return audio
+    
+    plan = resampling_plan(src_rate, dst_rate)
+    taps = plan['taps']
+    
+    padded = np.concatenate([
+        np.zeros(taps - 1, dtype=np.float32),
+        audio,
+        np.zeros(2 * taps, dtype=np.float32)
+    ])
+    n_out = -(-len(audio) * plan['up'] // plan['down'])
+    
+    return polyphase_outputs(padded, 0, 0, n_out, plan)
+
+class StreamingResampler:
+    """Chunk-by-chunk polyphase resampler; concatenated output matches resample()."""
+    
+    def __init__(self, src_rate: int, dst_rate: int):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self.passthrough = src_rate == dst_rate
+        self.plan = None if self.passthrough else resampling_plan(src_rate, dst_rate)
+        self.reset()
+    
+    def reset(self):
+        """Forget buffered input and start a new stream."""
+        taps = self.plan['taps'] if self.plan else 1
+        self.history = np.zeros(taps - 1, dtype=np.float32)
+        self.offset = 0  # index of history[0] in the zero-padded input
+        self.samples_in = 0
+        self.samples_out = 0
+    
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """Resample the next chunk; returns all output that is ready so far."""
+        chunk = to_float32(chunk)
+        if self.passthrough:
+            return chunk
+        
+        self.history = np.concatenate([self.history, chunk])
+        self.samples_in += len(chunk)
+        
+        # Output m is ready once its last input sample has arrived
+        plan = self.plan
+        ready = (self.samples_in * plan['up'] - 1 - plan['half_len']) // plan['down'] + 1
+        return self.emit(ready)
+    
+    def flush(self) -> np.ndarray:
+        """Return the remaining output at the end of the stream."""
+        if self.passthrough:
+            return np.zeros(0, dtype=np.float32)
+        
+        plan = self.plan
+        self.history = np.concatenate([self.history, np.zeros(2 * plan['taps'], dtype=np.float32)])
+        total = -(-self.samples_in * plan['up'] // plan['down'])
+        out = self.emit(total)
+        self.reset()
+        return out
+    
+    def emit(self, m_stop: int) -> np.ndarray:
+        """Compute outputs up to ``m_stop`` and drop input that is no longer needed."""
+        plan = self.plan
+        if m_stop <= self.samples_out:
+            return np.zeros(0, dtype=np.float32)
+        
+        out = polyphase_outputs(self.history, self.offset, self.samples_out, m_stop, plan)
+        self.samples_out = m_stop
+        
+        # The next output's window starts at this index of the padded input
+        next_start = (m_stop * plan['down'] + plan['half_len']) // plan['up']
+        drop = max(0, min(next_start - self.offset, len(self.history)))
+        self.history = self.history[drop:]
+        self.offset += drop
+        
+        return out
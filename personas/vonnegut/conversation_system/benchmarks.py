@@ -0,0 +1,505 @@
+"""
+Performance benchmarks for the conversation system.
+Run with: python benchmarks.py [name ...]
+"""
+
+import sys
+import time
+import logging
+from typing import Callable, Dict
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def synthetic_session(duration: float, sample_rate: int = 16000, seed: int = 0) -> np.ndarray:
+    """Create a noise floor with speech-like bursts (4s on, 6s off)."""
+    rng = np.random.default_rng(seed)
+    n_samples = int(duration * sample_rate)
+    t = np.arange(n_samples, dtype=np.float32) / sample_rate
+    
+    audio = rng.standard_normal(n_samples, dtype=np.float32) * 0.003
+    envelope = (np.sin(2 * np.pi * 0.1 * t) > 0.3).astype(np.float32) * 0.05
+    audio += rng.standard_normal(n_samples, dtype=np.float32) * envelope
+    
+    return audio
+
+def benchmark_energy_vad(duration: float = 3600.0):
+    """Time the vectorized energy-based segmentation on a long recording."""
+    from vad_handler import VADHandler
+    
+    vad = VADHandler()
+    audio = synthetic_session(duration, vad.sample_rate)
+    
+    start = time.perf_counter()
+    segments = vad.segment_energy(audio)
+    elapsed = time.perf_counter() - start
+    
+    logger.info(f"Energy VAD: {duration:.0f}s of audio in {elapsed:.3f}s "
+                f"({duration / elapsed:.0f}x real time), {len(segments)} segments")
+
+def interp_resample(audio: np.ndarray, src_rate: int, dst_rate: int) -> np.ndarray:
+    """The linear-interpolation resampler audio_utils replaced, for comparison."""
+    new_length = int(len(audio) * dst_rate / src_rate)
+    return np.interp(np.linspace(0, len(audio), new_length), np.arange(len(audio)), audio)
+
+def tone_levels(audio: np.ndarray, sample_rate: int, frequencies) -> list:
+    """Level (dB relative to full scale) of each frequency in a windowed spectrum."""
+    spectrum = np.abs(np.fft.rfft(audio * np.hanning(len(audio))))
+    spectrum /= np.hanning(len(audio)).sum() / 2
+    bins = np.fft.rfftfreq(len(audio), 1.0 / sample_rate)
+    return [20 * np.log10(spectrum[np.argmin(np.abs(bins - f))] + 1e-12) for f in frequencies]
+
+def benchmark_resample(duration: float = 60.0):
+    """Compare polyphase and linear-interpolation resampling for quality and speed."""
+    from audio_utils import StreamingResampler, resample
+    
+    src_rate, dst_rate = 44100, 16000
+    t = np.arange(int(2.0 * src_rate)) / src_rate
+    
+    # A 1 kHz tone should pass; a 10 kHz tone is above the new Nyquist
+    # and any energy at its 6 kHz alias is aliasing
+    passband = (0.5 * np.sin(2 * np.pi * 1000 * t)).astype(np.float32)
+    stopband = (0.5 * np.sin(2 * np.pi * 10000 * t)).astype(np.float32)
+    
+    for name, fn in (('polyphase', resample), ('np.interp', interp_resample)):
+        pass_level = tone_levels(fn(passband, src_rate, dst_rate), dst_rate, [1000])[0]
+        alias_level = tone_levels(fn(stopband, src_rate, dst_rate), dst_rate, [6000])[0]
+        logger.info(f"{name}: 1 kHz tone {pass_level:.2f} dBFS, 10 kHz alias {alias_level:.1f} dBFS")
+    
+    audio = synthetic_session(duration, src_rate)
+    
+    for name, fn in (('polyphase', resample), ('np.interp', interp_resample)):
+        start = time.perf_counter()
+        fn(audio, src_rate, dst_rate)
+        elapsed = time.perf_counter() - start
+        logger.info(f"{name}: {duration:.0f}s at {src_rate}Hz -> {dst_rate}Hz in {elapsed:.3f}s "
+                    f"({duration / elapsed:.0f}x real time)")
+    
+    # Streaming in 20 ms chunks, as for live audio
+    resampler = StreamingResampler(src_rate, dst_rate)
+    chunk = int(0.02 * src_rate)
+    
+    start = time.perf_counter()
+    for i in range(0, len(audio), chunk):
+        resampler.process(audio[i:i + chunk])
+    resampler.flush()
+    elapsed = time.perf_counter() - start
+    logger.info(f"streaming: 20ms chunks in {elapsed:.3f}s ({duration / elapsed:.0f}x real time)")
+
+def simulated_synthesis(text: str, seconds_per_char: float = 0.004, sample_rate: int = 22050) -> np.ndarray:
+    """CPU-bound stand-in for a local TTS engine: work and audio length scale with the text."""
+    deadline = time.perf_counter() + len(text) * seconds_per_char
+    block = np.random.default_rng(len(text)).standard_normal(4096)
+    while time.perf_counter() < deadline:
+        np.fft.irfft(np.fft.rfft(block))
+    
+    t = np.arange(int(len(text) * 0.06 * sample_rate)) / sample_rate
+    return (0.3 * np.sin(2 * np.pi * 140 * t)).astype(np.float32)
+
+def benchmark_sentence_tts(processes: int = 4):
+    """Time-to-first-audio and total time for whole-text vs sentence-parallel synthesis."""
+    import asyncio
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from tts_scheduler import SentenceScheduler
+    
+    text = ("Listen: we are here on Earth to fart around, and don't let anybody tell you different. "
+            "Hi ho. Of all the words of mice and men, the saddest are, it might have been. "
+            "Everything was beautiful and nothing hurt. So it goes.")
+    
+    async def run(pool_size: int, split: bool):
+        with ProcessPoolExecutor(pool_size, mp_context=multiprocessing.get_context('spawn')) as pool:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(pool, simulated_synthesis, "warm")
+            
+            async def synthesize(sentence: str) -> np.ndarray:
+                return await loop.run_in_executor(pool, simulated_synthesis, sentence)
+            
+            start = time.perf_counter()
+            if not split:
+                await synthesize(text)
+                elapsed = time.perf_counter() - start
+                return elapsed, elapsed
+            
+            scheduler = SentenceScheduler(synthesize, 22050, max_parallel=pool_size)
+            first = None
+            async for _ in scheduler.stream(text):
+                if first is None:
+                    first = time.perf_counter() - start
+            return first, time.perf_counter() - start
+    
+    for label, pool_size, split in (('whole text', 1, False),
+                                    ('sentences, 1 process', 1, True),
+                                    (f'sentences, {processes} processes', processes, True)):
+        first, total = asyncio.run(run(pool_size, split))
+        logger.info(f"TTS {label}: first audio {first:.2f}s, total {total:.2f}s")
+
+def synthetic_faq(n_entries: int, vocabulary: int = 5000, seed: int = 0) -> list:
+    """FAQ entries with Zipf-distributed trigger words (ids repeat, as extraction produces)."""
+    rng = np.random.default_rng(seed)
+    words = [f"w{i}" for i in range(vocabulary)]
+    common = ['what', 'is', 'about', 'tell', 'me', 'thoughts', 'on']
+    
+    entries = []
+    for i in range(n_entries):
+        picks = np.minimum(rng.zipf(1.3, size=4), vocabulary) - 1
+        triggers = [f"{rng.choice(common)} {words[k]}" for k in picks[:3]] + [words[picks[3]]]
+        entries.append({
+            'id': i % (n_entries // 2) if i % 7 == 0 else i,
+            'type': 'synthetic',
+            'trigger_phrases': triggers,
+            'response': f"Answer {i}",
+            'confidence_boost': float(rng.choice([0.0, 0.1, 0.15, 0.2])),
+            'source': 'benchmark',
+            'audio_file': None
+        })
+    return entries
+
+def benchmark_faq_index(n_entries: int = 100000, n_queries: int = 200):
+    """Compare the inverted FAQ index with the linear scan it replaced."""
+    from faq_router import FAQRouter
+    from faq_index import FAQIndex
+    from faq_tfidf import TfidfFAQIndex
+    
+    entries = synthetic_faq(n_entries)
+    router = FAQRouter(faq_db_path="/nonexistent/faq_database.json", scoring="keyword", compat_scoring=True)
+    router.faq_entries = entries
+    router.build_index()
+    
+    # The linear scan's bag of trigger words, keyed by entry id
+    word_counts = {}
+    for entry in entries:
+        counts = {}
+        for word in ' '.join(entry['trigger_phrases']).lower().split():
+            counts[word] = counts.get(word, 0) + 1
+        word_counts[entry['id']] = counts
+    
+    rng = np.random.default_rng(1)
+    queries = [
+        f"what is w{rng.zipf(1.3) % 5000} and {'tell me about' if i % 2 else 'thoughts on'} w{rng.integers(5000)}"
+        for i in range(n_queries)
+    ]
+    
+    def similarity(query: str, entry_id: int) -> float:
+        query_words = query.lower().split()
+        if entry_id not in word_counts or not query_words:
+            return 0.0
+        matches = sum(word_counts[entry_id].get(word, 0) for word in query_words)
+        try:
+            boost = router.faq_entries[entry_id].get('confidence_boost', 0)
+        except IndexError:
+            return 0.0
+        return min(1.0, matches / len(query_words) + boost)
+    
+    def scan(query: str):
+        best_match, best_score = None, 0.0
+        for entry in router.faq_entries:
+            score = similarity(query, entry['id'])
+            if score > best_score:
+                best_match, best_score = entry, score
+        return (best_match, best_score) if best_match is not None else None
+    
+    scan_queries = queries[:5]
+    start = time.perf_counter()
+    expected = [scan(query) for query in scan_queries]
+    scan_ms = (time.perf_counter() - start) / len(scan_queries) * 1000
+    
+    matches = sum(router.index.search(query) == result for query, result in zip(scan_queries, expected))
+    
+    start = time.perf_counter()
+    for query in queries:
+        router.index.search(query)
+    index_ms = (time.perf_counter() - start) / len(queries) * 1000
+    
+    start = time.perf_counter()
+    FAQIndex(entries)
+    build_s = time.perf_counter() - start
+    
+    logger.info(f"FAQ scan: {scan_ms:.1f}ms/query over {n_entries} entries")
+    logger.info(f"FAQ index: {index_ms:.3f}ms/query ({matches}/{len(scan_queries)} same as scan), "
+                f"built in {build_s:.2f}s, {router.index.get_stats()}")
+    
+    start = time.perf_counter()
+    tfidf = TfidfFAQIndex(entries)
+    build_s = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for query in queries:
+        tfidf.search(query)
+    tfidf_ms = (time.perf_counter() - start) / len(queries) * 1000
+    
+    logger.info(f"FAQ TF-IDF: {tfidf_ms:.3f}ms/query, built in {build_s:.2f}s, {tfidf.get_stats()}")
+    
+    # Additions go into the live indexes instead of rebuilding them
+    added = synthetic_faq(1000, seed=1)
+    for index in (FAQIndex(entries), tfidf):
+        start = time.perf_counter()
+        for entry in added:
+            index.extend([entry])
+        add_ms = (time.perf_counter() - start) / len(added) * 1000
+        
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query)
+        search_ms = (time.perf_counter() - start) / len(queries) * 1000
+        
+        logger.info(f"FAQ {type(index).__name__}: {add_ms:.3f}ms per added entry, "
+                    f"{search_ms:.3f}ms/query with {index.pending} pending")
+
+def synthetic_transcript(n_words: int, seed: int = 0) -> str:
+    """Transcript-like text: Zipf-distributed words, the FAQ keywords and phrases, sentences of 8-25 words."""
+    from faq_router import FAMOUS_PHRASES, PHILOSOPHICAL_KEYWORDS, RESPONSE_MARKERS
+    
+    rng = np.random.default_rng(seed)
+    letters = np.array(list('abcdefghijklmnopqrstuvwxyz'))
+    vocabulary = [''.join(rng.choice(letters, size=rng.integers(2, 10))) for _ in range(20000)]
+    vocabulary += PHILOSOPHICAL_KEYWORDS + RESPONSE_MARKERS + FAMOUS_PHRASES + ['Billy Pilgrim', 'Kilgore Trout']
+    
+    words = [vocabulary[min(k, len(vocabulary)) - 1] for k in rng.zipf(1.2, size=n_words)]
+    sentences = []
+    i = 0
+    while i < len(words):
+        length = int(rng.integers(8, 26))
+        sentences.append(' '.join(words[i:i + length]).capitalize())
+        i += length
+    
+    return '. '.join(sentences) + '.'
+
+def benchmark_faq_extraction(n_words: int = 1000000, extra_phrases: int = 2000):
+    """Tag a long transcript with the phrase matcher (str.find or trie regex) vs per-sentence scans."""
+    import asyncio
+    from faq_router import FAQRouter, SENTENCE_MATCHER
+    from phrase_matcher import PhraseMatcher
+    
+    transcript = synthetic_transcript(n_words)
+    router = FAQRouter(faq_db_path="/nonexistent/faq_database.json")
+    sentences = router.split_into_sentences(transcript)
+    lowered = [sentence.lower() for sentence in sentences]
+    
+    rng = np.random.default_rng(1)
+    words = transcript.lower().split()
+    trigger_phrases = list({' '.join(words[i:i + 2]) for i in rng.integers(0, len(words) - 2, size=extra_phrases)})
+    
+    for label, phrases in (('FAQ phrase lists', SENTENCE_MATCHER.phrases),
+                           ('+100 trigger phrases', SENTENCE_MATCHER.phrases + trigger_phrases[:100]),
+                           (f'+{len(trigger_phrases)} trigger phrases', SENTENCE_MATCHER.phrases + trigger_phrases)):
+        timings, tags = {}, {}
+        for method, find_max_phrases in (('find', len(phrases)), ('trie', 0)):
+            matcher = PhraseMatcher(phrases, find_max_phrases=find_max_phrases)
+            start = time.perf_counter()
+            tags[method] = matcher.tag(sentences)
+            timings[method] = time.perf_counter() - start
+        
+        patterns = [phrase.lower() for phrase in phrases]
+        start = time.perf_counter()
+        expected = [[i for i, phrase in enumerate(patterns) if phrase in sentence] for sentence in lowered]
+        per_sentence_s = time.perf_counter() - start
+        
+        chosen = 'find' if PhraseMatcher(phrases).use_find else 'trie'
+        logger.info(f"{label} ({len(phrases)}): find {timings['find']:.2f}s, trie regex {timings['trie']:.2f}s "
+                    f"(using {chosen}), per-sentence scans {per_sentence_s:.2f}s, "
+                    f"same tags: {all(method_tags == expected for method_tags in tags.values())}")
+    
+    start = time.perf_counter()
+    entries = asyncio.run(router.extract_faq_entries(transcript))
+    logger.info(f"FAQ extraction from {n_words} words ({len(sentences)} sentences): "
+                f"{time.perf_counter() - start:.2f}s, {len(entries)} entries")
+
+def synthetic_animation_frames(seconds: float, fps: int = 30, n_blendshapes: int = 52, seed: int = 0) -> list:
+    """Audio2Face-style frames: one dict of blendshape weights per frame."""
+    rng = np.random.default_rng(seed)
+    names = [f"blendshape{i}" for i in range(n_blendshapes)]
+    weights = np.clip(np.cumsum(rng.normal(0, 0.05, (int(seconds * fps), n_blendshapes)), axis=0), 0, 1)
+    
+    return [
+        {
+            'timestamp': row / fps,
+            'blendshapes': dict(zip(names, values.tolist())),
+            'head_rotation': [0.0, 0.0, 0.0],
+            'eye_gaze': [0.0, 0.0]
+        }
+        for row, values in enumerate(weights)
+    ]
+
+def benchmark_blendshape_timeline(seconds: float = 60.0, display_fps: int = 60):
+    """Drive a 60 fps display from a 30 fps track: per-frame dict lookups vs one batch interpolation."""
+    import json
+    from blendshape_timeline import BlendshapeTimeline
+    
+    frames = synthetic_animation_frames(seconds)
+    display_times = np.arange(int(seconds * display_fps)) / display_fps
+    
+    # Previous representation: nearest frame, one dict per display frame
+    start = time.perf_counter()
+    for t in display_times:
+        frame_num = min(int(t * 30), len(frames) - 1)
+        _ = frames[frame_num]['blendshapes']
+    nearest_elapsed = time.perf_counter() - start
+    
+    timeline = BlendshapeTimeline.from_frames(frames, 30)
+    
+    start = time.perf_counter()
+    for t in display_times:
+        _ = timeline.at(t)
+    single_elapsed = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    values = timeline.sample(display_times, method='cubic')
+    batch_elapsed = time.perf_counter() - start
+    
+    frames_size = len(json.dumps(frames))
+    timeline_size = len(json.dumps(timeline.to_dict()))
+    
+    logger.info(f"Blendshapes at {display_fps} fps for {seconds:.0f}s ({len(display_times)} frames x {values.shape[1]} channels): "
+                f"nearest dict lookup {nearest_elapsed * 1000:.1f} ms, linear one at a time {single_elapsed * 1000:.1f} ms, "
+                f"cubic batch {batch_elapsed * 1000:.2f} ms")
+    logger.info(f"Serialized track: {frames_size / 1e3:.0f} kB as frame dicts, {timeline_size / 1e3:.0f} kB columnar")
+
+def benchmark_audio_features(seconds: float = 60.0, sample_rate: int = 22050, frame_rate: float = 60.0):
+    """Cost of the TouchDesigner feature stream per second of audio: frame loop vs one vectorized pass."""
+    from audio_features import AudioFeatureExtractor
+    
+    audio = synthetic_session(seconds, sample_rate)
+    extractor = AudioFeatureExtractor(sample_rate, frame_rate)
+    extractor.extract(audio[:sample_rate])  # Warm up the band matrix cache
+    
+    # One FFT per frame in a Python loop
+    half = extractor.fft_size // 2
+    padded = np.pad(audio, (half, half + extractor.fft_size))
+    hop = sample_rate / frame_rate
+    start = time.perf_counter()
+    for index in range(int(np.ceil(seconds * frame_rate))):
+        offset = int(round(index * hop))
+        window = padded[offset:offset + extractor.fft_size]
+        _ = np.sqrt(np.mean(np.square(window)))
+        _ = np.abs(np.fft.rfft(window * extractor.window))
+    loop_elapsed = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    features = extractor.extract(audio)
+    batch_elapsed = time.perf_counter() - start
+    
+    logger.info(f"Audio features at {frame_rate:.0f} Hz for {seconds:.0f}s ({len(features)} frames, {extractor.fft_size}-point STFT): "
+                f"frame loop {loop_elapsed / seconds * 1000:.2f} ms, vectorized {batch_elapsed / seconds * 1000:.2f} ms "
+                f"per second of audio")
+
+def benchmark_osc_output(seconds: float = 60.0, fps: int = 60, n_blendshapes: int = 52):
+    """OSC to a local UDP sink at display rate: one datagram per value vs one bundle per frame."""
+    import socket
+    from osc_bundle import OSCSender
+    
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    sink.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+    sink.setblocking(False)
+    port = sink.getsockname()[1]
+    
+    def drain() -> int:
+        received = 0
+        while True:
+            try:
+                sink.recv(65536)
+            except BlockingIOError:
+                return received
+            received += 1
+    
+    addresses = [f"/a2f/blendshape/blendshape{i}" for i in range(n_blendshapes)]
+    addresses += ["/audio/level", "/audio/onset", "/audio/low", "/audio/mid", "/audio/high"]
+    frames = np.random.default_rng(0).random((int(seconds * fps), len(addresses)))
+    
+    results = {}
+    for mode in ('per_value', 'bundle'):
+        sender = OSCSender("127.0.0.1", port)
+        received = 0
+        cpu = 0.0
+        for row in frames:
+            start = time.process_time()
+            if mode == 'bundle':
+                sender.send_bundle(addresses, row)
+            else:
+                for address, value in zip(addresses, row):
+                    sender.send_bundle([address], [value])
+            cpu += time.process_time() - start
+            received += drain()
+        results[mode] = (sender.bundles_sent / seconds, cpu / seconds, received, sender.bytes_sent)
+        sender.close()
+    sink.close()
+    
+    for mode, (packet_rate, cpu, received, sent_bytes) in results.items():
+        logger.info(f"OSC {mode} at {fps} fps x {len(addresses)} values: {packet_rate:.0f} packets/s, "
+                    f"CPU {cpu * 1000:.1f} ms per second, {received} packets received, {sent_bytes / seconds / 1e3:.0f} kB/s")
+
+def benchmark_liveportrait_batches(seconds: float = 10.0, fps: int = 25, batch_sizes=(1, 4, 16)):
+    """Blendshapes to landmarks per frame vs vectorized, then LivePortrait frames/sec per batch size."""
+    import asyncio
+    from face_landmarks import DRIVING_BLENDSHAPES, NEUTRAL_LANDMARKS, blendshape_weights, weights_to_landmarks
+    
+    rng = np.random.default_rng(0)
+    n_frames = int(seconds * fps)
+    track = [dict(zip(DRIVING_BLENDSHAPES, rng.random(len(DRIVING_BLENDSHAPES)).tolist())) for _ in range(n_frames)]
+    
+    # Previous conversion: one copy and a handful of index-list updates per frame
+    start = time.perf_counter()
+    for blendshapes in track:
+        landmarks = NEUTRAL_LANDMARKS.copy()
+        landmarks[list(range(48, 68)), 1] += blendshapes['jawOpen'] * 20
+        landmarks[[48, 54], 0] += np.array([-10, 10]) * blendshapes['mouthSmile']
+        landmarks[[48, 54], 1] -= blendshapes['mouthSmile'] * 5
+        landmarks[list(range(17, 27)), 1] -= blendshapes['browInnerUp'] * 10
+        landmarks[[37, 38, 39], 1] += blendshapes['eyeBlinkLeft'] * 5
+        landmarks[[43, 44, 45], 1] += blendshapes['eyeBlinkRight'] * 5
+    loop_elapsed = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    landmarks = weights_to_landmarks(blendshape_weights(track))
+    batch_elapsed = time.perf_counter() - start
+    
+    logger.info(f"Landmarks for {n_frames} frames {landmarks.shape}: per frame {loop_elapsed * 1000:.1f} ms, "
+                f"vectorized {batch_elapsed * 1000:.2f} ms")
+    
+    try:
+        from liveportrait_integration import LivePortraitIntegration
+        liveportrait = LivePortraitIntegration()
+    except ImportError as e:
+        logger.warning(f"LivePortrait dependencies missing ({e}); skipping generator batches")
+        return
+    if not liveportrait.model or liveportrait.source_latent is None:
+        logger.warning("LivePortrait model or source portrait unavailable; skipping generator batches")
+        return
+    
+    async def render(batch_size: int) -> int:
+        return len([frame async for frame in liveportrait.stream_animation(track, batch_size)])
+    
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        rendered = asyncio.run(render(batch_size))
+        elapsed = time.perf_counter() - start
+        logger.info(f"LivePortrait on {liveportrait.device}, batch size {batch_size}: {rendered / elapsed:.1f} frames/s")
+
+BENCHMARKS: Dict[str, Callable] = {
+    'vad': benchmark_energy_vad,
+    'resample': benchmark_resample,
+    'tts': benchmark_sentence_tts,
+    'faq': benchmark_faq_index,
+    'faq_extraction': benchmark_faq_extraction,
+    'blendshapes': benchmark_blendshape_timeline,
+    'features': benchmark_audio_features,
+    'osc': benchmark_osc_output,
+    'liveportrait': benchmark_liveportrait_batches,
+}
+
+def main():
+    """Run the named benchmarks (all by default)."""
+    names = sys.argv[1:] or list(BENCHMARKS)
+    
+    for name in names:
+        if name not in BENCHMARKS:
+            logger.error(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            continue
+        BENCHMARKS[name]()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Columnar blendshape animation tracks.
+An Audio2Face track is kept as one (frames x channels) float32 array with
+a channel-name index, rather than a dict per frame. Sampling at arbitrary
+times (one timestamp or a whole render tick's worth) is a vectorized
+linear or Catmull-Rom cubic interpolation, so a 30 fps track can drive
+the hologram at 60 fps smoothly. Tracks serialize compactly as base64
+float16 values.
+"""
+
+import base64
+import logging
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TIMELINE_FORMAT = 'blendshape_timeline/1'
+
+# Per-frame vectors stored as extra channels alongside the blendshapes
+VECTOR_CHANNELS = {
+    'head_rotation': ['headRotationX', 'headRotationY', 'headRotationZ'],
+    'eye_gaze': ['eyeGazeX', 'eyeGazeY']
+}
+
+class BlendshapeTimeline:
+    """Keyframed animation channels with vectorized interpolation."""
+    
+    def __init__(self, times: np.ndarray, values: np.ndarray, channels: Sequence[str], fps: float = 30.0):
+        """
+        Initialize timeline.
+        
+        Args:
+            times: Keyframe timestamps in seconds, ascending
+            values: Keyframe values, shape (frames, channels)
+            channels: Channel names, one per column
+            fps: Nominal frame rate of the track
+        """
+        self.times = np.asarray(times, dtype=np.float64)
+        self.values = np.asarray(values, dtype=np.float32).reshape(len(self.times), len(channels))
+        self.channels = list(channels)
+        self.channel_index = {name: column for column, name in enumerate(self.channels)}
+        self.fps = fps
+        
+        vector_names = {name for names in VECTOR_CHANNELS.values() for name in names}
+        self.blendshape_channels = [name for name in self.channels if name not in vector_names]
+        
+        # Cubic interpolation never leaves the range of its keyframes
+        if len(self.times):
+            self.minimum = self.values.min(axis=0)
+            self.maximum = self.values.max(axis=0)
+    
+    @classmethod
+    def from_frames(cls, frames: Iterable[Dict], fps: float = 30.0) -> "BlendshapeTimeline":
+        """
+        Build a timeline from Audio2Face frames.
+        
+        Args:
+            frames: Dicts with 'timestamp' (or 'time'), 'blendshapes' and
+                optionally 'head_rotation' and 'eye_gaze'
+            fps: Frame rate of the track
+        """
+        frames = list(frames)
+        channel_index: Dict[str, int] = {}
+        for frame in frames:
+            for name in frame['blendshapes']:
+                channel_index.setdefault(name, len(channel_index))
+        
+        vectors = [key for key in VECTOR_CHANNELS if any(key in frame for frame in frames)]
+        for key in vectors:
+            for name in VECTOR_CHANNELS[key]:
+                channel_index.setdefault(name, len(channel_index))
+        
+        times = np.empty(len(frames), dtype=np.float64)
+        values = np.zeros((len(frames), len(channel_index)), dtype=np.float32)
+        
+        for row, frame in enumerate(frames):
+            times[row] = frame['timestamp'] if 'timestamp' in frame else frame['time']
+            blendshapes = frame['blendshapes']
+            values[row, [channel_index[name] for name in blendshapes]] = list(blendshapes.values())
+            for key in vectors:
+                if key in frame:
+                    values[row, [channel_index[name] for name in VECTOR_CHANNELS[key]]] = frame[key]
+        
+        order = np.argsort(times, kind='stable')
+        return cls(times[order], values[order], list(channel_index), fps)
+    
+    @property
+    def duration(self) -> float:
+        return float(self.times[-1]) if len(self.times) else 0.0
+    
+    def __len__(self) -> int:
+        return len(self.times)
+    
+    def columns(self, channels: Optional[Sequence[str]]) -> Optional[np.ndarray]:
+        """Column numbers of the named channels (None for all channels)."""
+        if channels is None:
+            return None
+        return np.array([self.channel_index[name] for name in channels], dtype=np.int64)
+    
+    def sample(self, times, channels: Optional[Sequence[str]] = None, method: str = 'linear') -> np.ndarray:
+        """
+        Interpolate the track at many times at once.
+        
+        Args:
+            times: Timestamps in seconds (clamped to the track)
+            channels: Channel names to return (all by default)
+            method: 'linear', 'cubic' (Catmull-Rom) or 'nearest'
+        
+        Returns:
+            Array of shape (len(times), channels), float32
+        """
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+        columns = self.columns(channels)
+        values = self.values if columns is None else self.values[:, columns]
+        n_frames = len(self.times)
+        
+        if n_frames == 0:
+            return np.zeros((len(times), values.shape[1]), dtype=np.float32)
+        if n_frames == 1:
+            return np.repeat(values, len(times), axis=0)
+        
+        # Segment [i, i + 1] containing each time, and the position within it
+        i = np.clip(np.searchsorted(self.times, times, side='right') - 1, 0, n_frames - 2)
+        t0, t1 = self.times[i], self.times[i + 1]
+        span = np.where(t1 > t0, t1 - t0, 1.0)
+        u = np.clip((times - t0) / span, 0.0, 1.0)[:, None].astype(np.float32)
+        
+        v1 = values[i]
+        v2 = values[i + 1]
+        
+        if method == 'nearest':
+            return np.where(u < 0.5, v1, v2)
+        if method == 'linear':
+            return v1 + u * (v2 - v1)
+        if method != 'cubic':
+            raise ValueError(f"Unknown interpolation method: {method}")
+        
+        v0 = values[np.maximum(i - 1, 0)]
+        v3 = values[np.minimum(i + 2, n_frames - 1)]
+        u2 = u * u
+        u3 = u2 * u
+        result = 0.5 * (2.0 * v1 + (v2 - v0) * u
+                        + (2.0 * v0 - 5.0 * v1 + 4.0 * v2 - v3) * u2
+                        + (3.0 * (v1 - v2) + v3 - v0) * u3)
+        if columns is None:
+            return np.clip(result, self.minimum, self.maximum)
+        return np.clip(result, self.minimum[columns], self.maximum[columns])
+    
+    def at(self, time: float, method: str = 'linear', channels: Optional[Sequence[str]] = None) -> Dict[str, float]:
+        """Channel values at one time, by name (all channels by default)."""
+        names = self.channels if channels is None else list(channels)
+        row = self.sample(time, channels, method=method)[0]
+        return dict(zip(names, row.tolist()))
+    
+    def resample(self, fps: float, method: str = 'cubic') -> "BlendshapeTimeline":
+        """The track at a different frame rate (e.g. the 60 fps display rate)."""
+        if len(self.times) == 0:
+            return BlendshapeTimeline(self.times, self.values, self.channels, fps)
+        
+        start = float(self.times[0])
+        n_frames = int(np.floor((self.duration - start) * fps + 1e-9)) + 1
+        times = start + np.arange(n_frames) / fps
+        return BlendshapeTimeline(times, self.sample(times, method=method), self.channels, fps)
+    
+    def to_dict(self) -> Dict:
+        """Compact JSON-friendly form (float16 values, base64)."""
+        return {
+            'format': TIMELINE_FORMAT,
+            'fps': self.fps,
+            'channels': self.channels,
+            'frames': len(self.times),
+            'times': base64.b64encode(self.times.astype('<f4').tobytes()).decode('ascii'),
+            'values': base64.b64encode(self.values.astype('<f2').tobytes()).decode('ascii')
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BlendshapeTimeline":
+        """Inverse of to_dict."""
+        times = np.frombuffer(base64.b64decode(data['times']), dtype='<f4')
+        values = np.frombuffer(base64.b64decode(data['values']), dtype='<f2').reshape(data['frames'], len(data['channels']))
+        return cls(times, values, data['channels'], data.get('fps', 30.0))
+
+def encode_json(obj):
+    """json.dumps default hook: writes timelines in their compact form."""
+    if isinstance(obj, BlendshapeTimeline):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def decode_json(data: Dict):
+    """json.loads object hook: restores timelines written by encode_json."""
+    if data.get('format') == TIMELINE_FORMAT:
+        return BlendshapeTimeline.from_dict(data)
+    return data
@@ -0,0 +1,197 @@
+"""
+Pre-render audio for every FAQ answer.
+Walks the FAQ database, synthesizes each response with the configured TTS
+engine and voice (several at a time), writes loudness-normalized 16-bit
+WAV files at the server's sample rate and records their paths back in
+the database, so FAQ hits play straight from disk instead of running TTS.
+
+The build is incremental: each entry stores a hash of its response text
+and the voice settings, and only entries whose hash changed (or whose
+file is missing) are re-rendered. Files are named by that hash, so
+entries with identical answers share one file; files no entry refers to
+any more are removed.
+
+Usage: python build_faq_audio.py [--db faq_database.json] [--out faq_audio]
+                                 [--processes 4] [--sample-rate 16000] [--higgs] [--force]
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import soundfile as sf
+
+from local_tts_lite import LocalTTSHandler
+from audio_utils import resample
+from faq_store import FAQStore
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SERVER_SAMPLE_RATE = 16000  # VoiceConversationServer.sample_rate
+TARGET_RMS_DB = -20.0  # Loudness target for all answers
+PEAK_CEILING_DB = -1.0  # Never louder than this at the peak
+
+def voice_signature(tts: LocalTTSHandler, sample_rate: int) -> Dict:
+    """Settings that change how an answer sounds; a change re-renders every entry."""
+    voice_info = tts.get_voice_info()
+    current_voice = voice_info.get('pyttsx3', {}).get('current_voice') or {}
+    
+    return {
+        'engine': 'higgs' if tts.get_available_engines().get('higgs') else 'pyttsx3',
+        'voice': current_voice.get('id'),
+        'rate': tts.voice_speed,
+        'volume': tts.voice_volume,
+        'sample_rate': sample_rate
+    }
+
+def render_hash(text: str, signature: Dict) -> str:
+    """Hash of the response text and voice settings an audio file was rendered from."""
+    payload = json.dumps({'text': text, 'voice': signature}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+def normalize_loudness(audio: np.ndarray) -> np.ndarray:
+    """Scale to the target RMS level, limited by the peak ceiling."""
+    rms = float(np.sqrt(np.mean(np.square(audio, dtype=np.float64))))
+    peak = float(np.max(np.abs(audio)))
+    if rms == 0.0 or peak == 0.0:
+        return audio
+    
+    gain = min(10 ** (TARGET_RMS_DB / 20) / rms, 10 ** (PEAK_CEILING_DB / 20) / peak)
+    return (audio * gain).astype(np.float32)
+
+async def build_faq_audio(db_path: str = "faq_database.json", out_dir: str = "faq_audio",
+                          processes: int = 4, sample_rate: int = SERVER_SAMPLE_RATE,
+                          use_higgs: bool = False, force: bool = False) -> Dict:
+    """
+    Render missing or outdated FAQ audio and update the database.
+    
+    Args:
+        db_path: FAQ database written by FAQRouter
+        out_dir: Directory for the rendered WAV files
+        processes: Answers synthesized at once (pyttsx3 processes)
+        sample_rate: Sample rate of the written files (the server's rate)
+        use_higgs: Render with Higgs Audio instead of pyttsx3
+        force: Re-render every entry
+    
+    Returns:
+        Counts of rendered, reused and failed entries and removed files
+    """
+    out_path = Path(out_dir)
+    out_path.mkdir(parents=True, exist_ok=True)
+    
+    # Snapshot plus journaled additions; saving writes a fresh snapshot atomically
+    store = FAQStore(db_path, lambda: data)
+    data = await store.load()
+    entries: List[Dict] = data.get('entries', [])
+    
+    tts = LocalTTSHandler(use_higgs=use_higgs, synthesis_processes=processes)
+    await tts.initialize_engines()
+    if use_higgs and not await tts.higgs_pool.wait_ready():
+        logger.warning("Higgs did not start - rendering with pyttsx3")
+    
+    signature = voice_signature(tts, sample_rate)
+    logger.info(f"Rendering FAQ audio with {signature}")
+    
+    # Entries with the same answer share one rendering
+    jobs: Dict[str, str] = {}
+    reused = 0
+    for entry in entries:
+        digest = render_hash(entry['response'], signature)
+        audio_file = out_path / f"{digest}.wav"
+        
+        if not force and entry.get('audio_hash') == digest and audio_file.exists():
+            entry['audio_file'] = str(audio_file)
+            reused += 1
+            continue
+        
+        entry['audio_hash'] = digest
+        entry['audio_file'] = None
+        jobs.setdefault(digest, entry['response'])
+    
+    semaphore = asyncio.Semaphore(max(1, processes))
+    
+    async def render(digest: str, text: str) -> Optional[str]:
+        async with semaphore:
+            audio = await tts.synthesize_speech(text)
+        if audio is None or len(audio) == 0:
+            logger.error(f"No audio for '{text[:40]}...'")
+            return None
+        
+        audio = normalize_loudness(resample(audio, tts.sample_rate, sample_rate))
+        audio_file = out_path / f"{digest}.wav"
+        sf.write(audio_file, audio, sample_rate, subtype='PCM_16')
+        return str(audio_file)
+    
+    start = time.perf_counter()
+    digests = list(jobs)
+    results = await asyncio.gather(*(render(digest, jobs[digest]) for digest in digests))
+    rendered = dict(zip(digests, results))
+    
+    failed = 0
+    for entry in entries:
+        digest = entry.get('audio_hash')
+        if digest in rendered:
+            entry['audio_file'] = rendered[digest]
+            if rendered[digest] is None:
+                # Retried on the next build
+                entry.pop('audio_hash')
+                failed += 1
+    
+    # Remove renderings of answers that changed or were deleted
+    referenced = {Path(entry['audio_file']).name for entry in entries if entry.get('audio_file')}
+    removed = 0
+    for audio_file in out_path.glob('*.wav'):
+        if audio_file.name not in referenced:
+            audio_file.unlink()
+            removed += 1
+    
+    await store.save()
+    
+    if tts.process_pool:
+        tts.process_pool.stop()
+    if tts.higgs_pool:
+        tts.higgs_pool.stop()
+    
+    summary = {
+        'rendered': sum(result is not None for result in results),
+        'reused': reused,
+        'failed': failed,
+        'removed_files': removed,
+        'seconds': round(time.perf_counter() - start, 1)
+    }
+    logger.info(f"FAQ audio build: {summary}")
+    return summary
+
+def main():
+    """Build FAQ audio with the options given on the command line."""
+    args = sys.argv[1:]
+    options = {}
+    
+    for flag, key, convert in (('--db', 'db_path', str), ('--out', 'out_dir', str),
+                               ('--processes', 'processes', int), ('--sample-rate', 'sample_rate', int)):
+        if flag in args:
+            index = args.index(flag)
+            options[key] = convert(args[index + 1])
+            del args[index:index + 2]
+    
+    for flag, key in (('--higgs', 'use_higgs'), ('--force', 'force')):
+        if flag in args:
+            args.remove(flag)
+            options[key] = True
+    
+    if args:
+        print(__doc__)
+        return
+    
+    asyncio.run(build_faq_audio(**options))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Replay recorded kiosk sessions through the end-of-speech detector.
+Compares the fixed silence hangover with the adaptive endpointer and
+reports median turn gap and false cut-offs.
+
+Session files are JSON:
+    {
+        "frames": [{"t": 0.00, "speech_prob": 0.02, "partial": ""}, ...],
+        "turn_ends": [3.4, 11.2]
+    }
+where "frames" are VAD outputs in time order (with the latest streaming
+transcript, if any) and "turn_ends" are the labelled times at which each
+visitor turn really ended. Instead of "frames" a session may name an
+"audio" file; frames are then computed with the energy VAD.
+
+Usage: python endpoint_replay.py session1.json [session2.json ...] [--config endpointer_config.json]
+"""
+
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from vad_handler import VADHandler
+from endpointer import AdaptiveEndpointer
+from audio_utils import to_mono
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# An endpoint within this many seconds of a labelled turn end counts as correct
+TURN_END_TOLERANCE = 0.25
+
+def load_session(path: str, frame_duration: float = 0.032) -> Dict:
+    """Load a session file, deriving VAD frames from audio if needed."""
+    with open(path, 'r', encoding='utf-8') as f:
+        session = json.load(f)
+    
+    if 'frames' not in session and 'audio' in session:
+        import soundfile as sf
+        
+        audio_path = Path(path).parent / session['audio']
+        audio, sample_rate = sf.read(audio_path, dtype='float32')
+        audio = to_mono(audio)
+        
+        vad = VADHandler()
+        hop = int(frame_duration * sample_rate)
+        session['frames'] = [
+            {'t': i / sample_rate, 'speech_prob': vad.energy_based_vad(audio[i:i + hop])}
+            for i in range(0, len(audio) - hop + 1, hop)
+        ]
+    
+    session.setdefault('turn_ends', [])
+    return session
+
+def replay_session(session: Dict, endpointer: Optional[AdaptiveEndpointer]) -> List[Dict]:
+    """
+    Run one session through the VAD state machine.
+    
+    Returns:
+        List of endpoint events with the time they fired and the time of
+        the last detected speech
+    """
+    vad = VADHandler()
+    vad.speech_state.endpointer = endpointer
+    vad.reset_state()
+    
+    endpoints = []
+    
+    for frame in session['frames']:
+        if endpointer is not None and 'partial' in frame:
+            endpointer.update_transcript(frame['partial'])
+        
+        last_speech_time = vad.speech_state.last_speech_time
+        state = vad.update_speech_state(frame['speech_prob'], frame['t'])
+        
+        if state['event'] in ('speech_end', 'speech_timeout'):
+            endpoints.append({
+                'fired_at': frame['t'],
+                'last_speech': last_speech_time if last_speech_time is not None else frame['t']
+            })
+    
+    return endpoints
+
+def score_endpoints(endpoints: List[Dict], turn_ends: List[float]) -> Dict:
+    """Match endpoints to labelled turn ends."""
+    gaps = []
+    false_cutoffs = 0
+    matched = set()
+    
+    for endpoint in endpoints:
+        # First labelled turn end that is not clearly before this speech
+        candidates = [t for t in turn_ends if t >= endpoint['last_speech'] - TURN_END_TOLERANCE]
+        
+        if candidates and candidates[0] <= endpoint['last_speech'] + TURN_END_TOLERANCE:
+            gaps.append(endpoint['fired_at'] - candidates[0])
+            matched.add(candidates[0])
+        else:
+            # The visitor had more to say in this turn
+            false_cutoffs += 1
+    
+    return {
+        'gaps': gaps,
+        'false_cutoffs': false_cutoffs,
+        'missed_turns': len([t for t in turn_ends if t not in matched]),
+        'turns': len(turn_ends)
+    }
+
+def summarize(results: List[Dict]) -> Dict:
+    """Aggregate per-session scores."""
+    gaps = np.array([gap for result in results for gap in result['gaps']])
+    turns = sum(result['turns'] for result in results)
+    false_cutoffs = sum(result['false_cutoffs'] for result in results)
+    
+    return {
+        'turns': turns,
+        'median_turn_gap': float(np.median(gaps)) if len(gaps) else None,
+        'p90_turn_gap': float(np.percentile(gaps, 90)) if len(gaps) else None,
+        'false_cutoffs': false_cutoffs,
+        'false_cutoff_rate': false_cutoffs / turns if turns else None,
+        'missed_turns': sum(result['missed_turns'] for result in results)
+    }
+
+def replay(session_paths: List[str], config_path: Optional[str] = None) -> Dict[str, Dict]:
+    """Replay sessions with the fixed and adaptive policies."""
+    sessions = [load_session(path) for path in session_paths]
+    
+    fixed_results = [
+        score_endpoints(replay_session(session, None), session['turn_ends'])
+        for session in sessions
+    ]
+    adaptive_results = [
+        score_endpoints(replay_session(session, AdaptiveEndpointer(config_path)), session['turn_ends'])
+        for session in sessions
+    ]
+    
+    return {
+        'fixed': summarize(fixed_results),
+        'adaptive': summarize(adaptive_results)
+    }
+
+def main():
+    """Replay the sessions given on the command line."""
+    args = sys.argv[1:]
+    config_path = None
+    
+    if '--config' in args:
+        index = args.index('--config')
+        config_path = args[index + 1]
+        del args[index:index + 2]
+    
+    if not args:
+        print(__doc__)
+        return
+    
+    report = replay(args, config_path)
+    
+    for policy, summary in report.items():
+        logger.info(f"{policy}: {json.dumps(summary)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Adaptive end-of-speech detection for the conversation system.
+Shortens the silence hangover when the visitor has clearly finished a
+thought and lengthens it after fillers, instead of always waiting a
+fixed second before answering.
+"""
+
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENDPOINTER_CONFIG = {
+    "base_hangover": 0.8,  # seconds of silence when nothing else is known
+    "complete_hangover": 0.35,  # transcript ends a sentence or question
+    "prosody_hangover": 0.5,  # final rise/fall in pitch, transcript unknown
+    "filler_hangover": 1.5,  # transcript ends on a filler or conjunction
+    "min_hangover": 0.25,
+    "max_hangover": 2.0,
+    "min_pitch_change": 2.0,  # semitones between the last voiced frames
+    "filler_words": [
+        "um", "uh", "er", "erm", "hmm", "mm", "like", "so", "and", "but",
+        "or", "because", "the", "a", "an", "to", "of", "with", "my", "i"
+    ],
+    "question_starters": [
+        "what", "why", "how", "when", "where", "who", "which", "is", "are",
+        "do", "does", "did", "can", "could", "would", "will", "should", "have"
+    ]
+}
+
+class AdaptiveEndpointer:
+    def __init__(self, config_path: str = "../config/endpointer_config.json", config: Optional[Dict] = None):
+        """
+        Initialize the adaptive endpointer.
+        
+        Args:
+            config_path: Per-deployment JSON overrides of DEFAULT_ENDPOINTER_CONFIG
+                (the shipped ../config/endpointer_config.json documents every key)
+            config: Explicit overrides (take precedence over the file)
+        """
+        self.config = self.load_config(config_path)
+        if config:
+            self.config.update(config)
+        
+        self.filler_words = set(self.config['filler_words'])
+        self.question_starters = set(self.config['question_starters'])
+        
+        # Cues for the current utterance
+        self.partial_transcript = ""
+        self.terminal_contour = None  # 'rising', 'falling' or None
+        
+        logger.info(f"Adaptive endpointer initialized (base hangover: {self.config['base_hangover']}s)")
+    
+    def load_config(self, config_path: Optional[str]) -> Dict:
+        """Load endpointer settings, falling back to defaults for missing keys ('_' keys are notes)."""
+        config = dict(DEFAULT_ENDPOINTER_CONFIG)
+        
+        if config_path and Path(config_path).exists():
+            try:
+                with open(config_path, 'r') as f:
+                    overrides = json.load(f)
+                config.update({key: value for key, value in overrides.items() if not key.startswith('_')})
+                logger.info(f"Loaded endpointer config from {config_path}")
+            except Exception as e:
+                logger.error(f"Error loading endpointer config {config_path}: {e}")
+        
+        return config
+    
+    def update_transcript(self, partial_text: str):
+        """Record the latest partial transcript from the streaming recognizer."""
+        self.partial_transcript = (partial_text or "").strip()
+    
+    def observe_audio(self, audio: np.ndarray, sample_rate: int):
+        """Update the prosody cue from the most recent speech audio."""
+        self.terminal_contour = self.estimate_terminal_contour(audio, sample_rate)
+    
+    def reset(self):
+        """Forget cues from the previous utterance."""
+        self.partial_transcript = ""
+        self.terminal_contour = None
+    
+    def classify_transcript(self, text: str) -> Optional[str]:
+        """
+        Classify how a partial transcript ends.
+        
+        Returns:
+            'complete', 'filler' or None when the transcript gives no cue
+        """
+        if not text:
+            return None
+        
+        if re.search(r'[.?!]["\')\]]*$', text):
+            return 'complete'
+        
+        words = re.findall(r"[a-z']+", text.lower())
+        if not words:
+            return None
+        
+        if words[-1] in self.filler_words:
+            return 'filler'
+        
+        # Recognizers often drop punctuation on questions; a question word
+        # alone is not enough ("how did you become a writer when..."), so a
+        # question only counts as finished when the pitch rose at its end
+        if words[0] in self.question_starters and len(words) >= 3 and self.terminal_contour == 'rising':
+            return 'complete'
+        
+        return None
+    
+    def estimate_terminal_contour(self, audio: np.ndarray, sample_rate: int) -> Optional[str]:
+        """
+        Estimate whether pitch rises or falls over the last voiced audio.
+        
+        Uses FFT autocorrelation on the final 400 ms split into four frames.
+        
+        Returns:
+            'rising', 'falling' or None when no clear contour is found
+        """
+        try:
+            frame_size = int(0.1 * sample_rate)
+            if len(audio) < frame_size * 4:
+                return None
+            
+            frames = np.asarray(audio[-frame_size * 4:], dtype=np.float32).reshape(4, frame_size)
+            frames = frames - frames.mean(axis=1, keepdims=True)
+            
+            # Autocorrelation of all frames in one batched FFT
+            n_fft = 1 << (2 * frame_size - 1).bit_length()
+            spectrum = np.fft.rfft(frames, n_fft, axis=1)
+            autocorr = np.fft.irfft(spectrum * np.conj(spectrum), n_fft, axis=1)[:, :frame_size]
+            
+            # Search lags for 70-400 Hz speech pitch
+            min_lag = int(sample_rate / 400)
+            max_lag = min(int(sample_rate / 70), frame_size - 1)
+            lags = np.argmax(autocorr[:, min_lag:max_lag], axis=1) + min_lag
+            peak = autocorr[np.arange(4), lags]
+            voiced = peak > 0.3 * autocorr[:, 0]
+            
+            if np.count_nonzero(voiced) < 2:
+                return None
+            
+            pitch = sample_rate / lags[voiced]
+            change = 12 * np.log2(pitch[-1] / pitch[0])
+            
+            if change >= self.config['min_pitch_change']:
+                return 'rising'
+            if change <= -self.config['min_pitch_change']:
+                return 'falling'
+            return None
+        
+        except Exception as e:
+            logger.error(f"Error estimating pitch contour: {e}")
+            return None
+    
+    def get_hangover(self) -> float:
+        """Silence duration (seconds) that ends the current utterance."""
+        transcript_cue = self.classify_transcript(self.partial_transcript)
+        
+        if transcript_cue == 'filler':
+            hangover = self.config['filler_hangover']
+        elif transcript_cue == 'complete':
+            hangover = self.config['complete_hangover']
+        elif self.terminal_contour is not None:
+            hangover = self.config['prosody_hangover']
+        else:
+            hangover = self.config['base_hangover']
+        
+        return float(np.clip(hangover, self.config['min_hangover'], self.config['max_hangover']))
+    
+    def get_config(self) -> Dict:
+        """Get current endpointer configuration and cues."""
+        return {
+            **{key: value for key, value in self.config.items() if not isinstance(value, list)},
+            'partial_transcript': self.partial_transcript,
+            'terminal_contour': self.terminal_contour,
+            'current_hangover': self.get_hangover()
+        }
@@ -0,0 +1,117 @@
+"""
+Facial landmarks driven by Audio2Face blendshapes.
+Each supported blendshape moves a fixed set of the 68 landmark points
+linearly with its weight, so a whole track converts in one matrix
+product: (frames x blendshapes) weights times a (blendshapes x 136)
+displacement basis, added to the neutral face. This gives the
+(frames x 68 x 2) driving tensor for batched LivePortrait inference.
+"""
+
+import logging
+from typing import Dict, Iterable, Union
+
+import numpy as np
+
+from blendshape_timeline import BlendshapeTimeline
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Blendshapes that move landmarks, in basis order
+DRIVING_BLENDSHAPES = ('jawOpen', 'mouthSmile', 'browInnerUp', 'eyeBlinkLeft', 'eyeBlinkRight')
+
+# Simplified neutral face landmarks (68 points)
+# In practice, extract from source image using dlib/mediapipe
+NEUTRAL_LANDMARKS = np.array([
+    # Jaw line (17 points)
+    [100, 200], [105, 220], [110, 240], [120, 260], [130, 275],
+    [145, 285], [165, 295], [185, 300], [205, 295], [225, 285],
+    [240, 275], [250, 260], [260, 240], [265, 220], [270, 200],
+    [275, 180], [280, 160],
+    
+    # Right eyebrow (5 points)
+    [120, 140], [130, 135], [145, 135], [160, 140], [170, 145],
+    
+    # Left eyebrow (5 points)
+    [200, 145], [210, 140], [225, 135], [240, 135], [250, 140],
+    
+    # Nose bridge (4 points)
+    [185, 165], [185, 180], [185, 195], [185, 210],
+    
+    # Nose tip (5 points)
+    [165, 220], [175, 225], [185, 230], [195, 225], [205, 220],
+    
+    # Right eye (6 points)
+    [130, 165], [140, 160], [155, 160], [165, 165], [155, 170], [140, 170],
+    
+    # Left eye (6 points)
+    [205, 165], [215, 160], [230, 160], [240, 165], [230, 170], [215, 170],
+    
+    # Outer mouth (12 points)
+    [150, 250], [160, 245], [170, 240], [185, 242], [200, 240],
+    [210, 245], [220, 250], [210, 260], [200, 265], [185, 267],
+    [170, 265], [160, 260],
+    
+    # Inner mouth (8 points)
+    [160, 250], [170, 248], [185, 250], [200, 248], [210, 250],
+    [200, 255], [185, 257], [170, 255]
+], dtype=np.float32)
+
+def landmark_basis() -> np.ndarray:
+    """Landmark displacement per unit weight of each driving blendshape, shape (blendshapes, 68, 2)."""
+    basis = np.zeros((len(DRIVING_BLENDSHAPES), 68, 2), dtype=np.float32)
+    jaw, smile, brow, blink_left, blink_right = basis
+    
+    # Move jaw landmarks down
+    jaw[48:68, 1] = 20.0
+    
+    # Move mouth corners up and out
+    smile[48, 0] = -10.0
+    smile[54, 0] = 10.0
+    smile[[48, 54], 1] = -5.0
+    
+    # Raise eyebrows
+    brow[17:27, 1] = -10.0
+    
+    # Close eyes (upper lids of the left 36-41 and right 42-47 eyes)
+    blink_left[37:40, 1] = 5.0
+    blink_right[43:46, 1] = 5.0
+    
+    return basis
+
+LANDMARK_BASIS = landmark_basis()
+
+def blendshape_weights(blendshapes_data: Union[BlendshapeTimeline, Iterable[Dict[str, float]]]) -> np.ndarray:
+    """
+    Driving blendshape weights of a track.
+    
+    Args:
+        blendshapes_data: A BlendshapeTimeline or one blendshape dict per frame
+    
+    Returns:
+        Array of shape (frames, len(DRIVING_BLENDSHAPES)); missing blendshapes are 0
+    """
+    if isinstance(blendshapes_data, BlendshapeTimeline):
+        weights = np.zeros((len(blendshapes_data), len(DRIVING_BLENDSHAPES)), dtype=np.float32)
+        for column, name in enumerate(DRIVING_BLENDSHAPES):
+            if name in blendshapes_data.channel_index:
+                weights[:, column] = blendshapes_data.values[:, blendshapes_data.channel_index[name]]
+        return weights
+    
+    rows = [[blendshapes.get(name, 0.0) for name in DRIVING_BLENDSHAPES] for blendshapes in blendshapes_data]
+    return np.array(rows, dtype=np.float32).reshape(len(rows), len(DRIVING_BLENDSHAPES))
+
+def weights_to_landmarks(weights: np.ndarray) -> np.ndarray:
+    """
+    Landmarks for every frame at once.
+    
+    Args:
+        weights: (frames, len(DRIVING_BLENDSHAPES)) blendshape weights; negative weights have no effect
+    
+    Returns:
+        Array of shape (frames, 68, 2), float32
+    """
+    weights = np.maximum(np.asarray(weights, dtype=np.float32), 0.0)
+    displacement = weights @ LANDMARK_BASIS.reshape(len(DRIVING_BLENDSHAPES), -1)
+    return NEUTRAL_LANDMARKS + displacement.reshape(len(weights), 68, 2)
@@ -0,0 +1,268 @@
+"""
+Compiled inverted index for FAQ matching.
+Trigger phrases are tokenized once into posting lists (term -> entries
+and term counts), so a query only touches the entries that share one of
+its words instead of scoring every entry.
+
+Scores match the linear scan this replaced: the summed trigger
+counts of the query words divided by the number of query words, plus the
+entry's confidence boost, capped at 1.0. The best entry wins; ties go to
+the earliest entry.
+
+Entries added after the build are kept in small Python posting lists and
+scored exactly alongside the compiled arrays until the owner rebuilds.
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+def tokenize(text: str, compat: bool = False) -> List[str]:
+    """
+    Normalize text into match tokens.
+    
+    The compatible form splits on whitespace only, as the linear scan did
+    ("goes," does not match "goes"); the default drops punctuation.
+    """
+    if compat:
+        return text.lower().split()
+    
+    return [token.strip("'") for token in TOKEN_PATTERN.findall(text.lower()) if token.strip("'")]
+
+class FAQIndex:
+    """Inverted index over FAQ trigger phrases."""
+    
+    # Terms on more than 1/DENSE_FRACTION of the entries get dense count vectors
+    DENSE_FRACTION = 32
+    
+    def __init__(self, entries: List[Dict], compat: bool = False):
+        """
+        Build the index.
+        
+        Args:
+            entries: FAQ entries (with 'id', 'trigger_phrases' and 'confidence_boost')
+            compat: Reproduce the linear scan exactly, including its quirks:
+                whitespace-only tokenization, trigger counts keyed by 'id'
+                (the last entry with a duplicated id supplies them for all
+                entries sharing it) and the boost read from the entry at
+                list position 'id'. Otherwise every entry is scored on its
+                own triggers and boost.
+        """
+        self.compat = compat
+        self.build(entries)
+    
+    def build(self, entries: List[Dict]):
+        """Compile posting lists for the given entries."""
+        # Scoring slots in entry order; each maps to the entry a match returns
+        slot_entries: List[Dict] = []
+        slot_counts: List[Dict[str, int]] = []
+        slot_boosts: List[Optional[float]] = []
+        
+        if self.compat:
+            slot_of_id = {}
+            for entry in entries:
+                entry_id = entry['id']
+                if entry_id not in slot_of_id:
+                    slot_of_id[entry_id] = len(slot_entries)
+                    slot_entries.append(entry)
+                    slot_counts.append({})
+                    try:
+                        slot_boosts.append(entries[entry_id].get('confidence_boost', 0))
+                    except (IndexError, TypeError):
+                        slot_boosts.append(None)  # the scan scored these 0.0
+                
+                slot_counts[slot_of_id[entry_id]] = self.term_counts(entry)
+        else:
+            for entry in entries:
+                slot_entries.append(entry)
+                slot_counts.append(self.term_counts(entry))
+                slot_boosts.append(entry.get('confidence_boost', 0))
+        
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for slot, counts in enumerate(slot_counts):
+            if slot_boosts[slot] is None:
+                continue
+            for term, count in counts.items():
+                postings.setdefault(term, []).append((slot, count))
+        
+        n_slots = len(slot_entries)
+        self.entries = slot_entries
+        
+        # Words most entries share ("what", "about") are stored as dense count
+        # vectors: adding one is cheaper than scattering a long posting list
+        self.dense_threshold = max(64, n_slots // self.DENSE_FRACTION)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.dense_terms: Dict[str, np.ndarray] = {}
+        
+        for term, posting in postings.items():
+            slots = np.array([slot for slot, _ in posting], dtype=np.int64)
+            counts = np.array([count for _, count in posting], dtype=np.int64)
+            
+            if len(posting) >= self.dense_threshold:
+                vector = np.zeros(n_slots, dtype=np.int32)
+                vector[slots] = counts
+                self.dense_terms[term] = vector
+            else:
+                self.postings[term] = (slots, counts)
+        
+        valid = np.array([boost is not None for boost in slot_boosts], dtype=bool)
+        self.boosts = np.array([boost or 0.0 for boost in slot_boosts], dtype=np.float64)
+        self.dense_boosts = np.where(valid, self.boosts, -np.inf)
+        
+        # Entries sharing no query word score their boost alone; best first, earliest on ties
+        capped = np.minimum(1.0, self.boosts)
+        candidates = np.flatnonzero(valid)
+        self.boost_order = candidates[np.lexsort((candidates, -capped[candidates]))]
+        self.capped_boosts = capped
+        
+        # Scratch buffers reused by every search
+        self.accumulator = np.zeros(n_slots, dtype=np.int32)
+        self.touched_mask = np.zeros(n_slots, dtype=bool)
+        
+        # Entries added since the build: term -> ([rows in added], [counts])
+        self.added: List[Dict] = []
+        self.added_boosts: List[float] = []
+        self.added_postings: Dict[str, Tuple[List[int], List[int]]] = {}
+    
+    def extend(self, entries: List[Dict]) -> bool:
+        """
+        Make more entries matchable without recompiling.
+        
+        Returns:
+            False in compat mode, whose id-keyed scoring needs a rebuild
+        """
+        if self.compat:
+            return False
+        
+        for entry in entries:
+            row = len(self.added)
+            for term, count in self.term_counts(entry).items():
+                rows, counts = self.added_postings.setdefault(term, ([], []))
+                rows.append(row)
+                counts.append(count)
+            self.added_boosts.append(entry.get('confidence_boost', 0))
+            self.added.append(entry)
+        
+        return True
+    
+    @property
+    def pending(self) -> int:
+        """Entries added since the last build."""
+        return len(self.added)
+    
+    def term_counts(self, entry: Dict) -> Dict[str, int]:
+        """Trigger-phrase term counts of one entry."""
+        counts: Dict[str, int] = {}
+        for token in tokenize(' '.join(entry['trigger_phrases']), self.compat):
+            counts[token] = counts.get(token, 0) + 1
+        return counts
+    
+    def search(self, query: str) -> Optional[Tuple[Dict, float]]:
+        """
+        Find the best-scoring entry for a query.
+        
+        Returns:
+            (entry, score), or None if no entry scores above zero
+        """
+        tokens = tokenize(query, self.compat)
+        if not tokens:
+            return None
+        
+        best_entry, best_score = None, 0.0
+        if len(self.entries) > 0:
+            # Repeated query words count once per occurrence, as in the scan
+            dense = [self.dense_terms[token] for token in tokens if token in self.dense_terms]
+            sparse = [self.postings[token] for token in tokens if token in self.postings]
+            
+            if dense or sum(len(slots) for slots, _ in sparse) * 4 > len(self.entries):
+                best_slot, best_score = self.score_dense(dense, sparse, len(tokens))
+            else:
+                best_slot, best_score = self.score_sparse(sparse, len(tokens))
+            best_entry = self.entries[best_slot]
+        
+        if self.added:
+            # Added entries come after the compiled ones, so they only win outright
+            row, score = self.score_added(tokens)
+            if score > best_score:
+                best_entry, best_score = self.added[row], score
+        
+        if best_score <= 0.0:
+            return None
+        return best_entry, best_score
+    
+    def score_sparse(self, sparse: List[Tuple[np.ndarray, np.ndarray]], n_tokens: int) -> Tuple[int, float]:
+        """Score only the entries on the query's posting lists (plus the best boost-only entry)."""
+        best_slot, best_score = -1, 0.0
+        touched = None
+        
+        if sparse:
+            for slots, counts in sparse:
+                self.accumulator[slots] += counts
+            
+            touched = sparse[0][0] if len(sparse) == 1 else np.unique(np.concatenate([slots for slots, _ in sparse]))
+            scores = np.minimum(1.0, self.accumulator[touched] / n_tokens + self.boosts[touched])
+            self.accumulator[touched] = 0
+            
+            best = int(np.argmax(scores))  # first maximum = earliest entry
+            best_slot, best_score = int(touched[best]), float(scores[best])
+            self.touched_mask[touched] = True
+        
+        # The best entry that shares no query word
+        for slot in self.boost_order:
+            if self.touched_mask[slot]:
+                continue
+            score = float(self.capped_boosts[slot])
+            if score > best_score or (score == best_score and slot < best_slot):
+                best_slot, best_score = int(slot), score
+            break
+        
+        if touched is not None:
+            self.touched_mask[touched] = False
+        
+        return best_slot, best_score
+    
+    def score_dense(self, dense: List[np.ndarray], sparse: List[Tuple[np.ndarray, np.ndarray]],
+                    n_tokens: int) -> Tuple[int, float]:
+        """Score every entry at once (queries containing common words)."""
+        accumulator = self.accumulator
+        for vector in dense:
+            accumulator += vector
+        for slots, counts in sparse:
+            accumulator[slots] += counts
+        
+        scores = np.minimum(1.0, accumulator / n_tokens + self.dense_boosts)
+        accumulator.fill(0)
+        
+        best = int(np.argmax(scores))  # first maximum = earliest entry
+        return best, float(scores[best])
+    
+    def score_added(self, tokens: List[str]) -> Tuple[int, float]:
+        """Score the entries added since the build."""
+        accumulator = np.zeros(len(self.added), dtype=np.float64)
+        for token in tokens:
+            if token in self.added_postings:
+                rows, counts = self.added_postings[token]
+                accumulator += np.bincount(rows, weights=counts, minlength=len(self.added))
+        
+        scores = np.minimum(1.0, accumulator / len(tokens) + np.array(self.added_boosts, dtype=np.float64))
+        best = int(np.argmax(scores))  # first maximum = earliest entry
+        return best, float(scores[best])
+    
+    def get_stats(self) -> Dict:
+        """Get index statistics."""
+        return {
+            'compat': self.compat,
+            'entries': len(self.entries) + len(self.added),
+            'pending': len(self.added),
+            'terms': len(self.postings) + len(self.dense_terms),
+            'dense_terms': len(self.dense_terms),
+            'postings': sum(len(slots) for slots, _ in self.postings.values())
+        }
@@ -1,33 +1,107 @@
 """
 FAQ Router for the Indiana Oracle system.
-Routes queries to pre-existing transcript responses and generates embeddings for similarity search.
+Routes queries to pre-existing transcript responses and indexes their trigger phrases for similarity search.
 """
 
-import json
 import logging
 import numpy as np
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import re
 import asyncio
+import threading
 from datetime import datetime
 from safe_file_reader import read_transcript_safely, validate_transcript_content
+from faq_index import FAQIndex
+from faq_store import FAQStore
+from faq_tfidf import TfidfFAQIndex, DEFAULT_THRESHOLD, load_calibration
+from phrase_matcher import PhraseMatcher
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Phrases and keywords looked for in transcript sentences; all lists share
+# one matcher that tags every sentence in a single call
+FAMOUS_PHRASES = [
+    "So it goes",
+    "Everything was beautiful and nothing hurt",
+    "Listen:",
+    "Human beings",
+    "All this happened, more or less",
+    "Billy Pilgrim",
+    "unstuck in time"
+]
+RESPONSE_MARKERS = ['because', 'since', 'therefore', 'thus', 'so']
+PHILOSOPHICAL_KEYWORDS = [
+    'life', 'death', 'time', 'existence', 'meaning', 'purpose',
+    'reality', 'truth', 'human', 'nature', 'soul', 'god',
+    'war', 'peace', 'love', 'hate', 'beautiful', 'ugly'
+]
+CHARACTER_PATTERNS = [
+    re.compile(r'Billy Pilgrim'),
+    re.compile(r'[A-Z][a-z]+ [A-Z][a-z]+'),  # Proper names
+]
+
+SENTENCE_TAG_GROUPS = {
+    'famous': FAMOUS_PHRASES,
+    'markers': RESPONSE_MARKERS,
+    'keywords': PHILOSOPHICAL_KEYWORDS
+}
+SENTENCE_MATCHER = PhraseMatcher([phrase for group in SENTENCE_TAG_GROUPS.values() for phrase in group])
+SENTENCE_TAG_INDEX = [(group, i) for group, phrases in SENTENCE_TAG_GROUPS.items() for i in range(len(phrases))]
+
+# "auto" scoring uses TF-IDF up to this many entries (under 1 ms per query,
+# about 2 s to build) and the compiled keyword index beyond
+TFIDF_MAX_ENTRIES = 10000
+KEYWORD_THRESHOLD = 0.7
+
 class FAQRouter:
-    def __init__(self, transcript_path: str = None, faq_db_path: str = "faq_database.json"):
+    def __init__(self, transcript_path: str = None, faq_db_path: str = "faq_database.json",
+                 scoring: str = "auto", compat_scoring: bool = False,
+                 calibration_path: str = "faq_calibration.json"):
         self.transcript_path = transcript_path or "../sound_files/transcript_01.txt"
         self.faq_db_path = Path(faq_db_path)
         
         # FAQ database
         self.faq_entries = []
-        self.embeddings = None
+        self.created_at = None
+        
+        # Additions are journaled and written behind; the snapshot is compacted in the background
+        self.store = FAQStore(self.faq_db_path, self.snapshot_data)
+        
+        # Index used by check_faq: "tfidf" (word and character n-grams; much
+        # better precision, but about 10 ms per query and 20 s to build at 100k
+        # entries), "keyword" (trigger word counts, sub-millisecond at 100k;
+        # compat_scoring reproduces the old linear scan exactly) or "auto"
+        # (TF-IDF up to TFIDF_MAX_ENTRIES)
+        self.scoring = scoring
+        self.compat_scoring = compat_scoring
+        self.index = None
+        
+        # Queries are scored in worker threads; indexes reuse scratch buffers
+        # and take additions in place, so searches, additions and swaps are
+        # serialized. The lock is only ever taken in worker threads: the event
+        # loop never waits on a search (or a timed-out one still running).
+        self.index_lock = threading.Lock()
+        self.indexed_entries = 0  # Leading faq_entries the index covers
+        
+        # Additions go straight into the live index and are scored from side
+        # tables; it is rebuilt (refitting TF-IDF weights) off the event loop
+        # once they exceed index_rebuild_fraction of the entries, clamped so
+        # that rebuilds stay rare and the side tables stay small
+        self.index_task = None
+        self.index_rebuild_delay = 0.5  # seconds
+        self.index_rebuild_fraction = 0.1
+        self.index_rebuild_min = 64  # additions
+        self.index_rebuild_max = 1024
         
-        # Configuration
-        self.similarity_threshold = 0.7
+        # Configuration; the TF-IDF threshold is calibrated by faq_tfidf.py
+        calibrated = load_calibration(calibration_path)
+        self.thresholds = {
+            'tfidf': calibrated if calibrated is not None else DEFAULT_THRESHOLD,
+            'keyword': KEYWORD_THRESHOLD
+        }
         self.max_response_length = 200  # characters
         self.min_response_length = 20
         
@@ -40,28 +114,29 @@ class FAQRouter:
         
         try:
             # Load existing FAQ database or create from transcript
-            if self.faq_db_path.exists():
+            if self.store.exists():
                 await self.load_faq_database()
             else:
                 await self.build_faq_from_transcript()
             
-            # Load or generate embeddings
-            await self.load_or_generate_embeddings()
+            # Compile the match index
+            self.build_index()
             
             logger.info(f"FAQ router initialized with {len(self.faq_entries)} entries")
-            
+        
         except Exception as e:
             logger.error(f"Error initializing FAQ router: {e}")
     
     async def load_faq_database(self):
         """Load existing FAQ database."""
         try:
-            with open(self.faq_db_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # Snapshot plus any journaled additions since it was written
+            data = await self.store.load()
             
             self.faq_entries = data.get('entries', [])
+            self.created_at = data.get('created_at')
             logger.info(f"Loaded {len(self.faq_entries)} FAQ entries from database")
-            
+        
         except Exception as e:
             logger.error(f"Error loading FAQ database: {e}")
             self.faq_entries = []
@@ -98,7 +173,7 @@ class FAQRouter:
             await self.save_faq_database()
             
             logger.info(f"Built FAQ database with {len(entries)} entries")
-            
+        
         except Exception as e:
             logger.error(f"Error building FAQ from transcript: {e}")
             await self.create_default_faq()
@@ -113,19 +188,16 @@ class FAQRouter:
             
             # Extract different types of FAQ entries
             
-            # 1. Direct quotes (Vonnegut's famous phrases)
-            famous_phrases = [
-                "So it goes",
-                "Everything was beautiful and nothing hurt",
-                "Listen:",
-                "Human beings",
-                "All this happened, more or less",
-                "Billy Pilgrim",
-                "unstuck in time"
-            ]
-            
-            for phrase in famous_phrases:
-                matches = self.find_phrase_contexts(sentences, phrase)
+            tags = self.tag_sentences(sentences)
+            
+            # 1. Direct quotes (Vonnegut's famous phrases), up to 3 sentences per phrase
+            contexts = [[] for _ in FAMOUS_PHRASES]
+            for sentence, phrase_indices in zip(sentences, tags['famous']):
+                for i in phrase_indices:
+                    if len(contexts[i]) < 3:
+                        contexts[i].append(sentence.strip())
+            
+            for phrase, matches in zip(FAMOUS_PHRASES, contexts):
                 for match in matches:
                     entries.append({
                         'id': len(entries),
@@ -138,11 +210,11 @@ class FAQRouter:
                     })
             
             # 2. Question-like statements (convert to Q&A)
-            question_entries = self.extract_question_responses(sentences)
+            question_entries = self.extract_question_responses(sentences, tags['markers'])
             entries.extend(question_entries)
             
             # 3. Philosophical statements
-            philosophical_entries = self.extract_philosophical_statements(sentences)
+            philosophical_entries = self.extract_philosophical_statements(sentences, tags['keywords'])
             entries.extend(philosophical_entries)
             
             # 4. Character references
@@ -153,7 +225,7 @@ class FAQRouter:
             entries = self.filter_and_dedupe_entries(entries)
             
             return entries
-            
+        
         except Exception as e:
             logger.error(f"Error extracting FAQ entries: {e}")
             return []
@@ -172,21 +244,30 @@ class FAQRouter:
         
         return filtered
     
-    def find_phrase_contexts(self, sentences: List[str], phrase: str) -> List[str]:
-        """Find sentences containing a specific phrase."""
-        matches = []
-        phrase_lower = phrase.lower()
+    def tag_sentences(self, sentences: List[str]) -> Dict[str, List[List[int]]]:
+        """
+        Find the famous phrases, response markers and philosophical keywords
+        in every sentence with one matcher call.
         
-        for sentence in sentences:
-            if phrase_lower in sentence.lower():
-                matches.append(sentence.strip())
+        Returns:
+            For each group, per sentence, the indices (into that group's list) it contains
+        """
+        tags = {group: [[] for _ in sentences] for group in SENTENCE_TAG_GROUPS}
+        
+        for sentence_index, indices in enumerate(SENTENCE_MATCHER.tag(sentences)):
+            for i in indices:
+                group, local_index = SENTENCE_TAG_INDEX[i]
+                tags[group][sentence_index].append(local_index)
         
-        return matches[:3]  # Limit to 3 matches per phrase
+        return tags
     
-    def extract_question_responses(self, sentences: List[str]) -> List[Dict]:
+    def extract_question_responses(self, sentences: List[str], markers: Optional[List[List[int]]] = None) -> List[Dict]:
         """Extract question-like statements and create Q&A pairs."""
         entries = []
         
+        if markers is None:
+            markers = self.tag_sentences(sentences)['markers']
+        
         # Look for sentences that might be responses to common questions
         question_patterns = [
             (r'what.*is', 'definition'),
@@ -197,11 +278,12 @@ class FAQRouter:
             (r'who.*', 'person')
         ]
         
-        for sentence in sentences:
-            sentence_lower = sentence.lower()
+        for sentence, sentence_markers in zip(sentences, markers):
+            if len(entries) >= 10:
+                break
             
             # Check if sentence seems like a response
-            if any(word in sentence_lower for word in ['because', 'since', 'therefore', 'thus', 'so']):
+            if sentence_markers:
                 # Create potential triggers
                 triggers = self.generate_question_triggers(sentence)
                 
@@ -244,32 +326,27 @@ class FAQRouter:
         
         return triggers[:5]  # Limit triggers per response
     
-    def extract_philosophical_statements(self, sentences: List[str]) -> List[Dict]:
+    def extract_philosophical_statements(self, sentences: List[str], keywords: Optional[List[List[int]]] = None) -> List[Dict]:
         """Extract philosophical or profound statements."""
         entries = []
         
-        philosophical_keywords = [
-            'life', 'death', 'time', 'existence', 'meaning', 'purpose',
-            'reality', 'truth', 'human', 'nature', 'soul', 'god',
-            'war', 'peace', 'love', 'hate', 'beautiful', 'ugly'
-        ]
+        if keywords is None:
+            keywords = self.tag_sentences(sentences)['keywords']
         
-        for sentence in sentences:
-            sentence_lower = sentence.lower()
-            
-            # Count philosophical keywords
-            keyword_count = sum(1 for keyword in philosophical_keywords if keyword in sentence_lower)
+        for sentence, keyword_indices in zip(sentences, keywords):
+            if len(entries) >= 15:
+                break
             
-            if keyword_count >= 2:  # At least 2 philosophical concepts
-                # Generate triggers based on keywords found
+            if len(keyword_indices) >= 2:  # At least 2 philosophical concepts
+                # Generate triggers based on keywords found (in keyword order)
                 triggers = []
-                for keyword in philosophical_keywords:
-                    if keyword in sentence_lower:
-                        triggers.extend([
-                            keyword,
-                            f"what about {keyword}",
-                            f"thoughts on {keyword}"
-                        ])
+                for i in keyword_indices:
+                    keyword = PHILOSOPHICAL_KEYWORDS[i]
+                    triggers.extend([
+                        keyword,
+                        f"what about {keyword}",
+                        f"thoughts on {keyword}"
+                    ])
                 
                 entries.append({
                     'id': len(entries),
@@ -287,37 +364,34 @@ class FAQRouter:
         """Extract character references and descriptions."""
         entries = []
         
-        # Look for character names (simplified)
-        character_patterns = [
-            r'Billy Pilgrim',
-            r'[A-Z][a-z]+ [A-Z][a-z]+',  # Proper names
-        ]
-        
+        # Look for character names (simplified); the first name per pattern
         for sentence in sentences:
-            for pattern in character_patterns:
-                matches = re.findall(pattern, sentence)
+            for pattern in CHARACTER_PATTERNS:
+                match = pattern.search(sentence)
                 
-                if matches:
-                    for character in matches:
-                        triggers = [
-                            character.lower(),
-                            f"who is {character.lower()}",
-                            f"tell me about {character.lower()}",
-                            f"what about {character.lower()}"
-                        ]
-                        
-                        entries.append({
-                            'id': len(entries),
-                            'type': 'character',
-                            'trigger_phrases': triggers,
-                            'response': sentence,
-                            'confidence_boost': 0.1,
-                            'source': 'transcript',
-                            'audio_file': None
-                        })
-                        break  # One entry per sentence
-        
-        return entries[:10]  # Limit character entries
+                if match:
+                    character = match.group(0)
+                    triggers = [
+                        character.lower(),
+                        f"who is {character.lower()}",
+                        f"tell me about {character.lower()}",
+                        f"what about {character.lower()}"
+                    ]
+                    
+                    entries.append({
+                        'id': len(entries),
+                        'type': 'character',
+                        'trigger_phrases': triggers,
+                        'response': sentence,
+                        'confidence_boost': 0.1,
+                        'source': 'transcript',
+                        'audio_file': None
+                    })
+                    
+                    if len(entries) >= 10:  # Limit character entries
+                        return entries
+        
+        return entries
     
     def filter_and_dedupe_entries(self, entries: List[Dict]) -> List[Dict]:
         """Filter and remove duplicate entries."""
@@ -383,111 +457,153 @@ class FAQRouter:
         
         logger.info(f"Created {len(default_entries)} default FAQ entries")
     
+    def snapshot_data(self) -> Dict:
+        """The database as written to the snapshot file."""
+        return {
+            'created_at': self.created_at,
+            'updated_at': datetime.now().isoformat(),
+            'source_transcript': self.transcript_path,
+            'total_entries': len(self.faq_entries),
+            'entries': self.faq_entries
+        }
+    
     async def save_faq_database(self):
-        """Save FAQ database to file."""
+        """Save the whole FAQ database to file (atomically, off the event loop)."""
         try:
-            data = {
-                'created_at': datetime.now().isoformat(),
-                'source_transcript': self.transcript_path,
-                'total_entries': len(self.faq_entries),
-                'entries': self.faq_entries
-            }
-            
-            with open(self.faq_db_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            self.created_at = datetime.now().isoformat()
+            await self.store.save()
             
             logger.info(f"Saved FAQ database: {self.faq_db_path}")
-            
+        
         except Exception as e:
             logger.error(f"Error saving FAQ database: {e}")
     
-    async def load_or_generate_embeddings(self):
-        """Load or generate embeddings for FAQ entries."""
-        try:
-            # For now, use simple keyword-based matching
-            # In production, you'd use sentence transformers or similar
-            
-            # Create simple embeddings based on trigger phrases
-            self.embeddings = {}
-            
-            for entry in self.faq_entries:
-                entry_id = entry['id']
-                triggers = entry['trigger_phrases']
-                
-                # Create a simple bag-of-words embedding
-                all_words = ' '.join(triggers).lower().split()
-                word_counts = {}
-                
-                for word in all_words:
-                    word_counts[word] = word_counts.get(word, 0) + 1
-                
-                self.embeddings[entry_id] = word_counts
-            
-            logger.info(f"Generated embeddings for {len(self.embeddings)} entries")
-            
-        except Exception as e:
-            logger.error(f"Error generating embeddings: {e}")
-            self.embeddings = {}
+    def index_scoring(self, n_entries: int) -> str:
+        """Scoring used for an index over n_entries entries."""
+        if self.scoring == "auto":
+            return "tfidf" if n_entries <= TFIDF_MAX_ENTRIES else "keyword"
+        return self.scoring
     
-    def calculate_similarity(self, query: str, entry_id: int) -> float:
-        """Calculate similarity between query and FAQ entry."""
-        try:
-            if entry_id not in self.embeddings:
-                return 0.0
-            
-            query_words = query.lower().split()
-            entry_embedding = self.embeddings[entry_id]
-            
-            # Simple word overlap similarity
-            matches = 0
-            total_query_words = len(query_words)
-            
-            if total_query_words == 0:
-                return 0.0
-            
-            for word in query_words:
-                if word in entry_embedding:
-                    matches += entry_embedding[word]
-            
-            similarity = matches / total_query_words
-            
-            # Apply confidence boost
-            entry = self.faq_entries[entry_id]
-            confidence_boost = entry.get('confidence_boost', 0)
-            
-            return min(1.0, similarity + confidence_boost)
+    def compile_index(self, entries: List[Dict]):
+        """Compile a match index over the given entries."""
+        if self.index_scoring(len(entries)) == "tfidf":
+            return TfidfFAQIndex(entries)
+        return FAQIndex(entries, compat=self.compat_scoring)
+    
+    @property
+    def similarity_threshold(self) -> float:
+        """Match threshold of the index in use."""
+        if self.index is None:
+            return self.thresholds[self.index_scoring(len(self.faq_entries))]
+        return self.thresholds['tfidf' if isinstance(self.index, TfidfFAQIndex) else 'keyword']
+    
+    def build_index(self):
+        """Compile the match index over the current entries (holding index_lock if searches may run)."""
+        while True:
+            entries = list(self.faq_entries)
+            self.index = self.compile_index(entries)
+            self.indexed_entries = len(entries)
+            # Entries added while compiling; compat scoring compiles again
+            if self.catch_up_index():
+                break
+        logger.info(f"Built FAQ index: {self.index.get_stats()}")
+    
+    def catch_up_index(self) -> bool:
+        """Append the entries the index lacks (caller holds index_lock); False if it cannot."""
+        missing = self.faq_entries[self.indexed_entries:]
+        if missing:
+            if not self.index.extend(missing):
+                return False
+            self.indexed_entries += len(missing)
+        return True
+    
+    def sync_index(self, index=None, indexed_entries: int = 0) -> bool:
+        """
+        Swap in a new index (if given) and append the entries it lacks (blocking).
+        
+        Catching up by count makes this idempotent, so concurrent additions
+        and rebuilds never drop or duplicate entries.
+        
+        Returns:
+            False if the index cannot take additions (compat scoring)
+        """
+        with self.index_lock:
+            if index is not None:
+                self.index, self.indexed_entries = index, indexed_entries
+            if self.index is None:
+                return True  # Built with all entries on the next check_faq
+            return self.catch_up_index()
+    
+    async def index_entries(self):
+        """Make new entries matchable, rebuilding in the background once too many have piled up."""
+        if self.index is None:
+            return  # Built with all entries on the next check_faq
+        
+        limit = min(self.index_rebuild_max,
+                    max(self.index_rebuild_min, self.index_rebuild_fraction * len(self.faq_entries)))
+        extended = await asyncio.to_thread(self.sync_index)
+        if extended and self.index.pending <= limit:
+            return
+        self.schedule_index_rebuild()
+    
+    def schedule_index_rebuild(self):
+        """Rebuild the index in the background unless a rebuild is already running."""
+        if self.index_task is None or self.index_task.done():
+            self.index_task = asyncio.create_task(self.rebuild_index())
+    
+    async def rebuild_index(self):
+        """Compile the index in a worker thread and swap it in; the old one serves until then."""
+        await asyncio.sleep(self.index_rebuild_delay)
+        
+        while True:
+            entries = list(self.faq_entries)
+            try:
+                index = await asyncio.to_thread(self.compile_index, entries)
+            except Exception as e:
+                logger.error(f"Error rebuilding FAQ index: {e}")
+                return
             
-        except Exception as e:
-            logger.error(f"Error calculating similarity: {e}")
-            return 0.0
+            # Entries added while compiling are appended to the new index
+            if await asyncio.to_thread(self.sync_index, index, len(entries)):
+                logger.info(f"Rebuilt FAQ index: {index.get_stats()}")
+                return
+            # The index cannot take additions (compat scoring): compile again
     
     async def check_faq(self, query: str) -> Optional[Dict]:
         """
         Check if query matches any FAQ entries.
         
+        Scoring runs in a worker thread, so a caller's timeout can fire
+        while a large index is being searched.
+        
         Args:
             query: User's query text
-            
+        
         Returns:
             FAQ response dict if match found, None otherwise
         """
+        if not self.faq_entries:
+            return None
+        return await asyncio.to_thread(self.match_faq, query)
+    
+    def match_faq(self, query: str) -> Optional[Dict]:
+        """Score a query against the index (blocking; see check_faq)."""
         try:
-            if not self.faq_entries:
-                return None
+            with self.index_lock:
+                if self.index is None:
+                    self.build_index()
+                
+                # Only entries sharing a feature with the query are scored
+                match = self.index.search(query)
+                threshold = self.similarity_threshold
             
-            best_match = None
-            best_score = 0.0
+            if match is None:
+                return None
             
-            # Check each FAQ entry
-            for entry in self.faq_entries:
-                similarity = self.calculate_similarity(query, entry['id'])
-                
-                if similarity > best_score:
-                    best_score = similarity
-                    best_match = entry
+            best_match, best_score = match
             
             # Return match if above threshold
-            if best_score >= self.similarity_threshold:
+            if best_score >= threshold:
                 logger.info(f"FAQ match found: {best_match['type']} (score: {best_score:.3f})")
                 
                 return {
@@ -500,47 +616,67 @@ class FAQRouter:
                 }
             
             return None
-            
+        
         except Exception as e:
             logger.error(f"Error checking FAQ: {e}")
             return None
     
     async def add_faq_entry(self, triggers: List[str], response: str, entry_type: str = 'custom') -> int:
         """Add a new FAQ entry."""
+        entry_ids = await self.add_faq_entries([
+            {'triggers': triggers, 'response': response, 'type': entry_type}
+        ])
+        return entry_ids[0] if entry_ids else -1
+    
+    async def add_faq_entries(self, items: List[Dict]) -> List[int]:
+        """
+        Add many FAQ entries at once.
+        
+        The entries are added to the live index, so they are matchable at
+        once, and persisted by the write-behind journal; neither blocks the
+        event loop.
+        
+        Args:
+            items: Dicts with 'triggers', 'response' and optionally 'type'
+        
+        Returns:
+            IDs of the new entries (empty on error)
+        """
         try:
-            entry_id = len(self.faq_entries)
-            
-            new_entry = {
-                'id': entry_id,
-                'type': entry_type,
-                'trigger_phrases': triggers,
-                'response': response,
-                'confidence_boost': 0.0,
-                'source': 'manual',
-                'audio_file': None,
-                'created_at': datetime.now().isoformat()
-            }
-            
-            self.faq_entries.append(new_entry)
-            
-            # Update embeddings
-            all_words = ' '.join(triggers).lower().split()
-            word_counts = {}
-            
-            for word in all_words:
-                word_counts[word] = word_counts.get(word, 0) + 1
-            
-            self.embeddings[entry_id] = word_counts
+            created_at = datetime.now().isoformat()
             
-            # Save database
-            await self.save_faq_database()
+            new_entries = []
+            for item in items:
+                entry_id = len(self.faq_entries) + len(new_entries)
+                triggers = item['triggers']
+                
+                new_entries.append({
+                    'id': entry_id,
+                    'type': item.get('type', 'custom'),
+                    'trigger_phrases': triggers,
+                    'response': item['response'],
+                    'confidence_boost': 0.0,
+                    'source': 'manual',
+                    'audio_file': None,
+                    'created_at': created_at
+                })
             
-            logger.info(f"Added new FAQ entry: {entry_id}")
-            return entry_id
+            self.faq_entries.extend(new_entries)
+            self.store.record_add(new_entries)
+            await self.index_entries()
             
+            logger.info(f"Added {len(new_entries)} FAQ entries")
+            return [entry['id'] for entry in new_entries]
+        
         except Exception as e:
-            logger.error(f"Error adding FAQ entry: {e}")
-            return -1
+            logger.error(f"Error adding FAQ entries: {e}")
+            return []
+    
+    async def close(self):
+        """Finish pending index rebuilds and database writes."""
+        if self.index_task is not None:
+            await self.index_task
+        await self.store.close()
     
     def get_stats(self) -> Dict:
         """Get FAQ router statistics."""
@@ -558,8 +694,11 @@ class FAQRouter:
             'total_entries': len(self.faq_entries),
             'types': types,
             'sources': sources,
+            'scoring': self.scoring,
+            'index_scoring': 'tfidf' if isinstance(self.index, TfidfFAQIndex) else ('keyword' if self.index else None),
             'similarity_threshold': self.similarity_threshold,
-            'has_embeddings': self.embeddings is not None
+            'index': self.index.get_stats() if self.index else None,
+            'store': self.store.get_stats()
         }
 
 # Testing function
@@ -0,0 +1,240 @@
+"""
+Journaled persistence for the FAQ database.
+Mutations are appended to a JSON-lines journal next to the snapshot
+(faq_database.json) by a write-behind task, in batches and off the event
+loop; the snapshot is rewritten in the background once the journal grows,
+via an atomic rename. Loading reads the snapshot and replays the journal.
+
+Every journal record carries a sequence number and the snapshot stores the
+last one it contains, so a crash at any point (even between replacing the
+snapshot and truncating the journal) never loses or duplicates entries.
+A torn final journal line from a crash mid-write is ignored and cut off
+on load, so the next append starts on a fresh line.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class FAQStore:
+    """Snapshot plus append-only journal of FAQ mutations."""
+    
+    def __init__(self, snapshot_path: str, get_snapshot: Callable[[], Dict],
+                 flush_interval: float = 0.2, compact_threshold: int = 1000, fsync: bool = True):
+        """
+        Initialize store.
+        
+        Args:
+            snapshot_path: JSON snapshot (the FAQ database file)
+            get_snapshot: Returns the current database dict ('entries' and metadata) for compaction
+            flush_interval: Seconds mutations may wait before being written to the journal
+            compact_threshold: Journal records that trigger a background snapshot rewrite
+            fsync: Flush journal and snapshot writes to disk before they count as done
+        """
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = self.snapshot_path.with_suffix('.journal.jsonl')
+        self.get_snapshot = get_snapshot
+        self.flush_interval = flush_interval
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        
+        self.seq = 0  # Sequence number of the last recorded mutation
+        self.pending: List[str] = []  # Journal lines not yet written
+        self.journal_records = 0  # Records in the journal file since the last snapshot
+        self.lock = asyncio.Lock()  # Serializes journal writes and compaction
+        self.flush_task: Optional[asyncio.Task] = None
+        self.compact_task: Optional[asyncio.Task] = None
+        
+        self.flushes = 0
+        self.compactions = 0
+        self.last_compaction_seconds = None
+    
+    def exists(self) -> bool:
+        """Whether there is a database to load."""
+        return self.snapshot_path.exists() or self.journal_path.exists()
+    
+    def read(self) -> Dict:
+        """Load the snapshot and replay the journal (blocking)."""
+        data = {'entries': []}
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        
+        snapshot_seq = data.pop('journal_seq', 0)
+        self.seq = snapshot_seq
+        self.journal_records = 0
+        entries = data.setdefault('entries', [])
+        
+        if self.journal_path.exists():
+            with open(self.journal_path, 'rb') as f:
+                lines = f.read().split(b'\n')
+            
+            offset = 0  # Byte offset of the current line
+            for line_number, line in enumerate(lines, 1):
+                line_start, offset = offset, offset + len(line) + 1
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    if line_number >= len(lines) - 1:
+                        # Appending after the fragment would glue the next record to it
+                        logger.warning(f"Truncating torn last record in {self.journal_path}")
+                        self.truncate_journal(line_start)
+                        break
+                    raise
+                
+                self.journal_records += 1
+                self.seq = max(self.seq, record['seq'])
+                if record['seq'] <= snapshot_seq:
+                    continue  # Already in the snapshot
+                
+                if record['op'] == 'add':
+                    entries.append(record['entry'])
+                else:
+                    logger.warning(f"Unknown FAQ journal operation: {record['op']}")
+        
+        data['total_entries'] = len(entries)
+        return data
+    
+    def truncate_journal(self, size: int):
+        """Cut the journal back to its first size bytes (blocking)."""
+        with open(self.journal_path, 'r+b') as f:
+            f.truncate(size)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+    
+    async def load(self) -> Dict:
+        """Load the database without blocking the event loop."""
+        async with self.lock:
+            return await asyncio.to_thread(self.read)
+    
+    def record_add(self, entries: List[Dict]):
+        """Journal added entries; written by the write-behind task shortly after."""
+        for entry in entries:
+            self.seq += 1
+            self.pending.append(json.dumps({'seq': self.seq, 'op': 'add', 'entry': entry}, ensure_ascii=False))
+        
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self.flush_later())
+    
+    async def flush_later(self):
+        """Write-behind: batch the mutations of the next flush interval into one write."""
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+    
+    async def flush(self):
+        """Write pending journal records to disk."""
+        async with self.lock:
+            if not self.pending:
+                return
+            
+            lines, self.pending = self.pending, []
+            try:
+                await asyncio.to_thread(self.append_lines, lines)
+            except Exception as e:
+                # Keep them for the next flush rather than losing them
+                self.pending = lines + self.pending
+                logger.error(f"Error writing FAQ journal: {e}")
+                return
+            
+            self.journal_records += len(lines)
+            self.flushes += 1
+        
+        if self.journal_records >= self.compact_threshold and (self.compact_task is None or self.compact_task.done()):
+            self.compact_task = asyncio.create_task(self.compact())
+    
+    def append_lines(self, lines: List[str]):
+        """Append records to the journal (blocking)."""
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+    
+    async def compact(self):
+        """Rewrite the snapshot from memory and empty the journal."""
+        async with self.lock:
+            start = time.perf_counter()
+            
+            # Capture on the event loop: the snapshot holds every mutation up to self.seq
+            data = dict(self.get_snapshot())
+            data['entries'] = list(data.get('entries', []))
+            data['journal_seq'] = self.seq
+            
+            try:
+                await asyncio.to_thread(self.write_snapshot, data)
+            except Exception as e:
+                logger.error(f"Error compacting FAQ database: {e}")
+                return
+            
+            self.journal_records = 0
+            self.compactions += 1
+            self.last_compaction_seconds = time.perf_counter() - start
+        
+        logger.info(f"Compacted FAQ database: {len(data['entries'])} entries in {self.last_compaction_seconds:.2f}s")
+    
+    def write_snapshot(self, data: Dict):
+        """Atomically replace the snapshot, then truncate the journal (blocking)."""
+        tmp_path = self.snapshot_path.with_name(self.snapshot_path.name + '.tmp')
+        
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        
+        os.replace(tmp_path, self.snapshot_path)
+        if self.fsync:
+            self.sync_directory()
+        
+        # Every record in the journal now has seq <= journal_seq
+        with open(self.journal_path, 'w', encoding='utf-8') as f:
+            if self.fsync:
+                os.fsync(f.fileno())
+    
+    def sync_directory(self):
+        """Make the rename itself durable."""
+        try:
+            fd = os.open(self.snapshot_path.parent, os.O_RDONLY)
+        except OSError:
+            return  # Not supported on this platform
+        
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+    
+    async def save(self):
+        """Write a full snapshot now (after wholesale changes such as a rebuild from the transcript)."""
+        await self.compact()
+    
+    async def close(self):
+        """Write everything still pending."""
+        if self.flush_task is not None:
+            await self.flush_task
+        await self.flush()
+        if self.compact_task is not None:
+            await self.compact_task
+    
+    def get_stats(self) -> Dict:
+        """Get persistence statistics."""
+        return {
+            'seq': self.seq,
+            'pending': len(self.pending),
+            'journal_records': self.journal_records,
+            'flushes': self.flushes,
+            'compactions': self.compactions,
+            'last_compaction_seconds': self.last_compaction_seconds
+        }
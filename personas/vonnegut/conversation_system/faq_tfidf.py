@@ -0,0 +1,349 @@
+"""
+TF-IDF FAQ matching over word and character n-grams.
+Each entry (its trigger phrases, plus its response at lower weight) is
+vectorized once into a sparse TF-IDF matrix stored in CSR form by
+feature, so scoring a query is a single sparse-dense product over the
+query's features. Character n-grams let "What is Dresden like?" find an
+entry triggered by "tell me about dresden" even with different phrasing.
+
+Entries added after the build are weighted with the fitted IDF and scored
+from a small side table, so an addition costs only its own features; the
+owner refits (rebuilds) once enough of them have piled up.
+
+The match threshold is calibrated on a labelled query set, a JSON list of
+    {"query": "What was the war like?", "response": "<expected answer text>"}
+with "response": null for queries that should go to the chatbot.
+faq_labelled_queries.json holds such a set for the shipped
+faq_database.json, and faq_calibration.json is its calibration; re-run
+this after regenerating the database.
+
+Usage: python faq_tfidf.py labelled_queries.json [--db faq_database.json]
+                           [--out faq_calibration.json] [--min-precision 0.9]
+"""
+
+import json
+import logging
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from faq_index import tokenize
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.3  # Until calibrated on labelled queries
+
+class TfidfFAQIndex:
+    """Cosine similarity of TF-IDF vectors over word and character n-grams."""
+    
+    def __init__(self, entries: List[Dict], word_weight: float = 0.5,
+                 char_ngrams: Tuple[int, int] = (3, 5), response_weight: float = 0.5):
+        """
+        Build the index.
+        
+        Args:
+            entries: FAQ entries (with 'trigger_phrases' and 'response')
+            word_weight: Share of the similarity from word uni/bigrams (the rest from character n-grams)
+            char_ngrams: Smallest and largest character n-gram, within word boundaries
+            response_weight: Term weight of response text relative to trigger phrases
+        """
+        self.word_weight = word_weight
+        self.char_ngrams = char_ngrams
+        self.response_weight = response_weight
+        self.build(entries)
+    
+    def features(self, text: str, weight: float, counts: Dict[str, float]):
+        """Add the weighted word and character n-gram counts of text to counts."""
+        words = tokenize(text)
+        
+        for i, word in enumerate(words):
+            counts['w:' + word] = counts.get('w:' + word, 0.0) + weight
+            if i > 0:
+                bigram = f"b:{words[i - 1]} {word}"
+                counts[bigram] = counts.get(bigram, 0.0) + weight
+            
+            padded = f" {word} "
+            for n in range(self.char_ngrams[0], self.char_ngrams[1] + 1):
+                for start in range(max(1, len(padded) - n + 1)):
+                    gram = 'c:' + padded[start:start + n]
+                    counts[gram] = counts.get(gram, 0.0) + weight
+    
+    def entry_features(self, entry: Dict) -> Dict[str, float]:
+        """Raw term weights of one entry."""
+        counts: Dict[str, float] = {}
+        for phrase in entry.get('trigger_phrases', []):
+            self.features(phrase, 1.0, counts)
+        self.features(entry.get('response', ''), self.response_weight, counts)
+        return counts
+    
+    def build(self, entries: List[Dict]):
+        """Fit the vocabulary and IDF weights and compile the matrix."""
+        entry_counts = [self.entry_features(entry) for entry in entries]
+        
+        self.vocabulary: Dict[str, int] = {}
+        document_frequency: List[int] = []
+        for counts in entry_counts:
+            for feature in counts:
+                column = self.vocabulary.setdefault(feature, len(self.vocabulary))
+                if column == len(document_frequency):
+                    document_frequency.append(0)
+                document_frequency[column] += 1
+        
+        # Smoothed IDF, as if one extra document contained every feature
+        n_entries = len(entries)
+        self.idf = np.log((1 + n_entries) / (1 + np.array(document_frequency, dtype=np.float64))) + 1.0
+        self.unseen_idf = np.log(1 + n_entries) + 1.0
+        self.is_word = np.array([feature[0] != 'c' for feature in self.vocabulary], dtype=bool)
+        
+        rows, columns, values = [], [], []
+        for row, counts in enumerate(entry_counts):
+            if not counts:
+                continue
+            cols = np.fromiter((self.vocabulary[feature] for feature in counts), dtype=np.int64, count=len(counts))
+            tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+            
+            rows.append(np.full(len(cols), row, dtype=np.int64))
+            columns.append(cols)
+            values.append(self.weigh(self.idf[cols], self.is_word[cols], tf))
+        
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        columns = np.concatenate(columns) if columns else np.zeros(0, dtype=np.int64)
+        values = np.concatenate(values) if values else np.zeros(0, dtype=np.float64)
+        
+        # CSR by feature (the transposed entry matrix): a query only reads its own features' rows
+        order = np.argsort(columns, kind='stable')
+        self.indptr = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(columns, minlength=len(self.vocabulary)), out=self.indptr[1:])
+        self.indices = rows[order]
+        self.data = values[order].astype(np.float32)
+        
+        self.entries = entries
+        
+        # Entries added since the build: feature -> ([rows in added], [weights])
+        self.added: List[Dict] = []
+        self.added_postings: Dict[str, Tuple[List[int], List[float]]] = {}
+    
+    def extend(self, entries: List[Dict]) -> bool:
+        """
+        Make more entries matchable without refitting.
+        
+        The new entries are weighted with the IDF fitted at build time
+        (features it has not seen get the unseen IDF), which drifts as
+        additions accumulate; rebuild to refit.
+        
+        Returns:
+            True (additions are always supported)
+        """
+        for entry in entries:
+            row = len(self.added)
+            counts = self.entry_features(entry)
+            if counts:
+                features = list(counts)
+                weights = self.weigh(self.feature_idf(features),
+                                     np.array([feature[0] != 'c' for feature in features], dtype=bool),
+                                     np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+                for feature, weight in zip(features, weights):
+                    rows, values = self.added_postings.setdefault(feature, ([], []))
+                    rows.append(row)
+                    values.append(float(weight))
+            self.added.append(entry)
+        
+        return True
+    
+    @property
+    def pending(self) -> int:
+        """Entries added since the last build."""
+        return len(self.added)
+    
+    def feature_idf(self, features: List[str]) -> np.ndarray:
+        """Fitted IDF of each feature (the unseen IDF for unknown ones)."""
+        return np.array([
+            self.idf[self.vocabulary[feature]] if feature in self.vocabulary else self.unseen_idf
+            for feature in features
+        ], dtype=np.float64)
+    
+    def weigh(self, idf: np.ndarray, word: np.ndarray, tf: np.ndarray) -> np.ndarray:
+        """Sublinear TF-IDF, with the word and character blocks each normalized to their share."""
+        weights = np.maximum((1.0 + np.log(np.maximum(tf, 1e-3))) * idf, 0.0)
+        
+        for mask, share in ((word, self.word_weight), (~word, 1.0 - self.word_weight)):
+            norm = np.sqrt(np.sum(weights[mask] ** 2))
+            if norm > 0:
+                weights[mask] *= np.sqrt(share) / norm
+        
+        return weights
+    
+    def vectorize(self, query: str) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Sparse TF-IDF vector of a query.
+        
+        Returns:
+            (features, columns, values): every query feature, its column in
+            the compiled matrix (-1 if unknown) and its weight
+        """
+        counts: Dict[str, float] = {}
+        self.features(query, 1.0, counts)
+        if not counts:
+            return [], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        
+        # Unknown features still count towards the query's norm, so a query
+        # that mostly talks about something else scores low
+        features = list(counts)
+        columns = np.array([self.vocabulary.get(feature, -1) for feature in features], dtype=np.int64)
+        word = np.array([feature[0] != 'c' for feature in features], dtype=bool)
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        
+        return features, columns, self.weigh(self.feature_idf(features), word, tf)
+    
+    def scores(self, query: str) -> np.ndarray:
+        """Cosine similarity of the query with every entry (compiled, then added)."""
+        scores = np.zeros(len(self.entries) + len(self.added), dtype=np.float64)
+        features, columns, values = self.vectorize(query)
+        
+        known = columns >= 0
+        if known.any():
+            columns, known_values = columns[known], values[known]
+            starts, stops = self.indptr[columns], self.indptr[columns + 1]
+            lengths = stops - starts
+            
+            # Gather the query features' rows and scale each by the query weight
+            positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            weights = self.data[positions] * np.repeat(known_values, lengths)
+            scores[:len(self.entries)] = np.bincount(self.indices[positions], weights=weights, minlength=len(self.entries))
+        
+        if self.added_postings:
+            rows, weights = [], []
+            for feature, value in zip(features, values):
+                if feature in self.added_postings:
+                    feature_rows, feature_weights = self.added_postings[feature]
+                    rows.extend(feature_rows)
+                    weights.extend(value * weight for weight in feature_weights)
+            if rows:
+                scores[len(self.entries):] = np.bincount(rows, weights=weights, minlength=len(self.added))
+        
+        return scores
+    
+    def search(self, query: str) -> Optional[Tuple[Dict, float]]:
+        """
+        Find the most similar entry.
+        
+        Returns:
+            (entry, score), or None if no entry shares a feature with the query
+        """
+        if not self.entries and not self.added:
+            return None
+        
+        scores = self.scores(query)
+        best = int(np.argmax(scores))  # first maximum = earliest entry
+        if scores[best] <= 0.0:
+            return None
+        
+        entry = self.entries[best] if best < len(self.entries) else self.added[best - len(self.entries)]
+        return entry, float(scores[best])
+    
+    def get_stats(self) -> Dict:
+        """Get index statistics."""
+        return {
+            'entries': len(self.entries) + len(self.added),
+            'features': len(self.vocabulary),
+            'nonzeros': len(self.data),
+            'pending': len(self.added)
+        }
+
+def calibrate_threshold(index: TfidfFAQIndex, labelled: List[Dict], min_precision: float = 0.9) -> Dict:
+    """
+    Choose the lowest threshold whose FAQ answers are right often enough.
+    
+    A match counts as correct when its response is the labelled one;
+    queries labelled null should not match at all. The lowest threshold
+    meeting ``min_precision`` answers the most queries from the FAQ.
+    
+    Returns:
+        Threshold with its precision and recall on the labelled set
+    """
+    results = []
+    for item in labelled:
+        match = index.search(item['query'])
+        expected = item.get('response')
+        score = match[1] if match else 0.0
+        correct = match is not None and expected is not None and match[0]['response'] == expected
+        results.append((score, correct))
+    
+    positives = sum(item.get('response') is not None for item in labelled)
+    best = None
+    
+    for threshold in sorted({score for score, _ in results if score > 0.0}):
+        accepted = [correct for score, correct in results if score >= threshold]
+        hits = sum(accepted)
+        precision = hits / len(accepted)
+        recall = hits / positives if positives else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if hits else 0.0
+        candidate = {
+            'threshold': round(threshold, 4),
+            'precision': round(precision, 3),
+            'recall': round(recall, 3),
+            'f1': f1
+        }
+        
+        if precision >= min_precision:
+            best = candidate
+            break
+        if best is None or f1 > best['f1']:
+            best = candidate
+    
+    if best is None:
+        return {'threshold': DEFAULT_THRESHOLD, 'precision': None, 'recall': None, 'queries': len(labelled)}
+    
+    if best['precision'] < min_precision:
+        logger.warning(f"No threshold reaches precision {min_precision}; using the best F1")
+    
+    best['f1'] = round(best['f1'], 3)
+    best['queries'] = len(labelled)
+    return best
+
+def load_calibration(path: str) -> Optional[float]:
+    """Calibrated threshold saved by this module, or None if there is none."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return float(json.load(f)['threshold'])
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Error loading FAQ calibration {path}: {e}")
+        return None
+
+def main():
+    """Calibrate the TF-IDF threshold on a labelled query file."""
+    args = sys.argv[1:]
+    options = {'db': 'faq_database.json', 'out': 'faq_calibration.json', 'min-precision': '0.9'}
+    
+    for name in list(options):
+        flag = f"--{name}"
+        if flag in args:
+            index = args.index(flag)
+            options[name] = args[index + 1]
+            del args[index:index + 2]
+    
+    if len(args) != 1:
+        print(__doc__)
+        return
+    
+    with open(options['db'], 'r', encoding='utf-8') as f:
+        entries = json.load(f).get('entries', [])
+    with open(args[0], 'r', encoding='utf-8') as f:
+        labelled = json.load(f)
+    
+    calibration = calibrate_threshold(TfidfFAQIndex(entries), labelled, float(options['min-precision']))
+    calibration['calibrated_at'] = datetime.now().isoformat()
+    
+    with open(options['out'], 'w', encoding='utf-8') as f:
+        json.dump(calibration, f, indent=2)
+    
+    logger.info(f"FAQ calibration: {calibration}")
+
+if __name__ == "__main__":
+    main()
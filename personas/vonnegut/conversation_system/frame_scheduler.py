@@ -0,0 +1,235 @@
+"""
+Deadline-based frame scheduling.
+Driving data (blendshapes, landmarks) carries a stream timestamp; its
+presentation time is that timestamp on a clock anchored at the start of
+playback. A render task turns driving data into frames as soon as it
+arrives and keeps a small jitter buffer of finished frames ahead of the
+display; a present task sends each frame at its presentation time. Both
+wait on events rather than polling. A frame that cannot be rendered in
+time is skipped before rendering, and a rendered frame that misses its
+presentation time is dropped, so a slow renderer lowers the frame rate
+instead of letting the face lag behind the voice.
+
+Timestamped data (a whole Audio2Face track may be submitted at once) is
+never evicted while it can still make its deadline; data due further
+ahead than the horizon is refused instead. Untimestamped live data is
+bounded by count, dropping the oldest.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from metrics import LatencyStats
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class FrameScheduler:
+    """Renders ahead into a jitter buffer and presents frames on their deadlines."""
+    
+    def __init__(self, render: Callable[[Dict], Awaitable[Any]],
+                 present: Callable[[Any, Dict], Awaitable[None]],
+                 fps: float = 25.0, jitter_frames: int = 3, max_pending: int = 30,
+                 horizon: float = 60.0):
+        """
+        Initialize scheduler.
+        
+        Args:
+            render: Coroutine turning driving data into a frame (None if it cannot)
+            present: Coroutine delivering a frame along with its driving data
+            fps: Nominal frame rate; a frame more than half a frame late is dropped
+            jitter_frames: Rendered frames kept ahead of the display
+            max_pending: Untimestamped driving data waiting to be rendered; the oldest is dropped beyond it
+            horizon: Seconds ahead of now that timestamped data may be due; later data is refused
+        """
+        self.render = render
+        self.present = present
+        self.fps = fps
+        self.frame_duration = 1.0 / fps
+        self.late_tolerance = self.frame_duration / 2
+        
+        self.horizon = horizon
+        
+        # Timestamped data in submission order, and untimestamped live data
+        self.pending: deque = deque()
+        self.live: deque = deque(maxlen=max_pending)
+        self.pending_event = asyncio.Event()
+        self.ready: asyncio.Queue = asyncio.Queue(maxsize=jitter_frames)
+        
+        self.start_time: Optional[float] = None
+        self.tasks = []
+        self.stopped = False
+        
+        # Smoothed render time, to skip frames that could not be ready in time
+        self.render_estimate = 0.0
+        self.render_time = LatencyStats()
+        self.lateness = LatencyStats()
+        self.present_times: deque = deque(maxlen=max(2, int(fps * 2)))
+        
+        self.submitted = 0
+        self.presented = 0
+        self.dropped_overflow = 0
+        self.dropped_horizon = 0
+        self.dropped_unrendered = 0
+        self.dropped_late = 0
+        self.render_failures = 0
+    
+    def rebase(self, start_time: float):
+        """Anchor stream timestamps to a new playback start (event loop time)."""
+        self.start_time = start_time
+    
+    def submit(self, data: Dict) -> bool:
+        """
+        Queue driving data; data with a 'timestamp' is presented at start_time + timestamp.
+        
+        Returns:
+            False if the data was refused (due beyond the horizon)
+        """
+        now = asyncio.get_running_loop().time()
+        self.submitted += 1
+        
+        if 'timestamp' in data:
+            if self.start_time is not None and self.start_time + data['timestamp'] - now > self.horizon:
+                self.dropped_horizon += 1
+                return False
+            self.pending.append((now, data))
+        else:
+            if len(self.live) == self.live.maxlen:
+                self.dropped_overflow += 1
+            self.live.append((now, data))
+        
+        self.pending_event.set()
+        return True
+    
+    def next_pending(self):
+        """Take the queued driving data that is due first."""
+        if not self.live:
+            return self.pending.popleft()
+        if not self.pending:
+            return self.live.popleft()
+        
+        timed_due = self.presentation_time(*self.pending[0])
+        live_due = self.presentation_time(*self.live[0])
+        return self.pending.popleft() if timed_due <= live_due else self.live.popleft()
+    
+    def presentation_time(self, arrival: float, data: Dict) -> float:
+        """Deadline of a frame; untimestamped data is shown as soon as it can be rendered."""
+        if self.start_time is not None and 'timestamp' in data:
+            return self.start_time + data['timestamp']
+        return arrival + self.render_estimate + self.frame_duration
+    
+    async def run(self, start_time: Optional[float] = None):
+        """Render and present until stop() is called."""
+        loop = asyncio.get_running_loop()
+        self.start_time = start_time if start_time is not None else loop.time()
+        self.stopped = False
+        self.tasks = [asyncio.create_task(self.render_loop()), asyncio.create_task(self.present_loop())]
+        
+        try:
+            await asyncio.gather(*self.tasks)
+        except asyncio.CancelledError:
+            if not self.stopped:
+                raise
+        finally:
+            for task in self.tasks:
+                task.cancel()
+    
+    async def render_loop(self):
+        """Render driving data in arrival order into the jitter buffer."""
+        loop = asyncio.get_running_loop()
+        while True:
+            while not self.pending and not self.live:
+                self.pending_event.clear()
+                await self.pending_event.wait()
+            
+            arrival, data = self.next_pending()
+            due = self.presentation_time(arrival, data)
+            if loop.time() + self.render_estimate > due + self.late_tolerance:
+                self.dropped_unrendered += 1
+                continue
+            
+            start = loop.time()
+            try:
+                frame = await self.render(data)
+            except Exception as e:
+                self.render_time.record_error()
+                logger.error(f"Error rendering frame: {e}")
+                continue
+            
+            elapsed = loop.time() - start
+            self.render_time.record(elapsed)
+            self.render_estimate = elapsed if not self.render_estimate else 0.8 * self.render_estimate + 0.2 * elapsed
+            
+            if frame is None:
+                self.render_failures += 1
+                continue
+            
+            # Blocks while the jitter buffer is full: rendering stays a few frames ahead
+            await self.ready.put((due, frame, data))
+    
+    async def present_loop(self):
+        """Deliver rendered frames at their presentation times."""
+        loop = asyncio.get_running_loop()
+        while True:
+            due, frame, data = await self.ready.get()
+            
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            
+            late = loop.time() - due
+            if late > self.late_tolerance:
+                self.dropped_late += 1
+                continue
+            
+            try:
+                await self.present(frame, data)
+            except Exception as e:
+                logger.error(f"Error presenting frame: {e}")
+                continue
+            
+            self.lateness.record(max(late, 0.0))
+            self.presented += 1
+            self.present_times.append(loop.time())
+    
+    def stop(self):
+        """Stop scheduling and discard queued work."""
+        self.stopped = True
+        for task in self.tasks:
+            task.cancel()
+        self.pending.clear()
+        self.live.clear()
+        while not self.ready.empty():
+            self.ready.get_nowait()
+    
+    @property
+    def effective_fps(self) -> Optional[float]:
+        """Frames presented per second over the last couple of seconds."""
+        if len(self.present_times) < 2:
+            return None
+        span = self.present_times[-1] - self.present_times[0]
+        return (len(self.present_times) - 1) / span if span > 0 else None
+    
+    def get_stats(self) -> Dict:
+        """Get frame rate, render time and drop statistics."""
+        dropped = self.dropped_overflow + self.dropped_horizon + self.dropped_unrendered + self.dropped_late
+        effective_fps = self.effective_fps
+        return {
+            'target_fps': self.fps,
+            'effective_fps': round(effective_fps, 2) if effective_fps is not None else None,
+            'submitted': self.submitted,
+            'presented': self.presented,
+            'dropped_overflow': self.dropped_overflow,
+            'dropped_horizon': self.dropped_horizon,
+            'dropped_unrendered': self.dropped_unrendered,
+            'dropped_late': self.dropped_late,
+            'drop_rate': round(dropped / self.submitted, 4) if self.submitted else 0.0,
+            'render_failures': self.render_failures,
+            'render_time': self.render_time.get_stats(),
+            'lateness': self.lateness.get_stats(),
+            'buffered': self.ready.qsize(),
+            'pending': len(self.pending) + len(self.live)
+        }
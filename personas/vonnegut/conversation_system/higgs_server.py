@@ -0,0 +1,326 @@
+"""
+Out-of-process Higgs Audio v2 synthesis for the conversation system.
+The 3B model is loaded and warmed up in long-lived worker processes;
+the server sends requests over multiprocessing queues and receives each
+finished utterance back, so generation never blocks its event loop.
+This does not stream: the model generates the whole utterance before any
+of it is returned. Earlier audio comes from the sentence scheduler, which
+sends one sentence per request.
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from metrics import LatencyStats
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_HIGGS_CONFIG = {
+    "model_name_or_path": "bosonai/higgs-audio-v2-generation-3B-base",
+    "audio_tokenizer_name_or_path": "bosonai/higgs-audio-v2-tokenizer",
+    "device": "cpu",
+    "kv_cache_lengths": [512],  # Smaller cache for faster generation
+    "max_new_tokens": 100,  # Limit for faster generation
+    "temperature": 0.8,
+    "warmup_text": "Hi ho."
+}
+
+def higgs_worker_main(worker_id: int, config: Dict, requests, responses):
+    """
+    Worker process: load Higgs, warm it up, then serve requests until told to stop.
+    
+    Requests are (request_id, text) tuples, None to stop. Responses are
+    tuples tagged 'ready', 'done' (with the whole utterance), 'failed' or 'error'.
+    """
+    try:
+        # CPU only, without touching torch internals in the server process
+        if config['device'] == 'cpu':
+            os.environ['CUDA_VISIBLE_DEVICES'] = ''
+        
+        higgs_path = Path(__file__).parent.parent / "higgs-audio"
+        if higgs_path.exists() and str(higgs_path) not in sys.path:
+            sys.path.insert(0, str(higgs_path))
+        
+        import torch
+        from boson_multimodal.serve.serve_engine import HiggsAudioServeEngine
+        from boson_multimodal.data_types import ChatMLSample, Message
+        
+        start = time.perf_counter()
+        engine = HiggsAudioServeEngine(
+            model_name_or_path=config['model_name_or_path'],
+            audio_tokenizer_name_or_path=config['audio_tokenizer_name_or_path'],
+            device=config['device'],
+            torch_dtype=torch.float32,
+            kv_cache_lengths=config['kv_cache_lengths']
+        )
+        
+        def generate(text: str):
+            sample = ChatMLSample(messages=[Message(role="user", content=[text])])
+            return engine.generate(
+                chat_ml_sample=sample,
+                max_new_tokens=config['max_new_tokens'],
+                temperature=config['temperature'],
+                force_audio_gen=True  # Force audio generation
+            )
+        
+        # Warm-up so the first visitor does not pay for lazy initialization
+        generate(config['warmup_text'])
+        responses.put(('ready', worker_id, time.perf_counter() - start))
+    
+    except Exception as e:
+        responses.put(('error', worker_id, f"{type(e).__name__}: {e}"))
+        return
+    
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        
+        request_id, text = request
+        
+        try:
+            response = generate(text)
+            if response.audio is None:
+                raise RuntimeError("Higgs generated no audio")
+            
+            audio = np.asarray(response.audio, dtype=np.float32)
+            responses.put(('done', request_id, worker_id, audio.tobytes(), response.sampling_rate))
+        
+        except Exception as e:
+            responses.put(('failed', request_id, f"{type(e).__name__}: {e}"))
+
+class HiggsWorkerPool:
+    """Higgs worker processes behind a shared request queue."""
+    
+    def __init__(self, workers: int = 1, config: Optional[Dict] = None,
+                 timeout: float = 120.0, monitor_interval: float = 5.0):
+        """
+        Initialize worker pool.
+        
+        Args:
+            workers: Model processes (each holds a full copy of the model)
+            config: Overrides of DEFAULT_HIGGS_CONFIG
+            timeout: Seconds to wait for one utterance
+            monitor_interval: Seconds between health checks of the workers
+        """
+        self.config = dict(DEFAULT_HIGGS_CONFIG)
+        if config:
+            self.config.update(config)
+        
+        self.workers = workers
+        self.timeout = timeout
+        self.monitor_interval = monitor_interval
+        
+        self.context = multiprocessing.get_context('spawn')
+        self.requests = None
+        self.responses = None
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.ready_workers = set()
+        self.worker_errors: Dict[int, str] = {}
+        
+        # Per-request futures resolved by the response reader thread
+        self.pending: Dict[int, asyncio.Future] = {}
+        self._request_ids = itertools.count()
+        self.loop = None
+        self.reader = None
+        self.monitor_task = None
+        self.running = False
+        
+        self.generation_latency = LatencyStats()
+        self.restarts = 0
+        self.started_at = None
+    
+    def start(self):
+        """Spawn the workers (model loading and warm-up continue in the background)."""
+        if self.running:
+            return
+        
+        self.loop = asyncio.get_running_loop()
+        self.requests = self.context.Queue()
+        self.responses = self.context.Queue()
+        self.running = True
+        self.started_at = time.monotonic()
+        
+        for worker_id in range(self.workers):
+            self.spawn_worker(worker_id)
+        
+        self.reader = threading.Thread(target=self.read_responses, name="higgs-responses", daemon=True)
+        self.reader.start()
+        self.monitor_task = asyncio.create_task(self.monitor())
+        
+        logger.info(f"Starting {self.workers} Higgs worker process(es)")
+    
+    def spawn_worker(self, worker_id: int):
+        """Start (or restart) one worker process."""
+        process = self.context.Process(
+            target=higgs_worker_main,
+            args=(worker_id, self.config, self.requests, self.responses),
+            name=f"higgs-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self.processes[worker_id] = process
+    
+    async def wait_ready(self, timeout: float = 600.0) -> bool:
+        """Wait until at least one worker has loaded and warmed up the model."""
+        deadline = time.monotonic() + timeout
+        
+        while time.monotonic() < deadline:
+            if self.ready_workers:
+                return True
+            if len(self.worker_errors) >= self.workers:
+                return False
+            await asyncio.sleep(0.5)
+        
+        return bool(self.ready_workers)
+    
+    @property
+    def ready(self) -> bool:
+        return bool(self.ready_workers)
+    
+    def read_responses(self):
+        """Reader thread: move worker responses onto the event loop."""
+        while self.running:
+            try:
+                message = self.responses.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            
+            self.loop.call_soon_threadsafe(self.dispatch, message)
+    
+    def dispatch(self, message: tuple):
+        """Runs on the event loop: route one worker response."""
+        kind = message[0]
+        
+        if kind == 'ready':
+            _, worker_id, load_time = message
+            self.ready_workers.add(worker_id)
+            self.worker_errors.pop(worker_id, None)
+            logger.info(f"Higgs worker {worker_id} ready after {load_time:.1f}s")
+        
+        elif kind == 'error':
+            _, worker_id, error = message
+            self.worker_errors[worker_id] = error
+            self.ready_workers.discard(worker_id)
+            logger.error(f"Higgs worker {worker_id} failed to start: {error}")
+        
+        else:
+            # Responses for requests the caller has given up on are dropped
+            future = self.pending.get(message[1])
+            if future is not None and not future.done():
+                future.set_result(message)
+    
+    async def monitor(self):
+        """Restart workers that die after loading successfully."""
+        while self.running:
+            await asyncio.sleep(self.monitor_interval)
+            
+            for worker_id, process in list(self.processes.items()):
+                if process.is_alive() or worker_id in self.worker_errors:
+                    continue
+                
+                if worker_id not in self.ready_workers:
+                    # Died while loading: restarting would just crash again
+                    self.worker_errors[worker_id] = f"exited during startup (code {process.exitcode})"
+                    logger.error(f"Higgs worker {worker_id} exited during startup (code {process.exitcode})")
+                    continue
+                
+                logger.warning(f"Higgs worker {worker_id} exited (code {process.exitcode}), restarting")
+                self.ready_workers.discard(worker_id)
+                self.restarts += 1
+                self.spawn_worker(worker_id)
+    
+    async def generate(self, text: str) -> Tuple[np.ndarray, int]:
+        """
+        Synthesize text in a worker process; returns once the whole utterance is generated.
+        
+        Returns:
+            (float32 audio, sample_rate)
+        """
+        if not self.ready:
+            raise RuntimeError("No Higgs worker ready")
+        
+        request_id = next(self._request_ids)
+        future = self.loop.create_future()
+        self.pending[request_id] = future
+        start = time.perf_counter()
+        
+        try:
+            self.requests.put((request_id, text))
+            message = await asyncio.wait_for(future, timeout=self.timeout)
+            
+            if message[0] != 'done':
+                raise RuntimeError(f"Higgs generation failed: {message[2]}")
+            
+            _, _, _, data, sample_rate = message
+            self.generation_latency.record(time.perf_counter() - start)
+            return np.frombuffer(data, dtype=np.float32), sample_rate
+        
+        except Exception:
+            self.generation_latency.record_error()
+            raise
+        
+        finally:
+            self.pending.pop(request_id, None)
+    
+    async def synthesize(self, text: str) -> Optional[Tuple[np.ndarray, int]]:
+        """Synthesize text and return (audio, sample_rate), or None on failure."""
+        try:
+            audio, sample_rate = await self.generate(text)
+            return (audio, sample_rate) if len(audio) else None
+        
+        except asyncio.TimeoutError:
+            logger.error("Higgs generation timed out")
+            return None
+        except Exception as e:
+            logger.error(f"Error in Higgs synthesis: {e}")
+            return None
+    
+    def stop(self):
+        """Stop the workers and the reader thread."""
+        if not self.running:
+            return
+        
+        self.running = False
+        if self.monitor_task is not None:
+            self.monitor_task.cancel()
+        
+        for _ in self.processes:
+            self.requests.put(None)
+        
+        for process in self.processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        
+        self.ready_workers.clear()
+        logger.info("Higgs workers stopped")
+    
+    def get_health(self) -> Dict:
+        """Health and throughput of the worker pool."""
+        return {
+            'running': self.running,
+            'workers': self.workers,
+            'alive_workers': sum(process.is_alive() for process in self.processes.values()),
+            'ready_workers': len(self.ready_workers),
+            'worker_errors': dict(self.worker_errors),
+            'requests_in_flight': len(self.pending),
+            'restarts': self.restarts,
+            'uptime': round(time.monotonic() - self.started_at, 1) if self.started_at else None,
+            'generation': self.generation_latency.get_stats()
+        }
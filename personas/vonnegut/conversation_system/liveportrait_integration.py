@@ -8,13 +8,17 @@ import numpy as np
 from pathlib import Path
 import cv2
 import torch
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, AsyncIterator, List, Tuple, Union
 import logging
 import json
 import base64
 from io import BytesIO
 from PIL import Image
 
+from blendshape_timeline import BlendshapeTimeline
+from face_landmarks import NEUTRAL_LANDMARKS, blendshape_weights, weights_to_landmarks
+from frame_scheduler import FrameScheduler
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -67,7 +71,7 @@ class LivePortraitIntegration:
                 self.load_source_image(self.source_image_path)
             
             logger.info("LivePortrait model loaded successfully")
-            
+        
         except ImportError as e:
             logger.error(f"LivePortrait not installed: {e}")
             logger.info("Please install LivePortrait following install_liveportrait.md")
@@ -93,7 +97,7 @@ class LivePortraitIntegration:
             
             self.source_image = source_img
             logger.info(f"Source image loaded: {image_path}")
-            
+        
         except Exception as e:
             logger.error(f"Error loading source image: {e}")
     
@@ -103,82 +107,15 @@ class LivePortraitIntegration:
         
         Args:
             blendshapes: Dictionary of blendshape values
-            
+        
         Returns:
             68 facial landmarks as numpy array
         """
-        # Initialize neutral face landmarks (68 points)
-        landmarks = self.get_neutral_landmarks()
-        
-        # Map blendshapes to landmark movements
-        if blendshapes.get('jawOpen', 0) > 0:
-            # Move jaw landmarks down
-            jaw_indices = list(range(48, 68))  # Mouth landmarks
-            landmarks[jaw_indices, 1] += blendshapes['jawOpen'] * 20
-        
-        if blendshapes.get('mouthSmile', 0) > 0:
-            # Move mouth corners up and out
-            landmarks[48, 0] -= blendshapes['mouthSmile'] * 10  # Left corner
-            landmarks[54, 0] += blendshapes['mouthSmile'] * 10  # Right corner
-            landmarks[[48, 54], 1] -= blendshapes['mouthSmile'] * 5
-        
-        if blendshapes.get('browInnerUp', 0) > 0:
-            # Raise eyebrows
-            brow_indices = list(range(17, 27))
-            landmarks[brow_indices, 1] -= blendshapes['browInnerUp'] * 10
-        
-        if blendshapes.get('eyeBlinkLeft', 0) > 0:
-            # Close left eye
-            left_eye = list(range(36, 42))
-            landmarks[left_eye[1:4], 1] += blendshapes['eyeBlinkLeft'] * 5
-        
-        if blendshapes.get('eyeBlinkRight', 0) > 0:
-            # Close right eye
-            right_eye = list(range(42, 48))
-            landmarks[right_eye[1:4], 1] += blendshapes['eyeBlinkRight'] * 5
-        
-        return landmarks
+        return weights_to_landmarks(blendshape_weights([blendshapes]))[0]
     
     def get_neutral_landmarks(self) -> np.ndarray:
         """Get neutral face landmarks (68 points)."""
-        # Simplified neutral face landmarks
-        # In practice, extract from source image using dlib/mediapipe
-        landmarks = np.array([
-            # Jaw line (17 points)
-            [100, 200], [105, 220], [110, 240], [120, 260], [130, 275],
-            [145, 285], [165, 295], [185, 300], [205, 295], [225, 285],
-            [240, 275], [250, 260], [260, 240], [265, 220], [270, 200],
-            [275, 180], [280, 160],
-            
-            # Right eyebrow (5 points)
-            [120, 140], [130, 135], [145, 135], [160, 140], [170, 145],
-            
-            # Left eyebrow (5 points)
-            [200, 145], [210, 140], [225, 135], [240, 135], [250, 140],
-            
-            # Nose bridge (4 points)
-            [185, 165], [185, 180], [185, 195], [185, 210],
-            
-            # Nose tip (5 points)
-            [165, 220], [175, 225], [185, 230], [195, 225], [205, 220],
-            
-            # Right eye (6 points)
-            [130, 165], [140, 160], [155, 160], [165, 165], [155, 170], [140, 170],
-            
-            # Left eye (6 points)
-            [205, 165], [215, 160], [230, 160], [240, 165], [230, 170], [215, 170],
-            
-            # Outer mouth (12 points)
-            [150, 250], [160, 245], [170, 240], [185, 242], [200, 240],
-            [210, 245], [220, 250], [210, 260], [200, 265], [185, 267],
-            [170, 265], [160, 260],
-            
-            # Inner mouth (8 points)
-            [160, 250], [170, 248], [185, 250], [200, 248], [210, 250],
-            [200, 255], [185, 257], [170, 255]
-        ], dtype=np.float32)
-        
-        return landmarks
+        return NEUTRAL_LANDMARKS.copy()
     
     async def animate_frame(self, driving_data: Dict) -> Optional[np.ndarray]:
         """
@@ -189,7 +126,7 @@ class LivePortraitIntegration:
                 - blendshapes: Audio2Face blendshapes
                 - landmarks: Direct facial landmarks
                 - expression: Expression coefficients
-                
+        
         Returns:
             Animated frame as numpy array
         """
@@ -205,38 +142,93 @@ class LivePortraitIntegration:
             else:
                 return None
             
-            # Generate animated frame
-            animated_frame = self.model.generate(
+            # Generate animated frame off the event loop so streaming keeps its timing
+            animated_frame = await asyncio.to_thread(
+                self.model.generate,
                 source_latent=self.source_latent,
                 driving_landmarks=landmarks
             )
             
             return animated_frame
-            
+        
         except Exception as e:
             logger.error(f"Error animating frame: {e}")
             return None
     
+    def render_batch(self, landmarks: np.ndarray) -> List[np.ndarray]:
+        """
+        Run the generator on a batch of driving landmarks (blocking; call from a worker thread).
+        
+        Args:
+            landmarks: Driving landmarks, shape (batch, 68, 2)
+        
+        Returns:
+            One animated frame per landmark set
+        """
+        with torch.inference_mode():
+            # Pipelines with a batched entry point take the whole tensor in one forward pass
+            if hasattr(self.model, 'generate_batch'):
+                return list(self.model.generate_batch(
+                    source_latent=self.source_latent,
+                    driving_landmarks=landmarks
+                ))
+            return [
+                self.model.generate(source_latent=self.source_latent, driving_landmarks=frame_landmarks)
+                for frame_landmarks in landmarks
+            ]
+    
+    async def stream_animation(self, blendshapes_data: Union[BlendshapeTimeline, List[Dict]],
+                               batch_size: int = 8) -> AsyncIterator[np.ndarray]:
+        """
+        Animate a whole blendshape track in fixed-size batches, yielding frames as each batch finishes.
+        
+        The next batch renders while the caller consumes the current one.
+        
+        Args:
+            blendshapes_data: A BlendshapeTimeline or one blendshape dict per frame
+            batch_size: Frames per generator call
+        """
+        if not self.model or self.source_latent is None:
+            return
+        
+        landmarks = weights_to_landmarks(blendshape_weights(blendshapes_data))
+        batches = [landmarks[start:start + batch_size] for start in range(0, len(landmarks), batch_size)]
+        if not batches:
+            return
+        
+        pending = asyncio.create_task(asyncio.to_thread(self.render_batch, batches[0]))
+        try:
+            for index in range(len(batches)):
+                try:
+                    frames = await pending
+                except Exception as e:
+                    logger.error(f"Error animating batch {index}: {e}")
+                    frames = []
+                
+                if index + 1 < len(batches):
+                    pending = asyncio.create_task(asyncio.to_thread(self.render_batch, batches[index + 1]))
+                
+                for frame in frames:
+                    if frame is not None:
+                        yield frame
+        finally:
+            pending.cancel()
+    
     async def process_audio_to_animation(self, audio_data: np.ndarray, 
-                                       blendshapes_data: List[Dict]) -> List[np.ndarray]:
+                                       blendshapes_data: Union[BlendshapeTimeline, List[Dict]],
+                                       batch_size: int = 8) -> List[np.ndarray]:
         """
         Process audio and blendshapes into animated frames.
         
         Args:
             audio_data: Audio waveform
-            blendshapes_data: List of blendshape dictionaries per frame
-            
+            blendshapes_data: BlendshapeTimeline or list of blendshape dictionaries per frame
+            batch_size: Frames per generator call
+        
         Returns:
             List of animated frames
         """
-        frames = []
-        
-        for blendshapes in blendshapes_data:
-            frame = await self.animate_frame({'blendshapes': blendshapes})
-            if frame is not None:
-                frames.append(frame)
-        
-        return frames
+        return [frame async for frame in self.stream_animation(blendshapes_data, batch_size)]
     
     def create_video(self, frames: List[np.ndarray], output_path: str, fps: int = 25):
         """Save animated frames as video."""
@@ -259,47 +251,67 @@ class LivePortraitIntegration:
 class LivePortraitStream:
     """Stream animated frames in real-time."""
     
-    def __init__(self, liveportrait: LivePortraitIntegration):
+    def __init__(self, liveportrait: LivePortraitIntegration, jitter_frames: int = 3):
+        """
+        Initialize stream.
+        
+        Args:
+            liveportrait: Renderer
+            jitter_frames: Frames rendered ahead of their presentation time
+        """
         self.liveportrait = liveportrait
         self.is_streaming = False
-        self.frame_buffer = asyncio.Queue(maxsize=30)
+        self.websocket = None
+        self.scheduler = FrameScheduler(self.render_frame, self.send_frame,
+                                        fps=liveportrait.fps, jitter_frames=jitter_frames)
+    
+    async def start_stream(self, websocket, start_time: Optional[float] = None):
+        """
+        Stream animated frames to a client until stop_stream() is called.
         
-    async def start_stream(self, websocket):
-        """Start streaming animated frames to client."""
+        Args:
+            websocket: Client connection
+            start_time: Event loop time at which driving timestamp 0 is shown (now by default)
+        """
+        self.websocket = websocket
         self.is_streaming = True
-        
-        # Producer task
-        async def produce_frames():
-            while self.is_streaming:
-                # Get latest blendshapes from queue
-                if not self.frame_buffer.empty():
-                    driving_data = await self.frame_buffer.get()
-                    frame = await self.liveportrait.animate_frame(driving_data)
-                    
-                    if frame is not None:
-                        # Encode frame
-                        _, buffer = cv2.imencode('.jpg', frame)
-                        frame_base64 = base64.b64encode(buffer).decode('utf-8')
-                        
-                        # Send to client
-                        await websocket.send(json.dumps({
-                            'type': 'animated_frame',
-                            'frame': frame_base64,
-                            'timestamp': driving_data.get('timestamp', 0)
-                        }))
-                
-                await asyncio.sleep(1/30)  # 30 FPS
-        
-        await produce_frames()
+        try:
+            await self.scheduler.run(start_time)
+        finally:
+            self.is_streaming = False
     
-    async def add_driving_data(self, data: Dict):
-        """Add driving data to animation queue."""
-        if not self.frame_buffer.full():
-            await self.frame_buffer.put(data)
+    def sync(self, start_time: float):
+        """Align driving timestamps with the playback start of a new answer."""
+        self.scheduler.rebase(start_time)
+    
+    async def render_frame(self, driving_data: Dict) -> Optional[str]:
+        """Animate and JPEG-encode one frame."""
+        frame = await self.liveportrait.animate_frame(driving_data)
+        if frame is None:
+            return None
+        _, buffer = await asyncio.to_thread(cv2.imencode, '.jpg', frame)
+        return base64.b64encode(buffer).decode('utf-8')
+    
+    async def send_frame(self, frame_base64: str, driving_data: Dict):
+        """Send one encoded frame to the client."""
+        await self.websocket.send(json.dumps({
+            'type': 'animated_frame',
+            'frame': frame_base64,
+            'timestamp': driving_data.get('timestamp', 0)
+        }))
+    
+    async def add_driving_data(self, data: Dict) -> bool:
+        """Add timestamped driving data to the animation schedule (False if refused)."""
+        return self.scheduler.submit(data)
     
     def stop_stream(self):
         """Stop streaming."""
         self.is_streaming = False
+        self.scheduler.stop()
+    
+    def get_stats(self) -> Dict:
+        """Get effective frame rate, render time and drop rate."""
+        return self.scheduler.get_stats()
 
 # Integration with existing voice system
 class VonnegutAnimator:
@@ -310,7 +322,7 @@ class VonnegutAnimator:
         self.portrait_path = "../assets/vonnegut_portrait.jpg"
         self.liveportrait = LivePortraitIntegration(self.portrait_path)
         self.stream = LivePortraitStream(self.liveportrait)
-        
+    
     async def animate_speech(self, text: str, audio_data: np.ndarray, 
                            blendshapes: List[Dict]) -> str:
         """
@@ -320,7 +332,7 @@ class VonnegutAnimator:
             text: Spoken text
             audio_data: Audio waveform
             blendshapes: Audio2Face blendshapes
-            
+        
         Returns:
             Path to output video
         """
@@ -7,40 +7,56 @@ import logging
 import numpy as np
 import soundfile as sf
 import asyncio
-import pyttsx3
 import io
-import tempfile
-import os
 import sys
-from pathlib import Path
-from typing import Optional, Dict, Any
-import threading
-import queue
+from typing import Optional, Dict, Any, AsyncIterator
+
+from tts_worker import Pyttsx3Worker, Pyttsx3ProcessPool, default_synthesis_processes
+from tts_scheduler import SentenceScheduler
+from higgs_server import HiggsWorkerPool
+from audio_utils import resample
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class LocalTTSHandler:
-    def __init__(self, model_path: Optional[str] = None):
+    def __init__(self, model_path: Optional[str] = None, synthesis_processes: Optional[int] = None,
+                 higgs_workers: int = 1):
         """
         Initialize local TTS handler.
         
         Args:
             model_path: Path to trained Higgs model (optional)
+            synthesis_processes: pyttsx3 processes for parallel sentence synthesis
+                (None = one per core up to four; 0 = worker thread only)
+            higgs_workers: Higgs model processes (each holds a full copy of the model)
         """
         self.model_path = model_path
-        self.higgs_model = None
-        self.pyttsx3_engine = None
+        self.higgs_pool = None  # Higgs runs in worker processes
+        self.higgs_workers = higgs_workers
+        self.pyttsx3_worker = None  # Owns the pyttsx3 engine on its own thread
+        if synthesis_processes is None:
+            synthesis_processes = default_synthesis_processes()
+        self.synthesis_processes = synthesis_processes
+        self.process_pool = None
         
         # Audio settings
         self.sample_rate = 22050
         self.voice_speed = 150  # WPM for pyttsx3
         self.voice_volume = 0.8
         
+        # Split responses into sentences so playback starts after the first one
+        self.scheduler = SentenceScheduler(
+            self.synthesize_sentence,
+            self.sample_rate,
+            max_parallel=max(2, synthesis_processes, higgs_workers)
+        )
+        
         # Initialize TTS engines immediately for basic functionality
         self.initialized = False
         self.initialize_pyttsx3()  # Initialize pyttsx3 right away
+        self.initialize_process_pool()
         
         logger.info("LocalTTSHandler initialized")
     
@@ -53,120 +69,97 @@ class LocalTTSHandler:
         self.initialize_pyttsx3()
     
     async def load_higgs_model(self):
-        """Load Higgs Audio v2 model."""
+        """Start Higgs Audio v2 worker processes; loading and warm-up continue in the background."""
         try:
-            # Add Higgs path to sys.path
-            higgs_path = Path(__file__).parent.parent / "higgs-audio"
-            if higgs_path.exists() and str(higgs_path) not in sys.path:
-                sys.path.insert(0, str(higgs_path))
+            if self.higgs_pool is not None:
+                return
             
-            logger.info("Loading Higgs Audio v2...")
+            config = {'model_name_or_path': self.model_path} if self.model_path else None
+            self.higgs_pool = HiggsWorkerPool(workers=self.higgs_workers, config=config)
+            self.higgs_pool.start()
+            
+            # pyttsx3 serves requests until a worker reports ready
+            logger.info("Loading Higgs Audio v2 in worker process...")
             
-            # Import Higgs Audio v2
-            try:
-                from boson_multimodal.serve.serve_engine import HiggsAudioServeEngine
-                from boson_multimodal.data_types import ChatMLSample, Message
-                
-                # Disable CUDA to avoid dtype issues
-                import torch
-                torch.cuda.is_available = lambda: False
-                
-                # Initialize Higgs serve engine
-                self.higgs_model = HiggsAudioServeEngine(
-                    model_name_or_path="bosonai/higgs-audio-v2-generation-3B-base",
-                    audio_tokenizer_name_or_path="bosonai/higgs-audio-v2-tokenizer",
-                    device="cpu",
-                    torch_dtype=torch.float32,
-                    kv_cache_lengths=[512]  # Smaller cache for faster generation
-                )
-                
-                # Store the data types for later use
-                self.ChatMLSample = ChatMLSample
-                self.Message = Message
-                
-                logger.info("Higgs Audio v2 loaded successfully")
-                
-            except ImportError as e:
-                logger.warning(f"Higgs Audio v2 not available: {e}")
-                self.higgs_model = None
-            except Exception as e:
-                logger.warning(f"Error initializing Higgs: {e}")
-                self.higgs_model = None
-                
         except Exception as e:
-            logger.error(f"Error loading Higgs model: {e}")
-            self.higgs_model = None
+            logger.error(f"Error starting Higgs workers: {e}")
+            self.higgs_pool = None
     
     def initialize_pyttsx3(self):
-        """Initialize pyttsx3 TTS engine."""
-        try:
-            self.pyttsx3_engine = pyttsx3.init()
+        """Start the pyttsx3 worker."""
+        if self.pyttsx3_worker is not None:
+            self.pyttsx3_worker.stop()
+        
+        # Optimize voice settings for more natural speech
+        self.voice_speed = 140  # Slightly slower for more gravitas
+        self.voice_volume = 0.9
+        
+        worker = Pyttsx3Worker(
+            rate=self.voice_speed,
+            volume=self.voice_volume,
+            voice_selector=self.select_best_voice
+        )
+        
+        if worker.start():
+            self.pyttsx3_worker = worker
+            logger.info("pyttsx3 TTS engine initialized")
+        else:
+            worker.stop()
+            self.pyttsx3_worker = None
+    
+    def initialize_process_pool(self):
+        """Start pyttsx3 engines in worker processes for parallel sentence synthesis."""
+        if self.synthesis_processes <= 0:
+            return
+        
+        pool = Pyttsx3ProcessPool(processes=self.synthesis_processes)
+        self.process_pool = pool if pool.start() else None
+    
+    def select_best_voice(self, voices):
+        """Enhanced voice selection for better Vonnegut-like sound (runs on the worker thread)."""
+        voice_scores = []
+        
+        for voice in voices:
+            voice_name = voice.name.lower()
+            voice_id = voice.id.lower()
+            score = 0
             
-            # Configure voice settings
-            self.pyttsx3_engine.setProperty('rate', self.voice_speed)
-            self.pyttsx3_engine.setProperty('volume', self.voice_volume)
+            # Prefer male voices
+            if any(keyword in voice_name for keyword in ['male', 'man', 'masculine']):
+                score += 3
             
-            # Try to find a suitable voice
-            voices = self.pyttsx3_engine.getProperty('voices')
+            # Look for mature/older sounding voices
+            if any(keyword in voice_name for keyword in ['david', 'mark', 'alex', 'tom', 'paul', 'william', 'richard']):
+                score += 2
             
-            # Enhanced voice selection for better Vonnegut-like sound
-            best_voice = None
-            voice_scores = []
+            # Prefer SAPI voices (usually better quality on Windows)
+            if 'sapi' in voice_id or 'microsoft' in voice_id:
+                score += 1
             
-            for voice in voices:
-                voice_name = voice.name.lower()
-                voice_id = voice.id.lower()
-                score = 0
-                
-                # Prefer male voices
-                if any(keyword in voice_name for keyword in ['male', 'man', 'masculine']):
-                    score += 3
-                
-                # Look for mature/older sounding voices
-                if any(keyword in voice_name for keyword in ['david', 'mark', 'alex', 'tom', 'paul', 'william', 'richard']):
-                    score += 2
-                
-                # Prefer SAPI voices (usually better quality on Windows)
-                if 'sapi' in voice_id or 'microsoft' in voice_id:
-                    score += 1
-                
-                # Avoid obviously robotic voices
-                if any(keyword in voice_name for keyword in ['robotic', 'synthetic', 'computer']):
-                    score -= 2
-                
-                # Platform-specific preferences
-                if sys.platform.startswith('win'):
-                    # Windows: prefer David, Mark, or Zira voices
-                    if any(name in voice_name for name in ['david', 'mark']):
-                        score += 3
-                elif sys.platform.startswith('darwin'):
-                    # macOS: prefer Alex, Tom, or Daniel
-                    if any(name in voice_name for name in ['alex', 'tom', 'daniel']):
-                        score += 3
-                
-                voice_scores.append((score, voice))
-                logger.debug(f"Voice: {voice.name} (Score: {score})")
+            # Avoid obviously robotic voices
+            if any(keyword in voice_name for keyword in ['robotic', 'synthetic', 'computer']):
+                score -= 2
             
-            # Select best voice
-            if voice_scores:
-                voice_scores.sort(key=lambda x: x[0], reverse=True)
-                best_voice = voice_scores[0][1]
-                self.pyttsx3_engine.setProperty('voice', best_voice.id)
-                logger.info(f"Selected voice: {best_voice.name} (Score: {voice_scores[0][0]})")
-            else:
-                logger.info("Using default system voice")
-            
-            # Optimize voice settings for more natural speech
-            self.voice_speed = 140  # Slightly slower for more gravitas
-            self.voice_volume = 0.9
-            self.pyttsx3_engine.setProperty('rate', self.voice_speed)
-            self.pyttsx3_engine.setProperty('volume', self.voice_volume)
-            
-            logger.info("pyttsx3 TTS engine initialized")
+            # Platform-specific preferences
+            if sys.platform.startswith('win'):
+                # Windows: prefer David, Mark, or Zira voices
+                if any(name in voice_name for name in ['david', 'mark']):
+                    score += 3
+            elif sys.platform.startswith('darwin'):
+                # macOS: prefer Alex, Tom, or Daniel
+                if any(name in voice_name for name in ['alex', 'tom', 'daniel']):
+                    score += 3
             
-        except Exception as e:
-            logger.error(f"Error initializing pyttsx3: {e}")
-            self.pyttsx3_engine = None
+            voice_scores.append((score, voice))
+            logger.debug(f"Voice: {voice.name} (Score: {score})")
+        
+        # Select best voice
+        if voice_scores:
+            voice_scores.sort(key=lambda x: x[0], reverse=True)
+            return voice_scores[0][1]
+        
+        logger.info("Using default system voice")
+        return None
     
     async def synthesize_speech(self, text: str, voice_id: str = "vonnegut") -> Optional[np.ndarray]:
         """
@@ -181,21 +174,14 @@ class LocalTTSHandler:
         """
         try:
             logger.info(f"Synthesizing speech: '{text[:50]}...'")
-            logger.info(f"Available engines - Higgs: {self.higgs_model is not None}, pyttsx3: {self.pyttsx3_engine is not None}")
-            
-            # Try Higgs model first
-            if self.higgs_model:
-                logger.info("Using Higgs model for synthesis")
-                return await self.synthesize_higgs(text, voice_id)
+            logger.info(f"Available engines - Higgs: {self.higgs_ready()}, pyttsx3: {self.pyttsx3_worker is not None}")
             
-            # Fall back to pyttsx3
-            elif self.pyttsx3_engine:
-                logger.info("Using pyttsx3 for synthesis")
-                return await self.synthesize_pyttsx3(text)
-            
-            else:
+            if not self.higgs_ready() and not self.pyttsx3_worker:
                 logger.error("No TTS engine available")
                 return None
+            
+            # Sentences are synthesized concurrently and reassembled in order
+            return await self.scheduler.synthesize(text)
                 
         except Exception as e:
             logger.error(f"Error in speech synthesis: {e}")
@@ -203,121 +189,85 @@ class LocalTTSHandler:
             traceback.print_exc()
             return None
     
+    async def stream_speech(self, text: str) -> AsyncIterator[np.ndarray]:
+        """
+        Synthesize speech sentence by sentence.
+        
+        Yields:
+            Audio chunks in order; the first arrives as soon as the first
+            sentence is synthesized
+        """
+        async for chunk in self.scheduler.stream(text):
+            yield chunk
+    
+    async def synthesize_sentence(self, text: str, voice_id: str = "vonnegut") -> Optional[np.ndarray]:
+        """Synthesize one sentence: Higgs first, then pyttsx3 (in a pool process when available)."""
+        if self.higgs_ready():
+            audio_data = await self.synthesize_higgs(text, voice_id)
+            if audio_data is not None:
+                return audio_data
+        
+        if self.process_pool:
+            current_voice = self.pyttsx3_worker.voice_info.get('current_voice') if self.pyttsx3_worker else None
+            result = await self.process_pool.synthesize(
+                text,
+                rate=self.voice_speed,
+                volume=self.voice_volume,
+                voice=current_voice['id'] if current_voice else None
+            )
+            if result is not None:
+                audio_data, sample_rate = result
+                return resample(audio_data, sample_rate, self.sample_rate)
+        
+        return await self.synthesize_pyttsx3(text)
+    
     async def synthesize_higgs(self, text: str, voice_id: str = "vonnegut") -> Optional[np.ndarray]:
-        """Synthesize speech using Higgs Audio v2."""
+        """Synthesize speech using the Higgs Audio v2 worker processes."""
         try:
             logger.info(f"Synthesizing with Higgs: {text[:50]}...")
             
-            if not self.higgs_model:
+            if not self.higgs_ready():
                 logger.warning("Higgs model not loaded")
                 return None
             
-            # Create message for Higgs
-            message = self.Message(role="user", content=[text])
-            sample = self.ChatMLSample(messages=[message])
-            
-            # Generate audio
-            response = self.higgs_model.generate(
-                chat_ml_sample=sample,
-                max_new_tokens=100,  # Limit for faster generation
-                temperature=0.8,
-                force_audio_gen=True  # Force audio generation
-            )
-            
-            if response.audio is not None:
-                logger.info(f"Higgs synthesis complete: {len(response.audio)/response.sampling_rate:.2f}s")
-                
-                # Resample if necessary
-                if response.sampling_rate != self.sample_rate:
-                    # Simple resampling
-                    ratio = self.sample_rate / response.sampling_rate
-                    new_length = int(len(response.audio) * ratio)
-                    audio_data = np.interp(
-                        np.linspace(0, len(response.audio), new_length),
-                        np.arange(len(response.audio)),
-                        response.audio
-                    )
-                    return audio_data.astype(np.float32)
-                else:
-                    return response.audio.astype(np.float32)
-            else:
+            # Generated out of process; the event loop stays free
+            result = await self.higgs_pool.synthesize(text)
+            if result is None:
                 logger.warning("Higgs generated no audio")
                 return None
             
+            audio_data, sample_rate = result
+            logger.info(f"Higgs synthesis complete: {len(audio_data)/sample_rate:.2f}s")
+            
+            # Resample if necessary
+            return resample(audio_data, sample_rate, self.sample_rate)
+            
         except Exception as e:
             logger.error(f"Error in Higgs synthesis: {e}")
-            import traceback
-            traceback.print_exc()
             return None
     
     async def synthesize_pyttsx3(self, text: str) -> Optional[np.ndarray]:
-        """Synthesize speech using pyttsx3."""
+        """Synthesize speech using the pyttsx3 worker."""
         try:
             logger.info(f"Synthesizing with pyttsx3: {text[:50]}...")
             
-            if not self.pyttsx3_engine:
+            if not self.pyttsx3_worker:
                 logger.error("pyttsx3 engine not available")
                 return None
             
-            # Create temporary file for audio output
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                temp_path = temp_file.name
+            # Queued behind any other synthesis; the worker owns the engine
+            result = await self.pyttsx3_worker.synthesize(text)
+            if result is None:
+                return None
+            
+            audio_data, sample_rate = result
+            
+            # Resample if necessary
+            audio_data = resample(audio_data, sample_rate, self.sample_rate)
+            
+            logger.info(f"pyttsx3 synthesis complete: {len(audio_data)/self.sample_rate:.2f}s")
+            return audio_data
             
-            try:
-                # Use threading to avoid blocking
-                synthesis_complete = threading.Event()
-                error_queue = queue.Queue()
-                
-                def synthesis_thread():
-                    try:
-                        self.pyttsx3_engine.save_to_file(text, temp_path)
-                        self.pyttsx3_engine.runAndWait()
-                        synthesis_complete.set()
-                    except Exception as e:
-                        error_queue.put(e)
-                        synthesis_complete.set()
-                
-                thread = threading.Thread(target=synthesis_thread)
-                thread.start()
-                
-                # Wait for synthesis to complete (with timeout)
-                thread.join(timeout=30)  # 30 second timeout
-                
-                if not synthesis_complete.is_set():
-                    logger.error("pyttsx3 synthesis timed out")
-                    return None
-                
-                if not error_queue.empty():
-                    error = error_queue.get()
-                    logger.error(f"pyttsx3 synthesis error: {error}")
-                    return None
-                
-                # Load the generated audio file
-                if os.path.exists(temp_path):
-                    audio_data, sample_rate = sf.read(temp_path)
-                    
-                    # Resample if necessary
-                    if sample_rate != self.sample_rate:
-                        # Simple resampling (use librosa for better quality in production)
-                        ratio = self.sample_rate / sample_rate
-                        new_length = int(len(audio_data) * ratio)
-                        audio_data = np.interp(
-                            np.linspace(0, len(audio_data), new_length),
-                            np.arange(len(audio_data)),
-                            audio_data
-                        )
-                    
-                    logger.info(f"pyttsx3 synthesis complete: {len(audio_data)/self.sample_rate:.2f}s")
-                    return audio_data.astype(np.float32)
-                else:
-                    logger.error("pyttsx3 failed to create audio file")
-                    return None
-                    
-            finally:
-                # Clean up temporary file
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-                    
         except Exception as e:
             logger.error(f"Error in pyttsx3 synthesis: {e}")
             return None
@@ -325,10 +275,14 @@ class LocalTTSHandler:
     def get_available_engines(self) -> Dict[str, bool]:
         """Get status of available TTS engines."""
         return {
-            "higgs": self.higgs_model is not None,
-            "pyttsx3": self.pyttsx3_engine is not None
+            "higgs": self.higgs_ready(),
+            "pyttsx3": self.pyttsx3_worker is not None
         }
     
+    def higgs_ready(self) -> bool:
+        """Whether a Higgs worker has loaded and warmed up the model."""
+        return self.higgs_pool is not None and self.higgs_pool.ready
+    
     def get_voice_info(self) -> Dict[str, Any]:
         """Get information about current voice settings."""
         info = {
@@ -336,50 +290,41 @@ class LocalTTSHandler:
             "engines": self.get_available_engines()
         }
         
-        if self.pyttsx3_engine:
-            try:
-                voices = self.pyttsx3_engine.getProperty('voices')
-                current_voice = self.pyttsx3_engine.getProperty('voice')
-                
-                current_voice_info = None
-                for voice in voices:
-                    if voice.id == current_voice:
-                        current_voice_info = {
-                            "id": voice.id,
-                            "name": voice.name,
-                            "age": getattr(voice, 'age', 'unknown'),
-                            "gender": getattr(voice, 'gender', 'unknown')
-                        }
-                        break
-                
-                info["pyttsx3"] = {
-                    "current_voice": current_voice_info,
-                    "available_voices": len(voices),
-                    "rate": self.pyttsx3_engine.getProperty('rate'),
-                    "volume": self.pyttsx3_engine.getProperty('volume')
-                }
-            except Exception as e:
-                logger.error(f"Error getting voice info: {e}")
+        if self.pyttsx3_worker:
+            info["pyttsx3"] = dict(self.pyttsx3_worker.voice_info)
         
         return info
     
-    def set_voice_settings(self, speed: Optional[int] = None, volume: Optional[float] = None):
-        """Update voice settings for pyttsx3."""
+    async def set_voice_settings(self, speed: Optional[int] = None, volume: Optional[float] = None):
+        """Update voice settings for pyttsx3 (applied by the worker between utterances)."""
         try:
-            if self.pyttsx3_engine:
-                if speed is not None:
-                    self.voice_speed = speed
-                    self.pyttsx3_engine.setProperty('rate', speed)
-                
-                if volume is not None:
-                    self.voice_volume = volume
-                    self.pyttsx3_engine.setProperty('volume', volume)
-                
+            properties = {}
+            
+            if speed is not None:
+                self.voice_speed = speed
+                properties['rate'] = speed
+            
+            if volume is not None:
+                self.voice_volume = volume
+                properties['volume'] = volume
+            
+            if self.pyttsx3_worker and properties:
+                await self.pyttsx3_worker.set_properties(**properties)
                 logger.info(f"Voice settings updated: speed={self.voice_speed}, volume={self.voice_volume}")
         
         except Exception as e:
             logger.error(f"Error updating voice settings: {e}")
     
+    def get_stats(self) -> Dict[str, Any]:
+        """Get synthesis worker statistics."""
+        return {
+            "engines": self.get_available_engines(),
+            "pyttsx3_worker": self.pyttsx3_worker.get_stats() if self.pyttsx3_worker else None,
+            "process_pool": self.process_pool.get_stats() if self.process_pool else None,
+            "scheduler": self.scheduler.get_stats(),
+            "higgs": self.higgs_pool.get_health() if self.higgs_pool else None
+        }
+    
     async def test_synthesis(self, test_text: str = "Listen: So it goes. This is a test of the voice synthesis system.") -> bool:
         """Test TTS synthesis with sample text."""
         try:
@@ -5,40 +5,53 @@ Falls back to pyttsx3 for stability.
 
 import logging
 import numpy as np
-import soundfile as sf
 import asyncio
-import pyttsx3
-import tempfile
-import os
 import sys
 from pathlib import Path
-from typing import Optional, Dict, Any
-import threading
-import queue
+from typing import Optional, Dict, Any, AsyncIterator
+
+from tts_worker import Pyttsx3Worker, Pyttsx3ProcessPool, default_synthesis_processes
+from tts_scheduler import SentenceScheduler
+from higgs_server import HiggsWorkerPool
+from audio_utils import resample
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class LocalTTSHandler:
-    def __init__(self, use_higgs: bool = False):
+    def __init__(self, use_higgs: bool = False, synthesis_processes: Optional[int] = None):
         """
         Initialize local TTS handler.
         
         Args:
-            use_higgs: Whether to attempt loading Higgs (disabled by default for stability)
+            use_higgs: Whether to start Higgs worker processes (disabled by default; pyttsx3 is lighter)
+            synthesis_processes: pyttsx3 processes for parallel sentence synthesis
+                (None = one per core up to four; 0 = worker thread only)
         """
         self.use_higgs = use_higgs
-        self.higgs_model = None
-        self.pyttsx3_engine = None
+        self.higgs_pool = None  # Higgs runs in a worker process when enabled
+        self.pyttsx3_worker = None  # Owns the pyttsx3 engine on its own thread
+        if synthesis_processes is None:
+            synthesis_processes = default_synthesis_processes()
+        self.synthesis_processes = synthesis_processes
+        self.process_pool = None
         
         # Audio settings
         self.sample_rate = 22050
         self.voice_speed = 140  # Slower for Vonnegut gravitas
         self.voice_volume = 0.9
         
+        # Split responses into sentences so playback starts after the first one
+        self.scheduler = SentenceScheduler(
+            self.synthesize_sentence,
+            self.sample_rate,
+            max_parallel=max(2, synthesis_processes)
+        )
+        
         # Initialize pyttsx3 immediately
         self.initialize_pyttsx3()
+        self.initialize_process_pool()
         
         logger.info(f"LocalTTSHandler initialized (Higgs: {'enabled' if use_higgs else 'disabled'})")
     
@@ -51,36 +64,40 @@ class LocalTTSHandler:
         # pyttsx3 already initialized in __init__
     
     async def load_higgs_model(self):
-        """Load Higgs Audio v2 model (lightweight version)."""
+        """Start a Higgs Audio v2 worker process; pyttsx3 serves requests until it is warm."""
         try:
-            logger.info("Higgs loading disabled for stability - using enhanced pyttsx3")
-            self.higgs_model = None
+            if self.higgs_pool is None:
+                self.higgs_pool = HiggsWorkerPool(workers=1)
+                self.higgs_pool.start()
         except Exception as e:
-            logger.error(f"Error loading Higgs model: {e}")
-            self.higgs_model = None
+            logger.error(f"Error starting Higgs worker: {e}")
+            self.higgs_pool = None
     
     def initialize_pyttsx3(self):
-        """Initialize pyttsx3 TTS engine with best voice selection."""
-        try:
-            self.pyttsx3_engine = pyttsx3.init()
-            
-            # Configure voice settings
-            self.pyttsx3_engine.setProperty('rate', self.voice_speed)
-            self.pyttsx3_engine.setProperty('volume', self.voice_volume)
-            
-            # Find best voice
-            voices = self.pyttsx3_engine.getProperty('voices')
-            best_voice = self.select_best_voice(voices)
-            
-            if best_voice:
-                self.pyttsx3_engine.setProperty('voice', best_voice.id)
-                logger.info(f"Selected voice: {best_voice.name}")
-            
+        """Start the pyttsx3 worker with best voice selection."""
+        if self.pyttsx3_worker is not None:
+            self.pyttsx3_worker.stop()
+        
+        worker = Pyttsx3Worker(
+            rate=self.voice_speed,
+            volume=self.voice_volume,
+            voice_selector=self.select_best_voice
+        )
+        
+        if worker.start():
+            self.pyttsx3_worker = worker
             logger.info("pyttsx3 TTS engine initialized")
-            
-        except Exception as e:
-            logger.error(f"Error initializing pyttsx3: {e}")
-            self.pyttsx3_engine = None
+        else:
+            worker.stop()
+            self.pyttsx3_worker = None
+    
+    def initialize_process_pool(self):
+        """Start pyttsx3 engines in worker processes for parallel sentence synthesis."""
+        if self.synthesis_processes <= 0:
+            return
+        
+        pool = Pyttsx3ProcessPool(processes=self.synthesis_processes)
+        self.process_pool = pool if pool.start() else None
     
     def select_best_voice(self, voices):
         """Select the best available voice for Vonnegut."""
@@ -123,76 +140,66 @@ class LocalTTSHandler:
         try:
             logger.info(f"Synthesizing: '{text[:50]}...'")
             
-            # Always use pyttsx3 for stability
-            return await self.synthesize_pyttsx3(text)
+            # Sentences are synthesized concurrently and reassembled in order
+            return await self.scheduler.synthesize(text)
                 
         except Exception as e:
             logger.error(f"Error in speech synthesis: {e}")
             return None
     
+    async def stream_speech(self, text: str) -> AsyncIterator[np.ndarray]:
+        """
+        Synthesize speech sentence by sentence.
+        
+        Yields:
+            Audio chunks in order; the first arrives as soon as the first
+            sentence is synthesized
+        """
+        async for chunk in self.scheduler.stream(text):
+            yield chunk
+    
+    async def synthesize_sentence(self, text: str) -> Optional[np.ndarray]:
+        """Synthesize one sentence: Higgs when warm, else pyttsx3 (in a pool process when available)."""
+        if self.higgs_pool is not None and self.higgs_pool.ready:
+            result = await self.higgs_pool.synthesize(text)
+            if result is not None:
+                audio_data, sample_rate = result
+                return resample(audio_data, sample_rate, self.sample_rate)
+        
+        if self.process_pool:
+            current_voice = self.pyttsx3_worker.voice_info.get('current_voice') if self.pyttsx3_worker else None
+            result = await self.process_pool.synthesize(
+                text,
+                rate=self.voice_speed,
+                volume=self.voice_volume,
+                voice=current_voice['id'] if current_voice else None
+            )
+            if result is not None:
+                audio_data, sample_rate = result
+                return resample(audio_data, sample_rate, self.sample_rate)
+        
+        return await self.synthesize_pyttsx3(text)
+    
     async def synthesize_pyttsx3(self, text: str) -> Optional[np.ndarray]:
-        """Synthesize speech using pyttsx3."""
+        """Synthesize speech using the pyttsx3 worker."""
         try:
-            if not self.pyttsx3_engine:
+            if not self.pyttsx3_worker:
                 logger.error("pyttsx3 engine not available")
                 return None
             
-            # Create temporary file for audio output
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                temp_path = temp_file.name
+            # Queued behind any other synthesis; the worker owns the engine
+            result = await self.pyttsx3_worker.synthesize(text)
+            if result is None:
+                return None
+            
+            audio_data, sample_rate = result
+            
+            # Resample if necessary
+            audio_data = resample(audio_data, sample_rate, self.sample_rate)
+            
+            logger.info(f"Synthesis complete: {len(audio_data)/self.sample_rate:.2f}s")
+            return audio_data
             
-            try:
-                # Use threading to avoid blocking
-                synthesis_complete = threading.Event()
-                error_queue = queue.Queue()
-                
-                def synthesis_thread():
-                    try:
-                        self.pyttsx3_engine.save_to_file(text, temp_path)
-                        self.pyttsx3_engine.runAndWait()
-                        synthesis_complete.set()
-                    except Exception as e:
-                        error_queue.put(e)
-                        synthesis_complete.set()
-                
-                thread = threading.Thread(target=synthesis_thread)
-                thread.start()
-                thread.join(timeout=30)
-                
-                if not synthesis_complete.is_set():
-                    logger.error("pyttsx3 synthesis timed out")
-                    return None
-                
-                if not error_queue.empty():
-                    error = error_queue.get()
-                    logger.error(f"pyttsx3 synthesis error: {error}")
-                    return None
-                
-                # Load the generated audio file
-                if os.path.exists(temp_path):
-                    audio_data, sample_rate = sf.read(temp_path)
-                    
-                    # Resample if necessary
-                    if sample_rate != self.sample_rate:
-                        ratio = self.sample_rate / sample_rate
-                        new_length = int(len(audio_data) * ratio)
-                        audio_data = np.interp(
-                            np.linspace(0, len(audio_data), new_length),
-                            np.arange(len(audio_data)),
-                            audio_data
-                        )
-                    
-                    logger.info(f"Synthesis complete: {len(audio_data)/self.sample_rate:.2f}s")
-                    return audio_data.astype(np.float32)
-                else:
-                    logger.error("pyttsx3 failed to create audio file")
-                    return None
-                    
-            finally:
-                # Clean up temporary file
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-                    
         except Exception as e:
             logger.error(f"Error in pyttsx3 synthesis: {e}")
             return None
@@ -200,8 +207,8 @@ class LocalTTSHandler:
     def get_available_engines(self) -> Dict[str, bool]:
         """Get status of available TTS engines."""
         return {
-            "higgs": self.higgs_model is not None,
-            "pyttsx3": self.pyttsx3_engine is not None
+            "higgs": self.higgs_pool is not None and self.higgs_pool.ready,
+            "pyttsx3": self.pyttsx3_worker is not None
         }
     
     def get_voice_info(self) -> Dict[str, Any]:
@@ -211,30 +218,41 @@ class LocalTTSHandler:
             "engines": self.get_available_engines()
         }
         
-        if self.pyttsx3_engine:
-            try:
-                voices = self.pyttsx3_engine.getProperty('voices')
-                current_voice = self.pyttsx3_engine.getProperty('voice')
-                
-                current_voice_info = None
-                for voice in voices:
-                    if voice.id == current_voice:
-                        current_voice_info = {
-                            "id": voice.id,
-                            "name": voice.name
-                        }
-                        break
-                
-                info["pyttsx3"] = {
-                    "current_voice": current_voice_info,
-                    "rate": self.pyttsx3_engine.getProperty('rate'),
-                    "volume": self.pyttsx3_engine.getProperty('volume')
-                }
-            except Exception as e:
-                logger.error(f"Error getting voice info: {e}")
+        if self.pyttsx3_worker:
+            info["pyttsx3"] = dict(self.pyttsx3_worker.voice_info)
         
         return info
     
+    async def set_voice_settings(self, speed: Optional[int] = None, volume: Optional[float] = None):
+        """Update voice settings for pyttsx3 (applied by the worker between utterances)."""
+        try:
+            properties = {}
+            
+            if speed is not None:
+                self.voice_speed = speed
+                properties['rate'] = speed
+            
+            if volume is not None:
+                self.voice_volume = volume
+                properties['volume'] = volume
+            
+            if self.pyttsx3_worker and properties:
+                await self.pyttsx3_worker.set_properties(**properties)
+                logger.info(f"Voice settings updated: speed={self.voice_speed}, volume={self.voice_volume}")
+        
+        except Exception as e:
+            logger.error(f"Error updating voice settings: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get synthesis worker statistics."""
+        return {
+            "engines": self.get_available_engines(),
+            "pyttsx3_worker": self.pyttsx3_worker.get_stats() if self.pyttsx3_worker else None,
+            "process_pool": self.process_pool.get_stats() if self.process_pool else None,
+            "scheduler": self.scheduler.get_stats(),
+            "higgs": self.higgs_pool.get_health() if self.higgs_pool else None
+        }
+    
     async def test_synthesis(self, test_text: str = "Listen: So it goes.") -> bool:
         """Test TTS synthesis with sample text."""
         try:
@@ -259,7 +277,7 @@ async def test_local_tts():
     logger.info("Testing Lightweight Local TTS Handler...")
     
     # Initialize TTS handler
-    tts = LocalTTSHandler(use_higgs=False)  # Disable Higgs for stability
+    tts = LocalTTSHandler(use_higgs=False)  # pyttsx3 only
     
     # Test synthesis
     success = await tts.test_synthesis("Hi ho. Listen: So it goes.")
@@ -0,0 +1,68 @@
+"""
+Lightweight runtime metrics for the conversation system.
+Rolling latency statistics and counters reported through get_stats().
+"""
+
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+
+class LatencyStats:
+    """Rolling latency statistics over the most recent samples."""
+    
+    def __init__(self, window: int = 500):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+    
+    def record(self, seconds: float):
+        """Record one successful operation."""
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+    
+    def record_error(self):
+        """Record one failed operation."""
+        self.errors += 1
+    
+    def timer(self) -> "LatencyTimer":
+        """Context manager that records the elapsed time of its block."""
+        return LatencyTimer(self)
+    
+    def get_stats(self) -> Dict[str, Optional[float]]:
+        """Summary of recorded latencies in milliseconds."""
+        if not self.samples:
+            return {'count': self.count, 'errors': self.errors}
+        
+        recent = np.fromiter(self.samples, dtype=np.float64) * 1000.0
+        p50, p95 = np.percentile(recent, [50, 95])
+        
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'mean_ms': round(self.total / self.count * 1000.0, 2),
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'max_ms': round(float(recent.max()), 2)
+        }
+
+class LatencyTimer:
+    """Records elapsed time into a LatencyStats; failures count as errors."""
+    
+    def __init__(self, stats: LatencyStats):
+        self.stats = stats
+        self.start = None
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.stats.record(time.perf_counter() - self.start)
+        else:
+            self.stats.record_error()
+        return False
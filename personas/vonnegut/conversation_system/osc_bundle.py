@@ -0,0 +1,163 @@
+"""
+Batched OSC output.
+Everything that describes one instant (a frame of blendshapes, a frame of
+audio features) goes out as a single timetagged OSC bundle in one UDP
+datagram, instead of one datagram per value. The bundle layout for a
+fixed set of addresses is built once; encoding a frame only writes the
+timetag and the float arguments into the preallocated buffer with one
+vectorized copy. Addresses are unchanged, so receivers that read plain
+messages (TouchDesigner's OSC In CHOP) see the same channels.
+
+Bundles are sent with a plain UDP socket; no OSC library is needed.
+"""
+
+import logging
+import socket
+import struct
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BUNDLE_TAG = b"#bundle\0"
+TIMETAG = struct.Struct('>Q')
+NTP_EPOCH_OFFSET = 2208988800  # Seconds from 1900 (OSC time) to 1970 (Unix time)
+IMMEDIATELY = 1
+
+def osc_string(value: str) -> bytes:
+    """OSC string: ASCII, null terminated, padded to a multiple of four bytes."""
+    data = value.encode('ascii') + b"\0"
+    return data + b"\0" * (-len(data) % 4)
+
+def osc_timetag(unix_time: Optional[float] = None) -> int:
+    """64-bit NTP timetag for a Unix time (None: 'immediately')."""
+    if unix_time is None:
+        return IMMEDIATELY
+    seconds = unix_time + NTP_EPOCH_OFFSET
+    return (int(seconds) << 32) | int((seconds % 1.0) * (1 << 32))
+
+class OSCBundleEncoder:
+    """Preallocated bundle of single-float messages for a fixed list of addresses."""
+    
+    def __init__(self, addresses: Sequence[str]):
+        """
+        Initialize encoder.
+        
+        Args:
+            addresses: OSC address of each value, in the order values are passed to encode()
+        """
+        self.addresses = list(addresses)
+        
+        layout = bytearray(BUNDLE_TAG + TIMETAG.pack(IMMEDIATELY))
+        value_offsets = []
+        for address in self.addresses:
+            message = osc_string(address) + osc_string(",f")
+            layout += struct.pack('>i', len(message) + 4) + message
+            value_offsets.append(len(layout))
+            layout += b"\0\0\0\0"
+        
+        self.buffer = np.frombuffer(layout, dtype=np.uint8).copy()
+        
+        # Byte positions of every float argument, for one fancy-indexed copy per frame
+        self.value_bytes = (np.asarray(value_offsets, dtype=np.int64)[:, None] + np.arange(4)).reshape(-1)
+        self.values = np.zeros(len(self.addresses), dtype='>f4')
+    
+    def __len__(self) -> int:
+        return len(self.addresses)
+    
+    @property
+    def size(self) -> int:
+        """Bytes per bundle."""
+        return len(self.buffer)
+    
+    def encode(self, values, unix_time: Optional[float] = None) -> memoryview:
+        """
+        Fill the bundle with one frame of values.
+        
+        Args:
+            values: One float per address
+            unix_time: Time the values apply to (None: 'immediately')
+        
+        Returns:
+            View of the encoded bundle; valid until the next encode()
+        """
+        self.values[:] = values
+        self.buffer[self.value_bytes] = self.values.view(np.uint8)
+        TIMETAG.pack_into(self.buffer, len(BUNDLE_TAG), osc_timetag(unix_time))
+        return memoryview(self.buffer)
+
+class OSCSender:
+    """Sends OSC bundles to one UDP destination."""
+    
+    def __init__(self, host: str = "localhost", port: int = 9000, max_layouts: int = 16):
+        """
+        Initialize sender.
+        
+        Args:
+            host: Receiver host
+            port: Receiver UDP port
+            max_layouts: Bundle layouts (address lists) kept for reuse
+        """
+        self.address = (socket.gethostbyname(host), port)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.max_layouts = max_layouts
+        self.encoders: Dict[tuple, OSCBundleEncoder] = {}
+        
+        self.bundles_sent = 0
+        self.values_sent = 0
+        self.bytes_sent = 0
+        self.send_errors = 0
+    
+    def encoder(self, addresses: Sequence[str]) -> OSCBundleEncoder:
+        """Bundle layout for an address list, built on first use."""
+        key = tuple(addresses)
+        encoder = self.encoders.get(key)
+        if encoder is None:
+            if len(self.encoders) >= self.max_layouts:
+                self.encoders.pop(next(iter(self.encoders)))
+            encoder = self.encoders[key] = OSCBundleEncoder(key)
+        return encoder
+    
+    def send_bundle(self, addresses: Sequence[str], values, unix_time: Optional[float] = None) -> bool:
+        """
+        Send one value per address as a single datagram.
+        
+        Returns:
+            True if the datagram was handed to the network stack
+        """
+        encoder = self.encoder(addresses)
+        try:
+            self.bytes_sent += self.socket.sendto(encoder.encode(values, unix_time), self.address)
+        except OSError as e:
+            # A full socket buffer or an absent receiver only loses this frame
+            self.send_errors += 1
+            logger.debug(f"OSC send failed: {e}")
+            return False
+        
+        self.bundles_sent += 1
+        self.values_sent += len(encoder)
+        return True
+    
+    def close(self):
+        """Close the socket."""
+        self.socket.close()
+    
+    def get_stats(self) -> Dict:
+        """Get output statistics."""
+        return {
+            'destination': f"{self.address[0]}:{self.address[1]}",
+            'bundles_sent': self.bundles_sent,
+            'values_sent': self.values_sent,
+            'bytes_sent': self.bytes_sent,
+            'send_errors': self.send_errors,
+            'layouts': len(self.encoders)
+        }
+
+def loop_to_unix(when: float, loop) -> float:
+    """Unix time of an event loop timestamp, for timetags."""
+    return time.time() + (when - loop.time())
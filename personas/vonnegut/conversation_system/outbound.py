@@ -0,0 +1,148 @@
+"""
+Outbound message channel for a websocket client.
+A bounded queue drained by a writer task, so a slow client only ever
+delays itself. Frequent state frames (e.g. hologram data) are coalesced
+to the latest value instead of queueing up. Messages can carry a tag so
+that a group of still-unsent messages (e.g. the audio of a cancelled
+response) can be discarded.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class OutboundChannel:
+    """Per-client outbound queue with a dedicated writer task."""
+    
+    def __init__(self, websocket, maxsize: int = 256):
+        """
+        Initialize outbound channel.
+        
+        Args:
+            websocket: Connection the writer sends on
+            maxsize: Queued messages before non-blocking sends are dropped
+        """
+        self.websocket = websocket
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        
+        # Latest pending payload per coalesce key; the queue holds a marker
+        self.latest: Dict[str, str] = {}
+        self.closed = False
+        
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.discarded = 0
+    
+    async def put(self, payload: str, tag: Optional[str] = None):
+        """
+        Queue a message, waiting for space (back-pressure for direct replies).
+        
+        Args:
+            payload: Serialized message
+            tag: Group the message belongs to, for discard()
+        """
+        if not self.closed:
+            await self.queue.put(payload if tag is None else (payload, tag))
+    
+    def discard(self, tag: str) -> int:
+        """
+        Drop every still-unsent message with a tag, keeping the order of the rest.
+        
+        Returns:
+            Number of messages dropped
+        """
+        kept = []
+        dropped = 0
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if isinstance(item, tuple) and len(item) == 2 and item[1] == tag:
+                dropped += 1
+            else:
+                kept.append(item)
+        
+        for item in kept:
+            self.queue.put_nowait(item)
+        
+        self.discarded += dropped
+        return dropped
+    
+    def offer(self, payload: str, coalesce_key: Optional[str] = None) -> bool:
+        """
+        Queue a message without waiting.
+        
+        Args:
+            payload: Serialized message
+            coalesce_key: Replace any still-unsent message with the same key
+        
+        Returns:
+            True if the message was queued or coalesced, False if dropped
+        """
+        if self.closed:
+            return False
+        
+        if coalesce_key is not None:
+            if coalesce_key in self.latest:
+                self.latest[coalesce_key] = payload
+                self.coalesced += 1
+                return True
+            
+            try:
+                self.queue.put_nowait((coalesce_key,))
+            except asyncio.QueueFull:
+                self.dropped += 1
+                return False
+            
+            self.latest[coalesce_key] = payload
+            return True
+        
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        return True
+    
+    async def run(self):
+        """Writer task: send queued messages in order until closed or cancelled."""
+        try:
+            while True:
+                item = await self.queue.get()
+                
+                if isinstance(item, tuple) and len(item) == 2:
+                    payload = item[0]  # Tagged message
+                elif isinstance(item, tuple):
+                    payload = self.latest.pop(item[0], None)
+                    if payload is None:
+                        continue
+                else:
+                    payload = item
+                
+                await self.websocket.send(payload)
+                self.sent += 1
+        
+        except Exception as e:
+            logger.error(f"Outbound writer stopped: {e}")
+        finally:
+            self.close()
+    
+    def close(self):
+        """Stop accepting messages and release queued payloads."""
+        self.closed = True
+        self.latest.clear()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+    
+    def get_stats(self) -> Dict:
+        """Get outbound statistics."""
+        return {
+            'queued': self.queue.qsize(),
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'discarded': self.discarded
+        }
@@ -0,0 +1,123 @@
+"""
+Clock-paced audio streaming.
+Sends an answer's audio as binary int16 frames at real-time rate. Each
+frame is scheduled against a monotonic clock anchored at the start of
+playback (plus a small lookahead), so pacing never drifts however long
+the answer is. A send that blocks (the socket's write buffer is full)
+delays only that frame, and the next frames catch up to the schedule.
+Lateness beyond the lookahead means the receiver ran dry: an underrun.
+
+Binary frame layout: FRAME_HEADER (sequence number, stream time of the
+first sample in seconds) followed by little-endian 16-bit PCM samples.
+"""
+
+import asyncio
+import logging
+import struct
+from typing import Awaitable, Callable, Dict, Optional
+
+import numpy as np
+
+from audio_utils import float_to_pcm16, to_mono
+from metrics import LatencyStats
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct('<Id')  # sequence, timestamp
+
+class PacedAudioStreamer:
+    """Streams audio frames in step with playback."""
+    
+    def __init__(self, send: Callable[[bytes], Awaitable[None]], sample_rate: int,
+                 frame_duration: float = 0.04, lookahead: float = 0.2):
+        """
+        Initialize streamer.
+        
+        Args:
+            send: Coroutine sending one binary frame (awaiting it is the back-pressure)
+            sample_rate: Sample rate of the audio being streamed
+            frame_duration: Seconds of audio per frame
+            lookahead: Seconds a frame is sent ahead of its playback time
+        """
+        self.send = send
+        self.sample_rate = sample_rate
+        self.frame_samples = max(1, int(round(sample_rate * frame_duration)))
+        self.lookahead = lookahead
+        
+        # Lateness of each frame against its schedule, and time spent blocked in send
+        self.lateness = LatencyStats()
+        self.send_time = LatencyStats()
+        self.streams = 0
+        self.frames_sent = 0
+        self.underruns = 0
+        self.last_drift = None
+    
+    def encode_frame(self, sequence: int, timestamp: float, pcm16: np.ndarray) -> bytes:
+        """Binary frame: header plus int16 samples."""
+        return FRAME_HEADER.pack(sequence, timestamp) + pcm16.astype('<i2', copy=False).tobytes()
+    
+    async def stream(self, audio: np.ndarray, start_time: Optional[float] = None) -> int:
+        """
+        Stream audio frame by frame at real-time rate.
+        
+        Args:
+            audio: Samples at sample_rate (any float dtype or int16; mono or multi-channel)
+            start_time: Event loop time at which playback starts (one lookahead from
+                now by default, so the first frame is due now); pass the playback
+                start to keep the animation locked to it
+        
+        Returns:
+            Number of frames sent
+        """
+        loop = asyncio.get_running_loop()
+        pcm16 = audio if audio.dtype == np.int16 and audio.ndim == 1 else float_to_pcm16(to_mono(audio))
+        
+        frame_seconds = self.frame_samples / self.sample_rate
+        stream_start = loop.time()
+        if start_time is None:
+            start_time = stream_start + self.lookahead
+        
+        sent = 0
+        for sequence, offset in enumerate(range(0, len(pcm16), self.frame_samples)):
+            timestamp = offset / self.sample_rate
+            due = start_time + timestamp - self.lookahead
+            
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            
+            # Late past the lookahead: the receiver has already played what it had.
+            # Frames due before the stream began (playback starting within the
+            # lookahead) are pre-roll and only count lateness from then on
+            late = loop.time() - max(due, stream_start)
+            self.lateness.record(max(late, 0.0))
+            if late > self.lookahead:
+                self.underruns += 1
+            
+            frame = self.encode_frame(sequence, timestamp, pcm16[offset:offset + self.frame_samples])
+            with self.send_time.timer():
+                await self.send(frame)
+            sent += 1
+        
+        self.streams += 1
+        self.frames_sent += sent
+        
+        # How far the last frame was from its schedule; stays near zero on long answers
+        if sent:
+            last_due = start_time + (sent - 1) * frame_seconds - self.lookahead
+            self.last_drift = loop.time() - last_due
+        
+        return sent
+    
+    def get_stats(self) -> Dict:
+        """Get pacing statistics."""
+        return {
+            'streams': self.streams,
+            'frames_sent': self.frames_sent,
+            'underruns': self.underruns,
+            'lateness': self.lateness.get_stats(),
+            'send_time': self.send_time.get_stats(),
+            'last_drift_ms': round(self.last_drift * 1000.0, 2) if self.last_drift is not None else None
+        }
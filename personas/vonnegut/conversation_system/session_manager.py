@@ -0,0 +1,344 @@
+"""
+Client session model for the voice conversation server.
+Typed per-connection state with explicit lifecycle, bounded buffers,
+admission control and idle/stalled session reaping.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from outbound import OutboundChannel
+from vad_handler import SpeechState
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SessionState:
+    """Lifecycle states of a client session."""
+    CONNECTING = 'connecting'
+    IDLE = 'idle'
+    LISTENING = 'listening'
+    PROCESSING = 'processing'
+    SPEAKING = 'speaking'
+    CLOSING = 'closing'
+    CLOSED = 'closed'
+
+# Allowed lifecycle transitions
+SESSION_TRANSITIONS = {
+    SessionState.CONNECTING: {SessionState.IDLE, SessionState.CLOSING},
+    SessionState.IDLE: {SessionState.LISTENING, SessionState.PROCESSING, SessionState.CLOSING},
+    SessionState.LISTENING: {SessionState.IDLE, SessionState.PROCESSING, SessionState.CLOSING},
+    SessionState.PROCESSING: {SessionState.IDLE, SessionState.LISTENING, SessionState.SPEAKING, SessionState.CLOSING},
+    SessionState.SPEAKING: {SessionState.IDLE, SessionState.LISTENING, SessionState.PROCESSING, SessionState.CLOSING},
+    SessionState.CLOSING: {SessionState.CLOSED},
+    SessionState.CLOSED: set()
+}
+
+# States in which a response is in flight
+ACTIVE_STATES = (SessionState.PROCESSING, SessionState.SPEAKING)
+
+class ClientSession:
+    """State for one connected client."""
+    
+    __slots__ = (
+        'client_id', 'websocket', 'state', 'connected_at', 'last_activity',
+        'state_changed_at', 'audio_chunks', 'audio_samples', 'audio_total_samples',
+        'max_audio_samples', 'conversation_history', 'speech_state',
+        'inbound_queue', 'outbound',
+        'response_task', 'messages_received', 'session_data'
+    )
+    
+    def __init__(self, client_id: str, websocket, max_audio_samples: int,
+                 max_history: int = 20, inbound_queue_size: int = 64,
+                 outbound_queue_size: int = 256):
+        now = time.monotonic()
+        
+        self.client_id = client_id
+        self.websocket = websocket
+        self.state = SessionState.CONNECTING
+        self.connected_at = now
+        self.last_activity = now
+        self.state_changed_at = now
+        
+        # Incoming audio: float32 chunks, capped at max_audio_samples
+        self.audio_chunks = deque()
+        self.audio_samples = 0  # samples currently retained
+        self.audio_total_samples = 0  # samples received since the last clear
+        self.max_audio_samples = max_audio_samples
+        
+        self.conversation_history = deque(maxlen=max_history)
+        self.speech_state = SpeechState()  # times are seconds since the last audio clear
+        
+        self.inbound_queue = asyncio.Queue(maxsize=inbound_queue_size)
+        self.outbound = OutboundChannel(websocket, maxsize=outbound_queue_size)
+        self.response_task = None  # In-flight STT -> chatbot -> TTS work
+        
+        self.messages_received = 0
+        self.session_data = {}
+    
+    def set_state(self, state: str):
+        """Move to a new lifecycle state."""
+        if state == self.state:
+            return
+        
+        if state not in SESSION_TRANSITIONS[self.state]:
+            raise ValueError(f"Invalid session transition {self.state} -> {state} for {self.client_id}")
+        
+        self.state = state
+        self.state_changed_at = time.monotonic()
+    
+    def touch(self):
+        """Record client activity."""
+        self.last_activity = time.monotonic()
+        self.messages_received += 1
+    
+    def append_audio(self, chunk: np.ndarray):
+        """Buffer incoming audio, dropping the oldest audio beyond the cap."""
+        self.audio_chunks.append(chunk)
+        self.audio_samples += len(chunk)
+        self.audio_total_samples += len(chunk)
+        
+        while self.audio_samples > self.max_audio_samples and len(self.audio_chunks) > 1:
+            self.audio_samples -= len(self.audio_chunks.popleft())
+    
+    def recent_audio(self, n_samples: int) -> np.ndarray:
+        """Most recent ``n_samples`` of buffered audio."""
+        chunks = []
+        count = 0
+        
+        for chunk in reversed(self.audio_chunks):
+            chunks.append(chunk)
+            count += len(chunk)
+            if count >= n_samples:
+                break
+        
+        if not chunks:
+            return np.zeros(0, dtype=np.float32)
+        
+        return np.concatenate(chunks[::-1])[-n_samples:]
+    
+    def trim_audio(self, keep_samples: int):
+        """Drop old audio, keeping at least the last ``keep_samples``."""
+        while self.audio_chunks and self.audio_samples - len(self.audio_chunks[0]) >= keep_samples:
+            self.audio_samples -= len(self.audio_chunks.popleft())
+    
+    def get_audio(self) -> np.ndarray:
+        """All retained audio as one array."""
+        if not self.audio_chunks:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(self.audio_chunks)
+    
+    def clear_audio(self):
+        """Drop buffered audio and restart the audio clock."""
+        self.audio_chunks.clear()
+        self.audio_samples = 0
+        self.audio_total_samples = 0
+        self.speech_state.reset()
+    
+    def add_exchange(self, user_text: str, assistant_text: str):
+        """Append one user/assistant exchange to the bounded history."""
+        self.conversation_history.append({"role": "user", "content": user_text})
+        self.conversation_history.append({"role": "assistant", "content": assistant_text})
+    
+    def memory_bytes(self) -> int:
+        """Approximate memory held by this session's buffers."""
+        audio_bytes = sum(chunk.nbytes for chunk in self.audio_chunks)
+        history_bytes = sum(len(message['content']) for message in self.conversation_history)
+        return audio_bytes + history_bytes
+    
+    def get_info(self) -> Dict:
+        """Summary of this session for stats."""
+        now = time.monotonic()
+        return {
+            'client_id': self.client_id,
+            'state': self.state,
+            'connected_for': round(now - self.connected_at, 1),
+            'idle_for': round(now - self.last_activity, 1),
+            'messages_received': self.messages_received,
+            'buffered_audio_samples': self.audio_samples,
+            'history_messages': len(self.conversation_history),
+            'memory_bytes': self.memory_bytes(),
+            'outbound': self.outbound.get_stats()
+        }
+
+class SessionManager:
+    """Admission control, lookup and reaping of client sessions."""
+    
+    def __init__(self, max_sessions: int = 20, idle_timeout: float = 900.0,
+                 stalled_timeout: float = 120.0, reap_interval: float = 30.0,
+                 max_audio_seconds: float = 32.0, sample_rate: int = 16000,
+                 max_history: int = 20, inbound_queue_size: int = 64,
+                 outbound_queue_size: int = 256):
+        """
+        Initialize session manager.
+        
+        Args:
+            max_sessions: Connections admitted at once
+            idle_timeout: Seconds without client messages before a session is closed
+            stalled_timeout: Seconds a response may stay in flight before it is cancelled
+            reap_interval: Seconds between reaper passes
+            max_audio_seconds: Audio retained per session
+            sample_rate: Sample rate of buffered audio
+            max_history: Conversation messages kept per session
+            inbound_queue_size: Messages queued per session for processing
+            outbound_queue_size: Messages queued per session for sending
+        """
+        self.sessions: Dict[str, ClientSession] = {}
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.stalled_timeout = stalled_timeout
+        self.reap_interval = reap_interval
+        self.max_audio_samples = int(max_audio_seconds * sample_rate)
+        self.sample_rate = sample_rate
+        self.max_history = max_history
+        self.inbound_queue_size = inbound_queue_size
+        self.outbound_queue_size = outbound_queue_size
+        
+        self._ids = itertools.count()
+        self.counters = {
+            'admitted': 0,
+            'rejected': 0,
+            'closed': 0,
+            'reaped_idle': 0,
+            'reaped_stalled': 0,
+            'outbound_dropped': 0,  # totals for sessions already closed
+            'outbound_coalesced': 0
+        }
+    
+    def __len__(self) -> int:
+        return len(self.sessions)
+    
+    def __contains__(self, client_id: str) -> bool:
+        return client_id in self.sessions
+    
+    def get(self, client_id: str) -> Optional[ClientSession]:
+        """Look up a session by id."""
+        return self.sessions.get(client_id)
+    
+    def all(self) -> List[ClientSession]:
+        """Snapshot of current sessions."""
+        return list(self.sessions.values())
+    
+    def admit(self, websocket) -> Optional[ClientSession]:
+        """
+        Create a session for a new connection.
+        
+        Returns:
+            The new session, or None when the server is at capacity
+        """
+        if len(self.sessions) >= self.max_sessions:
+            self.counters['rejected'] += 1
+            logger.warning(f"Rejecting connection: {len(self.sessions)}/{self.max_sessions} sessions active")
+            return None
+        
+        client_id = f"client_{next(self._ids)}_{uuid.uuid4().hex[:8]}"
+        session = ClientSession(
+            client_id,
+            websocket,
+            max_audio_samples=self.max_audio_samples,
+            max_history=self.max_history,
+            inbound_queue_size=self.inbound_queue_size,
+            outbound_queue_size=self.outbound_queue_size
+        )
+        session.set_state(SessionState.IDLE)
+        
+        self.sessions[client_id] = session
+        self.counters['admitted'] += 1
+        return session
+    
+    def remove(self, client_id: str) -> Optional[ClientSession]:
+        """Close and forget a session."""
+        session = self.sessions.pop(client_id, None)
+        if session is None:
+            return None
+        
+        if session.response_task is not None and not session.response_task.done():
+            session.response_task.cancel()
+        
+        if session.state != SessionState.CLOSING:
+            session.set_state(SessionState.CLOSING)
+        session.set_state(SessionState.CLOSED)
+        
+        # Release buffers right away rather than when the handler unwinds
+        session.clear_audio()
+        session.conversation_history.clear()
+        session.outbound.close()
+        self.counters['outbound_dropped'] += session.outbound.dropped
+        self.counters['outbound_coalesced'] += session.outbound.coalesced
+        
+        self.counters['closed'] += 1
+        return session
+    
+    async def reap_once(self) -> Dict[str, int]:
+        """Close idle sessions and cancel stalled responses."""
+        now = time.monotonic()
+        idle = 0
+        stalled = 0
+        
+        for session in self.all():
+            if session.state in (SessionState.CLOSING, SessionState.CLOSED):
+                continue
+            
+            if now - session.last_activity > self.idle_timeout:
+                idle += 1
+                logger.info(f"Closing idle session {session.client_id}")
+                session.set_state(SessionState.CLOSING)
+                try:
+                    await session.websocket.close(code=1001, reason="idle timeout")
+                except Exception as e:
+                    logger.error(f"Error closing idle session {session.client_id}: {e}")
+                    self.remove(session.client_id)
+            
+            elif session.state in ACTIVE_STATES and now - session.state_changed_at > self.stalled_timeout:
+                stalled += 1
+                logger.warning(f"Cancelling stalled response for {session.client_id} ({session.state})")
+                if session.response_task is not None:
+                    session.response_task.cancel()
+                    session.response_task = None
+                session.set_state(SessionState.IDLE)
+        
+        self.counters['reaped_idle'] += idle
+        self.counters['reaped_stalled'] += stalled
+        return {'idle': idle, 'stalled': stalled}
+    
+    async def run_reaper(self):
+        """Periodically reap sessions until cancelled."""
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                await self.reap_once()
+            except Exception as e:
+                logger.error(f"Error reaping sessions: {e}")
+    
+    def get_stats(self) -> Dict:
+        """Get session statistics."""
+        states = {}
+        memory = []
+        outbound_dropped = self.counters['outbound_dropped']
+        outbound_coalesced = self.counters['outbound_coalesced']
+        
+        for session in self.all():
+            states[session.state] = states.get(session.state, 0) + 1
+            memory.append(session.memory_bytes())
+            outbound_dropped += session.outbound.dropped
+            outbound_coalesced += session.outbound.coalesced
+        
+        return {
+            'active_sessions': len(self.sessions),
+            'max_sessions': self.max_sessions,
+            'states': states,
+            'memory_bytes': sum(memory),
+            'max_session_memory_bytes': max(memory) if memory else 0,
+            **self.counters,
+            'outbound_dropped': outbound_dropped,
+            'outbound_coalesced': outbound_coalesced,
+            'sessions': [session.get_info() for session in self.all()]
+        }
@@ -0,0 +1,200 @@
+"""
+Speech-to-text engines for the voice conversation server.
+All engines are async and keep audio in memory; pick one with
+create_stt_engine() or the STT_ENGINE environment variable.
+"""
+
+import asyncio
+import io
+import logging
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from audio_utils import resample
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class STTEngine:
+    """Base class for speech-to-text engines."""
+    
+    name = "base"
+    
+    async def transcribe(self, audio: np.ndarray, sample_rate: int) -> Optional[str]:
+        """
+        Transcribe mono float audio.
+        
+        Args:
+            audio: Audio samples in [-1, 1]
+            sample_rate: Sample rate of ``audio``
+            
+        Returns:
+            Transcribed text, or None if transcription failed
+        """
+        raise NotImplementedError
+    
+    def get_config(self) -> dict:
+        """Get engine configuration."""
+        return {'engine': self.name}
+
+class WhisperAPIEngine(STTEngine):
+    """
+    OpenAI Whisper API (or any OpenAI-compatible server via base_url,
+    e.g. a local mock or self-hosted whisper server).
+    """
+    
+    name = "whisper_api"
+    
+    # soundfile (format, subtype) per upload format
+    FORMATS = {
+        'wav': ('WAV', 'PCM_16'),
+        'flac': ('FLAC', 'PCM_16'),
+        'ogg': ('OGG', 'VORBIS')
+    }
+    
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 model: str = "whisper-1", language: str = "en",
+                 audio_format: str = "wav", timeout: float = 15.0):
+        """
+        Initialize Whisper API engine.
+        
+        Args:
+            api_key: OpenAI API key (defaults to OPENAI_API_KEY)
+            base_url: Alternative OpenAI-compatible endpoint
+            model: Transcription model name
+            language: Spoken language hint
+            audio_format: Upload encoding - 'wav', 'flac' (lossless, about half
+                the size) or 'ogg' (smallest)
+            timeout: Seconds before a request is abandoned
+        """
+        import openai
+        
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("No OpenAI API key for Whisper transcription")
+        
+        if audio_format not in self.FORMATS:
+            raise ValueError(f"Unsupported audio format: {audio_format}")
+        
+        self.client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=1)
+        self.base_url = base_url
+        self.model = model
+        self.language = language
+        self.audio_format = audio_format
+        self.timeout = timeout
+    
+    def encode_audio(self, audio: np.ndarray, sample_rate: int) -> Tuple[str, bytes]:
+        """Encode audio into an in-memory upload file."""
+        file_format, subtype = self.FORMATS[self.audio_format]
+        
+        buffer = io.BytesIO()
+        sf.write(buffer, audio, sample_rate, format=file_format, subtype=subtype)
+        
+        return f"utterance.{self.audio_format}", buffer.getvalue()
+    
+    async def transcribe(self, audio: np.ndarray, sample_rate: int) -> Optional[str]:
+        """Transcribe audio with the Whisper API."""
+        upload = self.encode_audio(audio, sample_rate)
+        
+        transcript = await asyncio.wait_for(
+            self.client.audio.transcriptions.create(
+                model=self.model,
+                file=upload,
+                language=self.language
+            ),
+            timeout=self.timeout
+        )
+        
+        return transcript.text.strip()
+    
+    def get_config(self) -> dict:
+        """Get engine configuration."""
+        return {
+            'engine': self.name,
+            'model': self.model,
+            'base_url': self.base_url,
+            'audio_format': self.audio_format,
+            'timeout': self.timeout
+        }
+
+class LocalWhisperEngine(STTEngine):
+    """Local transcription with faster-whisper, run off the event loop."""
+    
+    name = "local_whisper"
+    
+    def __init__(self, model_size: str = "base.en", device: str = "cpu",
+                 compute_type: str = "int8", language: str = "en", timeout: float = 30.0):
+        """
+        Initialize local Whisper engine.
+        
+        Args:
+            model_size: faster-whisper model name or path
+            device: 'cpu' or 'cuda'
+            compute_type: CTranslate2 compute type
+            language: Spoken language hint
+            timeout: Seconds before a transcription is abandoned
+        """
+        # This requires: pip install faster-whisper
+        from faster_whisper import WhisperModel
+        
+        self.model = WhisperModel(model_size, device=device, compute_type=compute_type)
+        self.model_size = model_size
+        self.language = language
+        self.timeout = timeout
+        self.sample_rate = 16000  # faster-whisper expects 16kHz input
+    
+    def _transcribe_sync(self, audio: np.ndarray) -> str:
+        segments, _ = self.model.transcribe(audio, language=self.language, beam_size=1)
+        return " ".join(segment.text.strip() for segment in segments).strip()
+    
+    async def transcribe(self, audio: np.ndarray, sample_rate: int) -> Optional[str]:
+        """Transcribe audio with the local model in a worker thread."""
+        audio = resample(audio, sample_rate, self.sample_rate)
+        
+        return await asyncio.wait_for(
+            asyncio.to_thread(self._transcribe_sync, audio),
+            timeout=self.timeout
+        )
+    
+    def get_config(self) -> dict:
+        """Get engine configuration."""
+        return {
+            'engine': self.name,
+            'model': self.model_size,
+            'timeout': self.timeout
+        }
+
+STT_ENGINES = {
+    WhisperAPIEngine.name: WhisperAPIEngine,
+    LocalWhisperEngine.name: LocalWhisperEngine
+}
+
+def create_stt_engine(name: Optional[str] = None, **kwargs) -> STTEngine:
+    """
+    Create an STT engine by name.
+    
+    Args:
+        name: Engine name (defaults to STT_ENGINE, then 'whisper_api')
+        **kwargs: Engine-specific options; for the API engine STT_BASE_URL
+            and STT_AUDIO_FORMAT are used when base_url/audio_format are
+            not given
+            
+    Returns:
+        Configured STT engine
+    """
+    name = name or os.getenv("STT_ENGINE", WhisperAPIEngine.name)
+    
+    if name not in STT_ENGINES:
+        raise ValueError(f"Unknown STT engine: {name}")
+    
+    if name == WhisperAPIEngine.name:
+        kwargs.setdefault('base_url', os.getenv("STT_BASE_URL"))
+        kwargs.setdefault('audio_format', os.getenv("STT_AUDIO_FORMAT", "wav"))
+    
+    engine = STT_ENGINES[name](**kwargs)
+    logger.info(f"STT engine initialized: {engine.get_config()}")
+    return engine
@@ -0,0 +1,45 @@
+"""
+Tests for the FAQ journal: a torn last record must not swallow later appends.
+
+Usage: python -m pytest test_faq_store.py
+"""
+
+import asyncio
+import json
+
+from faq_store import FAQStore
+
+def entry(entry_id: int) -> dict:
+    """Minimal FAQ entry."""
+    return {'id': entry_id, 'trigger_phrases': [f"question {entry_id}"], 'response': f"Answer {entry_id}"}
+
+def test_append_after_torn_tail(tmp_path):
+    """Records written after a crash mid-append survive, and the journal stays readable."""
+    snapshot_path = tmp_path / "faq_database.json"
+    
+    async def scenario():
+        store = FAQStore(snapshot_path, lambda: {'entries': []}, flush_interval=0.0, fsync=False)
+        store.record_add([entry(0)])
+        await store.flush()
+        
+        # Crash mid-append: half a record, no newline
+        with open(store.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"seq": 2, "op": "add", "entry": {"id": 1, "trig')
+        
+        # Restart: load skips the fragment, then a new record is appended
+        store = FAQStore(snapshot_path, lambda: {'entries': []}, flush_interval=0.0, fsync=False)
+        data = await store.load()
+        assert [item['id'] for item in data['entries']] == [0]
+        
+        store.record_add([entry(2)])
+        await store.flush()
+        
+        # Restart again: both complete records are there
+        store = FAQStore(snapshot_path, lambda: {'entries': []}, flush_interval=0.0, fsync=False)
+        data = await store.load()
+        assert [item['id'] for item in data['entries']] == [0, 2]
+        
+        lines = store.journal_path.read_text(encoding='utf-8').splitlines()
+        assert [json.loads(line)['entry']['id'] for line in lines] == [0, 2]
+    
+    asyncio.run(scenario())
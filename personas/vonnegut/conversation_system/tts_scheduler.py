@@ -0,0 +1,207 @@
+"""
+Sentence-level TTS scheduling for the conversation system.
+Splits a response into sentences, synthesizes them concurrently and
+streams the audio back in order with short crossfades at the seams, so
+playback can start as soon as the first sentence is ready.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from metrics import LatencyStats
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Sentence boundary: terminal punctuation (optionally closing a quote or
+# bracket) followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|(?<=[.!?]["\')\]])\s+')
+CLAUSE_BOUNDARY = re.compile(r'[,;:]\s+')
+
+def split_sentences(text: str, min_chars: int = 20, max_chars: int = 250) -> List[str]:
+    """
+    Split text into sentences for synthesis.
+    
+    Fragments shorter than ``min_chars`` ("Hi ho.") are joined to the
+    following sentence; sentences longer than ``max_chars`` are split at
+    the last clause boundary that fits.
+    """
+    sentences = []
+    pending = ""
+    
+    for part in SENTENCE_BOUNDARY.split(text.strip()):
+        part = part.strip()
+        if not part:
+            continue
+        
+        pending = f"{pending} {part}" if pending else part
+        if len(pending) >= min_chars:
+            sentences.extend(split_long_sentence(pending, max_chars))
+            pending = ""
+    
+    if pending:
+        if sentences and len(sentences[-1]) + len(pending) < max_chars:
+            sentences[-1] = f"{sentences[-1]} {pending}"
+        else:
+            sentences.append(pending)
+    
+    return sentences
+
+def split_long_sentence(sentence: str, max_chars: int) -> List[str]:
+    """Split an overlong sentence at clause boundaries (or spaces as a last resort)."""
+    pieces = []
+    
+    while len(sentence) > max_chars:
+        boundaries = [match.end() for match in CLAUSE_BOUNDARY.finditer(sentence, 0, max_chars)]
+        cut = boundaries[-1] if boundaries else sentence.rfind(' ', 0, max_chars) + 1
+        if cut <= 0:
+            break
+        
+        pieces.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    
+    if sentence:
+        pieces.append(sentence)
+    
+    return pieces
+
+class Crossfader:
+    """Joins consecutive audio segments with a short linear crossfade."""
+    
+    def __init__(self, crossfade_samples: int):
+        self.crossfade_samples = crossfade_samples
+        self.tail = np.zeros(0, dtype=np.float32)
+    
+    def push(self, audio: np.ndarray) -> np.ndarray:
+        """Add the next segment; returns audio that is final (all but the held-back tail)."""
+        audio = np.asarray(audio, dtype=np.float32)
+        n = min(self.crossfade_samples, len(self.tail), len(audio) // 2)
+        
+        if n > 0:
+            fade = np.linspace(0.0, 1.0, n, dtype=np.float32)
+            head = self.tail[:len(self.tail) - n]
+            seam = self.tail[-n:] * (1.0 - fade) + audio[:n] * fade
+            body = audio[n:]
+        else:
+            head = self.tail
+            seam = np.zeros(0, dtype=np.float32)
+            body = audio
+        
+        # Hold back the end of this segment to blend with the next one
+        hold = min(self.crossfade_samples, len(body) // 2)
+        self.tail = body[len(body) - hold:]
+        
+        return np.concatenate([head, seam, body[:len(body) - hold]])
+    
+    def flush(self) -> np.ndarray:
+        """Return the held-back tail at the end of the stream."""
+        tail, self.tail = self.tail, np.zeros(0, dtype=np.float32)
+        return tail
+
+class SentenceScheduler:
+    """Synthesizes sentences concurrently and yields their audio in order."""
+    
+    def __init__(self, synthesize: Callable[[str], Awaitable[Optional[np.ndarray]]],
+                 sample_rate: int, max_parallel: int = 2, crossfade: float = 0.015,
+                 min_chars: int = 20, max_chars: int = 250):
+        """
+        Initialize sentence scheduler.
+        
+        Args:
+            synthesize: Async function synthesizing one sentence at ``sample_rate``
+            sample_rate: Sample rate of the synthesized audio
+            max_parallel: Sentences synthesized at once
+            crossfade: Crossfade between sentences in seconds
+            min_chars: Shorter fragments are joined to the next sentence
+            max_chars: Longer sentences are split at clause boundaries
+        """
+        self.synthesize_sentence = synthesize
+        self.sample_rate = sample_rate
+        self.max_parallel = max_parallel
+        self.crossfade_samples = int(crossfade * sample_rate)
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        
+        self.time_to_first_audio = LatencyStats()
+        self.total_time = LatencyStats()
+        self.failed_sentences = 0
+    
+    async def stream(self, text: str) -> AsyncIterator[np.ndarray]:
+        """
+        Synthesize text sentence by sentence.
+        
+        Yields:
+            Consecutive audio chunks; the first is available as soon as the
+            first sentence is synthesized
+        """
+        sentences = split_sentences(text, self.min_chars, self.max_chars)
+        if not sentences:
+            return
+        
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        
+        async def synthesize(sentence: str) -> Optional[np.ndarray]:
+            async with semaphore:
+                return await self.synthesize_sentence(sentence)
+        
+        # Tasks start in sentence order, so the first sentence is never queued behind a later one
+        tasks = [asyncio.create_task(synthesize(sentence)) for sentence in sentences]
+        crossfader = Crossfader(self.crossfade_samples)
+        first_chunk = True
+        
+        try:
+            for sentence, task in zip(sentences, tasks):
+                try:
+                    audio = await task
+                except Exception as e:
+                    logger.error(f"Error synthesizing sentence '{sentence[:30]}...': {e}")
+                    audio = None
+                
+                if audio is None or len(audio) == 0:
+                    self.failed_sentences += 1
+                    continue
+                
+                chunk = crossfader.push(audio)
+                if len(chunk) == 0:
+                    continue
+                
+                if first_chunk:
+                    self.time_to_first_audio.record(time.perf_counter() - start)
+                    first_chunk = False
+                yield chunk
+            
+            tail = crossfader.flush()
+            if len(tail) > 0:
+                if first_chunk:
+                    self.time_to_first_audio.record(time.perf_counter() - start)
+                yield tail
+            
+            self.total_time.record(time.perf_counter() - start)
+        
+        finally:
+            # Consumer stopped early (e.g. barge-in): drop the remaining sentences
+            for task in tasks:
+                task.cancel()
+    
+    async def synthesize(self, text: str) -> Optional[np.ndarray]:
+        """Synthesize text and return the reassembled audio, or None if nothing was produced."""
+        chunks = [chunk async for chunk in self.stream(text)]
+        if not chunks:
+            return None
+        return np.concatenate(chunks)
+    
+    def get_stats(self) -> Dict:
+        """Get scheduling statistics."""
+        return {
+            'max_parallel': self.max_parallel,
+            'failed_sentences': self.failed_sentences,
+            'time_to_first_audio': self.time_to_first_audio.get_stats(),
+            'total_time': self.total_time.get_stats()
+        }
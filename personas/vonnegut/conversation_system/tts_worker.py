@@ -0,0 +1,355 @@
+"""
+Persistent pyttsx3 synthesis worker.
+One long-lived thread owns the pyttsx3 engine and serves synthesis and
+settings jobs from a queue, so concurrent requests never race on the
+engine or block the event loop. Pyttsx3ProcessPool runs one engine per
+process for synthesizing several sentences in parallel.
+"""
+
+import asyncio
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+import pyttsx3
+
+from metrics import LatencyStats
+from audio_utils import to_mono
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Pool size used when none is configured: one engine per core, up to four
+MAX_DEFAULT_SYNTHESIS_PROCESSES = 4
+
+def default_synthesis_processes() -> int:
+    """pyttsx3 processes to run when none is configured."""
+    return max(1, min(MAX_DEFAULT_SYNTHESIS_PROCESSES, os.cpu_count() or 1))
+
+# Memory-backed scratch directory for the engine's WAV output where the platform has one
+SCRATCH_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+class Pyttsx3Worker:
+    """Owns a pyttsx3 engine on a dedicated thread fed by a job queue."""
+    
+    def __init__(self, rate: int = 140, volume: float = 0.9,
+                 voice_selector: Optional[Callable] = None, timeout: float = 30.0):
+        """
+        Initialize synthesis worker.
+        
+        Args:
+            rate: Speech rate in words per minute
+            volume: Volume 0.0-1.0
+            voice_selector: Called with the engine's voices, returns the voice to use
+            timeout: Seconds to wait for one synthesis job
+        """
+        self.rate = rate
+        self.volume = volume
+        self.voice_selector = voice_selector
+        self.timeout = timeout
+        
+        self.jobs = queue.Queue()
+        self.thread = None
+        self.ready = threading.Event()
+        self.available = False
+        
+        # Snapshot of engine settings, refreshed by the worker thread
+        self.voice_info: Dict[str, Any] = {}
+        
+        # Scratch WAV reused for every job; the engine can only write to a file
+        fd, self.scratch_path = tempfile.mkstemp(suffix='.wav', prefix='pyttsx3_', dir=SCRATCH_DIR)
+        os.close(fd)
+        
+        self.synthesis_latency = LatencyStats()
+        self.queue_wait = LatencyStats()
+        self.timeouts = 0
+    
+    def start(self, wait: float = 10.0) -> bool:
+        """
+        Start the worker thread and initialize the engine on it.
+        
+        Returns:
+            True if the engine is available
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return self.available
+        
+        self.ready.clear()
+        self.thread = threading.Thread(target=self.run, name="pyttsx3-worker", daemon=True)
+        self.thread.start()
+        self.ready.wait(timeout=wait)
+        return self.available
+    
+    def stop(self):
+        """Ask the worker thread to exit after the queued jobs."""
+        if self.thread is not None and self.thread.is_alive():
+            self.jobs.put(None)
+        self.available = False
+        
+        if os.path.exists(self.scratch_path):
+            try:
+                os.unlink(self.scratch_path)
+            except OSError:
+                pass
+    
+    def run(self):
+        """Worker thread: create the engine, then serve jobs until stopped."""
+        try:
+            engine = pyttsx3.init()
+            engine.setProperty('rate', self.rate)
+            engine.setProperty('volume', self.volume)
+            
+            if self.voice_selector is not None:
+                voice = self.voice_selector(engine.getProperty('voices'))
+                if voice is not None:
+                    engine.setProperty('voice', voice.id)
+                    logger.info(f"Selected voice: {voice.name}")
+            
+            self.refresh_voice_info(engine)
+            self.available = True
+            logger.info("pyttsx3 worker started")
+        
+        except Exception as e:
+            logger.error(f"Error initializing pyttsx3: {e}")
+            self.available = False
+            return
+        
+        finally:
+            self.ready.set()
+        
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            
+            handler, args, loop, future, queued_at = job
+            self.queue_wait.record(time.perf_counter() - queued_at)
+            
+            try:
+                result = handler(engine, *args)
+                error = None
+            except Exception as e:
+                result = None
+                error = e
+            
+            loop.call_soon_threadsafe(self.resolve, future, result, error)
+        
+        logger.info("pyttsx3 worker stopped")
+    
+    @staticmethod
+    def resolve(future: asyncio.Future, result, error: Optional[Exception]):
+        """Complete a job's future on the event loop (unless the caller gave up)."""
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    
+    async def submit(self, handler: Callable, *args, timeout: Optional[float] = None):
+        """Queue a job for the worker thread and await its result."""
+        if not self.available:
+            raise RuntimeError("pyttsx3 worker not available")
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.jobs.put((handler, args, loop, future, time.perf_counter()))
+        
+        return await asyncio.wait_for(future, timeout)
+    
+    async def synthesize(self, text: str) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        Synthesize text on the worker thread.
+        
+        Returns:
+            (float32 audio, sample rate), or None if synthesis failed
+        """
+        try:
+            return await self.submit(self.synthesize_job, text, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.error("pyttsx3 synthesis timed out")
+            return None
+        except Exception as e:
+            logger.error(f"pyttsx3 synthesis error: {e}")
+            return None
+    
+    async def set_properties(self, **properties) -> bool:
+        """Update engine properties (rate, volume, voice) between jobs."""
+        try:
+            await self.submit(self.set_properties_job, properties, timeout=self.timeout)
+            return True
+        except Exception as e:
+            logger.error(f"Error updating pyttsx3 properties: {e}")
+            return False
+    
+    def synthesize_job(self, engine, text: str) -> Tuple[np.ndarray, int]:
+        """Runs on the worker thread."""
+        with self.synthesis_latency.timer():
+            engine.save_to_file(text, self.scratch_path)
+            engine.runAndWait()
+            
+            audio, sample_rate = sf.read(self.scratch_path, dtype='float32')
+            audio = to_mono(audio)
+            
+            if len(audio) == 0:
+                raise RuntimeError("pyttsx3 produced no audio")
+        
+        return audio, sample_rate
+    
+    def set_properties_job(self, engine, properties: Dict[str, Any]):
+        """Runs on the worker thread."""
+        for name, value in properties.items():
+            engine.setProperty(name, value)
+        self.refresh_voice_info(engine)
+    
+    def refresh_voice_info(self, engine):
+        """Runs on the worker thread; snapshot settings for readers on other threads."""
+        voices = engine.getProperty('voices')
+        current_voice = engine.getProperty('voice')
+        
+        current_voice_info = None
+        for voice in voices:
+            if voice.id == current_voice:
+                current_voice_info = {
+                    "id": voice.id,
+                    "name": voice.name,
+                    "age": getattr(voice, 'age', 'unknown'),
+                    "gender": getattr(voice, 'gender', 'unknown')
+                }
+                break
+        
+        self.voice_info = {
+            "current_voice": current_voice_info,
+            "available_voices": len(voices),
+            "rate": engine.getProperty('rate'),
+            "volume": engine.getProperty('volume')
+        }
+    
+    def get_stats(self) -> Dict:
+        """Get worker statistics."""
+        return {
+            'available': self.available,
+            'queue_depth': self.jobs.qsize(),
+            'timeouts': self.timeouts,
+            'synthesis': self.synthesis_latency.get_stats(),
+            'queue_wait': self.queue_wait.get_stats()
+        }
+
+# Engine of a Pyttsx3ProcessPool worker process (set by the pool initializer)
+process_engine = None
+process_scratch_path = None
+
+def init_pyttsx3_process():
+    """Pool initializer: create this process's engine and scratch file."""
+    global process_engine, process_scratch_path
+    
+    process_engine = pyttsx3.init()
+    
+    fd, process_scratch_path = tempfile.mkstemp(suffix='.wav', prefix='pyttsx3_', dir=SCRATCH_DIR)
+    os.close(fd)
+    atexit.register(os.unlink, process_scratch_path)
+
+def synthesize_in_process(text: str, properties: Dict[str, Any]) -> Tuple[np.ndarray, int]:
+    """Runs in a pool process: apply current settings, then synthesize."""
+    for name, value in properties.items():
+        if value is not None and process_engine.getProperty(name) != value:
+            process_engine.setProperty(name, value)
+    
+    process_engine.save_to_file(text, process_scratch_path)
+    process_engine.runAndWait()
+    
+    audio, sample_rate = sf.read(process_scratch_path, dtype='float32')
+    audio = to_mono(audio)
+    
+    if len(audio) == 0:
+        raise RuntimeError("pyttsx3 produced no audio")
+    
+    return audio, sample_rate
+
+class Pyttsx3ProcessPool:
+    """pyttsx3 engines in separate processes, for synthesizing sentences in parallel."""
+    
+    def __init__(self, processes: int = 2, timeout: float = 30.0):
+        """
+        Initialize process pool.
+        
+        Args:
+            processes: Engines (processes) synthesizing at once
+            timeout: Seconds to wait for one synthesis job
+        """
+        self.processes = processes
+        self.timeout = timeout
+        self.executor = None
+        
+        self.synthesis_latency = LatencyStats()
+        self.timeouts = 0
+    
+    def start(self) -> bool:
+        """Start the worker processes (spawned, so they share no engine or thread state)."""
+        try:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_pyttsx3_process
+            )
+            logger.info(f"pyttsx3 process pool started ({self.processes} processes)")
+            return True
+        except Exception as e:
+            logger.error(f"Error starting pyttsx3 process pool: {e}")
+            self.executor = None
+            return False
+    
+    def stop(self):
+        """Shut the pool down without waiting for running jobs."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+    
+    async def synthesize(self, text: str, **properties) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        Synthesize text in a pool process.
+        
+        Args:
+            text: Text to synthesize
+            properties: Engine properties (rate, volume, voice) to apply first
+        
+        Returns:
+            (float32 audio, sample rate), or None if synthesis failed
+        """
+        if self.executor is None:
+            return None
+        
+        loop = asyncio.get_running_loop()
+        
+        try:
+            with self.synthesis_latency.timer():
+                return await asyncio.wait_for(
+                    loop.run_in_executor(self.executor, synthesize_in_process, text, properties),
+                    timeout=self.timeout
+                )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.error("pyttsx3 process synthesis timed out")
+            return None
+        except Exception as e:
+            logger.error(f"pyttsx3 process synthesis error: {e}")
+            return None
+    
+    def get_stats(self) -> Dict:
+        """Get pool statistics."""
+        return {
+            'processes': self.processes if self.executor is not None else 0,
+            'timeouts': self.timeouts,
+            'synthesis': self.synthesis_latency.get_stats()
+        }
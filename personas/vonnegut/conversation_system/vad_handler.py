@@ -3,17 +3,98 @@ Voice Activity Detection (VAD) handler using Silero VAD.
 Detects speech in audio streams for the conversation system.
 """
 
-import torch
 import numpy as np
 import logging
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict
 import asyncio
 from pathlib import Path
 
+from audio_utils import frame_signal, resample, to_float32
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+try:
+    import torch
+except ImportError:
+    # Energy-based fallback VAD does not need torch
+    logger.warning("torch not installed. Silero VAD disabled, using energy-based VAD.")
+    torch = None
+
+
+def hysteresis_mask(enter: np.ndarray, stay: np.ndarray) -> np.ndarray:
+    """
+    Two-threshold activity mask without a Python loop.
+    
+    A frame becomes active when ``enter`` is set and stays active while
+    ``stay`` is set; frames in between keep the previous decision.
+    """
+    if len(enter) == 0:
+        return np.zeros(0, dtype=bool)
+    
+    # 1 = switch on, 0 = switch off, -1 = keep previous state
+    decision = np.full(len(enter), -1, dtype=np.int8)
+    decision[~stay] = 0
+    decision[enter] = 1
+    if decision[0] < 0:
+        decision[0] = 0
+    
+    # Forward-fill the last explicit decision
+    last = np.where(decision >= 0, np.arange(len(decision)), 0)
+    np.maximum.accumulate(last, out=last)
+    
+    return decision[last] == 1
+
+
+def mask_to_segments(active: np.ndarray, min_frames: int = 0, max_gap_frames: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert a boolean frame mask into (start, end) frame index arrays.
+    
+    Gaps of at most ``max_gap_frames`` are bridged and runs shorter than
+    ``min_frames`` are dropped. End indices are exclusive.
+    """
+    edges = np.diff(active.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    
+    if len(starts) > 1 and max_gap_frames > 0:
+        keep = (starts[1:] - ends[:-1]) > max_gap_frames
+        starts = starts[np.concatenate(([True], keep))]
+        ends = ends[np.concatenate((keep, [True]))]
+    
+    if min_frames > 0:
+        long_enough = (ends - starts) > min_frames
+        starts = starts[long_enough]
+        ends = ends[long_enough]
+    
+    return starts, ends
+
+class SpeechState:
+    """Speech/silence tracking for one audio stream (one per client)."""
+    
+    __slots__ = ('is_speaking', 'speech_start_time', 'last_speech_time', 'endpointer')
+    
+    def __init__(self, endpointer=None):
+        """
+        Initialize state.
+        
+        Args:
+            endpointer: Optional AdaptiveEndpointer; replaces max_silence_duration when set
+        """
+        self.is_speaking = False
+        self.speech_start_time = None
+        self.last_speech_time = None
+        self.endpointer = endpointer
+    
+    def reset(self):
+        """Forget the current utterance."""
+        self.is_speaking = False
+        self.speech_start_time = None
+        self.last_speech_time = None
+        if self.endpointer is not None:
+            self.endpointer.reset()
+
 class VADHandler:
     def __init__(self, model_name: str = "silero_vad"):
         self.model_name = model_name
@@ -25,23 +106,38 @@ class VADHandler:
         self.chunk_size = 512  # samples
         self.threshold = 0.5  # Speech probability threshold
         
-        # State tracking
+        # State tracking (callers with several streams pass their own SpeechState)
         self.speech_buffer = []
         self.silence_buffer = []
-        self.is_speaking = False
-        self.speech_start_time = None
-        self.last_speech_time = None
+        self.speech_state = SpeechState()
         
         # Parameters for speech segmentation
         self.min_speech_duration = 0.5  # seconds
         self.max_silence_duration = 1.0  # seconds
         self.max_speech_duration = 30.0  # seconds
         
-        # Initialize model
-        asyncio.create_task(self.load_model())
+        # Energy-based fallback configuration
+        self.energy_threshold = 0.01  # RMS needed to enter speech
+        self.energy_release_ratio = 0.5  # Stay in speech down to threshold * ratio
+        self.min_zero_crossing_rate = 0.01  # Rejects DC offset and low hum
+        self.onset_flux_threshold = 0.3  # Strong onsets may enter at the release level
+        self.frame_duration = 0.032  # seconds per analysis frame
+        self.hop_duration = 0.032  # seconds between frames
+        self.feature_block_frames = 8192  # Frames per block to bound temporaries
+        
+        # Initialize model (offline/batch use without an event loop stays
+        # on the energy-based fallback)
+        try:
+            asyncio.get_running_loop().create_task(self.load_model())
+        except RuntimeError:
+            logger.info("No running event loop - using energy-based VAD")
     
     async def load_model(self):
         """Load the Silero VAD model."""
+        if torch is None:
+            self.model = None
+            return
+        
         try:
             logger.info("Loading Silero VAD model...")
             
@@ -65,46 +161,28 @@ class VADHandler:
              self.collect_chunks) = utils
             
             logger.info("Silero VAD model loaded successfully")
-            
+        
         except Exception as e:
             logger.error(f"Error loading Silero VAD model: {e}")
             logger.info("Falling back to simple energy-based VAD")
             self.model = None
     
-    def preprocess_audio(self, audio: np.ndarray, target_sr: int = None) -> torch.Tensor:
+    def preprocess_audio(self, audio: np.ndarray, target_sr: int = None) -> "torch.Tensor":
         """Preprocess audio for VAD model."""
         if target_sr is None:
             target_sr = self.sample_rate
         
         # Convert to float32 if needed
-        if audio.dtype != np.float32:
-            if audio.dtype == np.int16:
-                audio = audio.astype(np.float32) / 32768.0
-            else:
-                audio = audio.astype(np.float32)
+        audio = to_float32(audio)
         
-        # Resample if needed (simple linear interpolation)
         if len(audio) == 0:
             return torch.zeros(0, dtype=torch.float32)
         
+        # Resample if needed
+        audio = resample(audio, self.sample_rate, target_sr)
+        
         # Convert to torch tensor
-        audio_tensor = torch.from_numpy(audio).float()
-        
-        # Ensure correct sample rate (basic resampling)
-        # For production, use librosa.resample or torchaudio.transforms.Resample
-        if target_sr != self.sample_rate:
-            ratio = target_sr / self.sample_rate
-            new_length = int(len(audio_tensor) * ratio)
-            if new_length > 0:
-                indices = torch.linspace(0, len(audio_tensor) - 1, new_length)
-                audio_tensor = torch.nn.functional.interpolate(
-                    audio_tensor.unsqueeze(0).unsqueeze(0),
-                    size=new_length,
-                    mode='linear',
-                    align_corners=True
-                ).squeeze()
-        
-        return audio_tensor
+        return torch.from_numpy(audio)
     
     async def detect_speech(self, audio: np.ndarray) -> float:
         """
@@ -112,7 +190,7 @@ class VADHandler:
         
         Args:
             audio: Audio samples as numpy array
-            
+        
         Returns:
             Speech probability (0.0 to 1.0)
         """
@@ -121,7 +199,7 @@ class VADHandler:
                 return await self.silero_vad_detect(audio)
             else:
                 return self.energy_based_vad(audio)
-                
+        
         except Exception as e:
             logger.error(f"Error in speech detection: {e}")
             return 0.0
@@ -140,7 +218,7 @@ class VADHandler:
                 speech_prob = self.model(audio_tensor, self.sample_rate).item()
             
             return speech_prob
-            
+        
         except Exception as e:
             logger.error(f"Error in Silero VAD: {e}")
             return self.energy_based_vad(audio)
@@ -151,84 +229,252 @@ class VADHandler:
             if len(audio) == 0:
                 return 0.0
             
-            # Calculate RMS energy
-            rms_energy = np.sqrt(np.mean(audio ** 2))
+            audio = np.asarray(audio, dtype=np.float32)
             
-            # Simple threshold-based detection
-            # This is very basic and should be tuned for your use case
-            energy_threshold = 0.01
+            # Calculate RMS energy
+            rms_energy = np.sqrt(np.dot(audio, audio) / len(audio))
             
-            if rms_energy > energy_threshold:
-                # Check for spectral characteristics (very basic)
-                # Higher frequencies often indicate speech
+            if rms_energy > self.energy_threshold:
+                # Require some high-frequency content; zero crossings are
+                # cheap and reject DC offsets and mains hum
                 if len(audio) > 100:
-                    high_freq_energy = np.sqrt(np.mean(np.diff(audio) ** 2))
-                    if high_freq_energy > 0.001:
+                    signs = np.signbit(audio)
+                    zcr = np.count_nonzero(signs[1:] != signs[:-1]) / (len(audio) - 1)
+                    if zcr > self.min_zero_crossing_rate:
                         return min(1.0, rms_energy * 10)  # Scale to probability
             
             return 0.0
-            
+        
         except Exception as e:
             logger.error(f"Error in energy-based VAD: {e}")
             return 0.0
     
-    def update_speech_state(self, speech_prob: float, timestamp: float = None) -> dict:
+    def compute_frame_features(self, audio: np.ndarray, sample_rate: int = None,
+                               flux_rms_range: Optional[Tuple[float, float]] = None) -> Dict[str, np.ndarray]:
+        """
+        Compute per-frame features for the whole signal in one vectorized pass.
+        
+        Args:
+            audio: Mono audio samples
+            sample_rate: Sample rate of ``audio`` (defaults to the VAD rate)
+            flux_rms_range: Only compute spectral flux for frames whose RMS
+                lies in (low, high]; other frames report 0. The FFT is the
+                expensive part, so callers that only need flux near the
+                decision threshold should restrict it.
+        
+        Returns:
+            Dictionary with ``rms``, ``zcr`` and ``spectral_flux`` arrays
+            (one value per frame) plus the ``frame_size`` and ``hop_size``
+            used, in samples.
+        """
+        if sample_rate is None:
+            sample_rate = self.sample_rate
+        
+        audio = np.asarray(audio, dtype=np.float32)
+        frame_size = max(2, int(self.frame_duration * sample_rate))
+        hop_size = max(1, int(self.hop_duration * sample_rate))
+        frames = frame_signal(audio, frame_size, hop_size)
+        n_frames = len(frames)
+        block_frames = self.feature_block_frames
+        
+        rms = np.empty(n_frames, dtype=np.float32)
+        zcr = np.empty(n_frames, dtype=np.float32)
+        
+        # Work through the strided view in blocks so temporaries stay small
+        for start in range(0, n_frames, block_frames):
+            block = frames[start:start + block_frames]
+            stop = start + len(block)
+            
+            rms[start:stop] = np.sqrt(np.einsum('ij,ij->i', block, block) / frame_size)
+            
+            signs = np.signbit(block)
+            zcr[start:stop] = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_size - 1)
+        
+        if flux_rms_range is None:
+            flux_indices = np.arange(n_frames)
+        else:
+            low, high = flux_rms_range
+            flux_indices = np.flatnonzero((rms > low) & (rms <= high))
+        
+        flux = np.zeros(n_frames, dtype=np.float32)
+        window = np.hanning(frame_size).astype(np.float32)
+        
+        for start in range(0, len(flux_indices), block_frames):
+            indices = flux_indices[start:start + block_frames]
+            previous_indices = np.maximum(indices - 1, 0)
+            
+            # Each needed frame is transformed once, even when it is both
+            # a current and a previous frame
+            needed = np.union1d(indices, previous_indices)
+            magnitude = np.abs(np.fft.rfft(frames[needed] * window, axis=1))
+            current = magnitude[np.searchsorted(needed, indices)]
+            previous = magnitude[np.searchsorted(needed, previous_indices)]
+            
+            rise = np.maximum(current - previous, 0.0).sum(axis=1)
+            flux[indices] = rise / (current.sum(axis=1) + 1e-9)
+        
+        return {
+            'rms': rms,
+            'zcr': zcr,
+            'spectral_flux': flux,
+            'frame_size': frame_size,
+            'hop_size': hop_size
+        }
+    
+    def segment_energy(self, audio: np.ndarray, sample_rate: int = None) -> List[Tuple[float, float]]:
+        """
+        Energy-based speech segmentation with hysteresis, fully vectorized.
+        
+        Safe to call outside the event loop, e.g. for offline batch
+        segmentation of recorded sessions.
+        
+        Args:
+            audio: Mono audio samples
+            sample_rate: Sample rate of ``audio`` (defaults to the VAD rate)
+        
+        Returns:
+            List of (start_time, end_time) tuples in seconds
+        """
+        if sample_rate is None:
+            sample_rate = self.sample_rate
+        
+        if len(audio) == 0:
+            return []
+        
+        release_threshold = self.energy_threshold * self.energy_release_ratio
+        
+        # Flux only matters for frames between the two energy thresholds
+        features = self.compute_frame_features(
+            audio, sample_rate, flux_rms_range=(release_threshold, self.energy_threshold)
+        )
+        rms = features['rms']
+        if len(rms) == 0:
+            return []
+        
+        has_detail = features['zcr'] > self.min_zero_crossing_rate
+        
+        enter = has_detail & (
+            (rms > self.energy_threshold) |
+            ((rms > release_threshold) & (features['spectral_flux'] > self.onset_flux_threshold))
+        )
+        stay = has_detail & (rms > release_threshold)
+        active = hysteresis_mask(enter, stay)
+        
+        hop_seconds = features['hop_size'] / sample_rate
+        starts, ends = mask_to_segments(
+            active,
+            min_frames=int(self.min_speech_duration / hop_seconds),
+            max_gap_frames=int(self.max_silence_duration / hop_seconds)
+        )
+        
+        duration = len(audio) / sample_rate
+        start_times = starts * hop_seconds
+        end_times = np.minimum(
+            (ends - 1) * hop_seconds + features['frame_size'] / sample_rate,
+            duration
+        )
+        
+        return [(float(start), float(end)) for start, end in zip(start_times, end_times)]
+    
+    def segment_files(self, paths: List[str]) -> Dict[str, List[Tuple[float, float]]]:
         """
-        Update internal speech state based on current probability.
+        Segment recorded audio files (e.g. kiosk session recordings).
+        
+        Args:
+            paths: Audio file paths readable by soundfile
+        
+        Returns:
+            Mapping of path to its list of (start_time, end_time) tuples
+        """
+        import soundfile as sf
+        
+        results = {}
+        
+        for path in paths:
+            try:
+                audio, sample_rate = sf.read(path, dtype='float32')
+                if audio.ndim > 1:
+                    audio = audio.mean(axis=1)
+                results[str(path)] = self.segment_energy(audio, sample_rate)
+            except Exception as e:
+                logger.error(f"Error segmenting {path}: {e}")
+                results[str(path)] = []
+        
+        return results
+    
+    def get_silence_hangover(self, state: Optional[SpeechState] = None) -> float:
+        """Silence duration that ends the current utterance."""
+        state = state or self.speech_state
+        if state.endpointer is not None:
+            return state.endpointer.get_hangover()
+        return self.max_silence_duration
+    
+    def update_speech_state(self, speech_prob: float, timestamp: float = None, audio: np.ndarray = None,
+                            state: Optional[SpeechState] = None) -> dict:
+        """
+        Update speech state based on current probability.
         
         Args:
             speech_prob: Current speech probability
             timestamp: Current timestamp (optional)
-            
+            audio: Current speech audio, used for the endpointer's prosody cue (optional)
+            state: Stream to update (the handler's own by default)
+        
         Returns:
-            State information dictionary
+            State information dictionary; 'event' is 'speech_start', 'speech_continue',
+            'silence', 'speech_end' or 'speech_timeout'
         """
+        state = state or self.speech_state
+        
         if timestamp is None:
             timestamp = len(self.speech_buffer) / self.sample_rate
         
         is_speech = speech_prob > self.threshold
+        event = 'speech_continue' if is_speech else 'silence'
         
         # State transitions
-        if is_speech and not self.is_speaking:
+        if is_speech and not state.is_speaking:
             # Start of speech
-            self.is_speaking = True
-            self.speech_start_time = timestamp
-            self.last_speech_time = timestamp
+            state.is_speaking = True
+            state.speech_start_time = timestamp
+            state.last_speech_time = timestamp
+            event = 'speech_start'
             logger.debug(f"Speech started at {timestamp:.2f}s")
-            
-        elif is_speech and self.is_speaking:
+        
+        elif is_speech and state.is_speaking:
             # Continuing speech
-            self.last_speech_time = timestamp
-            
-        elif not is_speech and self.is_speaking:
+            state.last_speech_time = timestamp
+        
+        if is_speech and audio is not None and state.endpointer is not None:
+            state.endpointer.observe_audio(audio, self.sample_rate)
+        
+        if not is_speech and state.is_speaking:
             # Potential end of speech
-            silence_duration = timestamp - self.last_speech_time
+            silence_duration = timestamp - state.last_speech_time
             
-            if silence_duration > self.max_silence_duration:
+            if silence_duration > self.get_silence_hangover(state):
                 # End of speech
-                speech_duration = self.last_speech_time - self.speech_start_time
+                speech_duration = state.last_speech_time - state.speech_start_time
                 
                 logger.debug(f"Speech ended at {timestamp:.2f}s, duration: {speech_duration:.2f}s")
                 
-                self.is_speaking = False
-                self.speech_start_time = None
+                state.reset()
                 
                 # Return speech segment info
                 return {
                     'event': 'speech_end',
                     'speech_duration': speech_duration,
-                    'valid_speech': speech_duration > self.min_speech_duration,
+                    'valid_speech': speech_duration >= self.min_speech_duration,
                     'timestamp': timestamp
                 }
         
         # Check for maximum speech duration
-        if self.is_speaking and self.speech_start_time:
-            speech_duration = timestamp - self.speech_start_time
+        if state.is_speaking and state.speech_start_time is not None:
+            speech_duration = timestamp - state.speech_start_time
             if speech_duration > self.max_speech_duration:
                 logger.debug(f"Maximum speech duration reached: {speech_duration:.2f}s")
                 
-                self.is_speaking = False
-                self.speech_start_time = None
+                state.reset()
                 
                 return {
                     'event': 'speech_timeout',
@@ -238,8 +484,8 @@ class VADHandler:
                 }
         
         return {
-            'event': 'speech_continue' if is_speech else 'silence',
-            'is_speaking': self.is_speaking,
+            'event': event,
+            'is_speaking': state.is_speaking,
             'speech_prob': speech_prob,
             'timestamp': timestamp
         }
@@ -250,7 +496,7 @@ class VADHandler:
         
         Args:
             audio: Full audio buffer
-            
+        
         Returns:
             List of (start_time, end_time) tuples for speech segments
         """
@@ -279,7 +525,7 @@ class VADHandler:
                 segments.append((start_time, end_time))
             
             return segments
-            
+        
         except Exception as e:
             logger.error(f"Error getting speech segments: {e}")
             return []
@@ -287,40 +533,8 @@ class VADHandler:
     async def get_speech_segments_energy(self, audio: np.ndarray) -> List[Tuple[float, float]]:
         """Fallback energy-based speech segmentation."""
         try:
-            if len(audio) == 0:
-                return []
-            
-            # Simple energy-based segmentation
-            chunk_size = int(0.1 * self.sample_rate)  # 100ms chunks
-            segments = []
-            current_start = None
-            
-            for i in range(0, len(audio), chunk_size):
-                chunk = audio[i:i + chunk_size]
-                if len(chunk) == 0:
-                    continue
-                
-                energy = np.sqrt(np.mean(chunk ** 2))
-                is_speech = energy > 0.01  # Simple threshold
-                
-                timestamp = i / self.sample_rate
-                
-                if is_speech and current_start is None:
-                    current_start = timestamp
-                elif not is_speech and current_start is not None:
-                    duration = timestamp - current_start
-                    if duration > self.min_speech_duration:
-                        segments.append((current_start, timestamp))
-                    current_start = None
-            
-            # Handle case where audio ends during speech
-            if current_start is not None:
-                end_time = len(audio) / self.sample_rate
-                if end_time - current_start > self.min_speech_duration:
-                    segments.append((current_start, end_time))
-            
-            return segments
-            
+            return self.segment_energy(audio)
+        
         except Exception as e:
             logger.error(f"Error in energy-based segmentation: {e}")
             return []
@@ -329,9 +543,7 @@ class VADHandler:
         """Reset VAD state."""
         self.speech_buffer = []
         self.silence_buffer = []
-        self.is_speaking = False
-        self.speech_start_time = None
-        self.last_speech_time = None
+        self.speech_state.reset()
         logger.debug("VAD state reset")
     
     def get_config(self) -> dict:
@@ -343,6 +555,8 @@ class VADHandler:
             'min_speech_duration': self.min_speech_duration,
             'max_silence_duration': self.max_silence_duration,
             'max_speech_duration': self.max_speech_duration,
+            'energy_threshold': self.energy_threshold,
+            'silence_hangover': self.get_silence_hangover(),
             'model_loaded': self.model is not None
         }
 
@@ -395,7 +609,7 @@ async def test_vad():
     segments = await vad.get_speech_segments(speech_signal)
     logger.info(f"Detected {len(segments)} speech segments:")
     for i, (start, end) in enumerate(segments):
-        logger.info(f"  Segment {i+1}: {start:.2f}s - {end:.2f}s ({end-Start:.2f}s)")
+        logger.info(f"  Segment {i+1}: {start:.2f}s - {end:.2f}s ({end-start:.2f}s)")
     
     logger.info("VAD test complete")
 
@@ -26,6 +26,9 @@ except FileNotFoundError:
 except Exception as e:
     logger.warning(f"Could not load .env file: {e}")
 
+# Returned when the model request fails
+ERROR_RESPONSE = "Listen: I seem to be having trouble connecting to my thoughts right now. So it goes."
+
 class VonnegutChatbot:
     def __init__(self, openai_api_key: Optional[str] = None):
         """Initialize Vonnegut chatbot with OpenAI integration."""
@@ -35,8 +38,11 @@ class VonnegutChatbot:
         if not api_key:
             logger.warning("No OpenAI API key - will use fallback responses")
             self.client = None
+            self.async_client = None
         else:
             self.client = openai.OpenAI(api_key=api_key)
+            # Async client so requests can be cancelled on barge-in
+            self.async_client = openai.AsyncOpenAI(api_key=api_key)
         
         # Conversation parameters
         self.model = "gpt-4"
@@ -131,22 +137,7 @@ Respond naturally based on the question asked:
             if not self.client:
                 return self.get_fallback_response(user_input)
             
-            # Prepare messages
-            messages = [
-                {"role": "system", "content": self.get_vonnegut_system_prompt()}
-            ]
-            
-            # Add conversation history (keep last N messages for context)
-            if conversation_history:
-                for msg in conversation_history[-self.max_history:]:
-                    if msg.get("role") in ["user", "assistant"]:
-                        messages.append({
-                            "role": msg["role"],
-                            "content": msg["content"]
-                        })
-            
-            # Add current user input
-            messages.append({"role": "user", "content": user_input})
+            messages = self.build_messages(user_input, conversation_history)
             
             logger.info(f"Generating response for: {user_input[:50]}...")
             
@@ -167,7 +158,27 @@ Respond naturally based on the question asked:
             
         except Exception as e:
             logger.error(f"Error generating response: {e}")
-            return "Listen: I seem to be having trouble connecting to my thoughts right now. So it goes."
+            return ERROR_RESPONSE
+    
+    def build_messages(self, user_input: str, conversation_history: List[Dict] = None) -> List[Dict]:
+        """Build the chat messages for a request."""
+        messages = [
+            {"role": "system", "content": self.get_vonnegut_system_prompt()}
+        ]
+        
+        # Add conversation history (keep last N messages for context)
+        if conversation_history:
+            for msg in conversation_history[-self.max_history:]:
+                if msg.get("role") in ["user", "assistant"]:
+                    messages.append({
+                        "role": msg["role"],
+                        "content": msg["content"]
+                    })
+        
+        # Add current user input
+        messages.append({"role": "user", "content": user_input})
+        
+        return messages
     
     def get_fallback_response(self, user_input: str) -> str:
         """Generate fallback responses when OpenAI is not available."""
@@ -200,10 +211,36 @@ Respond naturally based on the question asked:
             return random.choice(responses)
     
     async def generate_response_async(self, user_input: str, conversation_history: List[Dict] = None) -> str:
-        """Async wrapper for generate_response."""
-        # For now, just call the sync version
-        # Could be upgraded to use async OpenAI client
-        return self.generate_response(user_input, conversation_history)
+        """
+        Generate a response without blocking the event loop.
+        
+        Cancelling the awaiting task aborts the OpenAI request.
+        """
+        try:
+            if not self.async_client:
+                return self.get_fallback_response(user_input)
+            
+            messages = self.build_messages(user_input, conversation_history)
+            
+            logger.info(f"Generating response for: {user_input[:50]}...")
+            
+            response = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                presence_penalty=self.presence_penalty,
+                frequency_penalty=self.frequency_penalty
+            )
+            
+            response_text = response.choices[0].message.content.strip()
+            logger.info(f"Generated response: {response_text[:100]}...")
+            
+            return response_text
+            
+        except Exception as e:
+            logger.error(f"Error generating response: {e}")
+            return ERROR_RESPONSE
     
     def create_conversation_context(self, messages: List[Dict]) -> List[Dict]:
         """Create properly formatted conversation context."""
@@ -10,25 +10,36 @@ import logging
 import base64
 import io
 from typing import Dict, Optional, List
-from pathlib import Path
 import numpy as np
-import soundfile as sf
-from datetime import datetime
 
 # Import local modules
 from vad_handler import VADHandler
+from endpointer import AdaptiveEndpointer
 from faq_router import FAQRouter
-from vonnegut_chatbot import VonnegutChatbot
+from vonnegut_chatbot import VonnegutChatbot, ERROR_RESPONSE
 from local_tts_lite import LocalTTSHandler
+from stt_engines import create_stt_engine
+from metrics import LatencyStats
+from audio_utils import float_to_pcm16, pcm16_to_float
+from session_manager import SessionManager, SessionState, ACTIVE_STATES
+from audio_cache import AudioClipCache
+from answer_router import AnswerRouter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Outbound messages carrying a response's audio; dropped when the response is cancelled
+RESPONSE_AUDIO_TYPES = ('voice_response', 'voice_response_chunk', 'voice_response_end')
+RESPONSE_AUDIO_TAG = 'response_audio'
+
 class VoiceConversationServer:
-    def __init__(self, host: str = "localhost", port: int = 7081):
+    def __init__(self, host: str = "localhost", port: int = 7081,
+                 endpointer_config_path: str = "../config/endpointer_config.json",
+                 max_sessions: int = 20):
         self.host = host
         self.port = port
+        self.endpointer_config_path = endpointer_config_path
         
         # Initialize components
         try:
@@ -59,8 +70,23 @@ class VoiceConversationServer:
             logger.error(f"Error creating TTS: {e}")
             self.local_tts = None
         
-        # Connected clients
-        self.clients: Dict[str, Dict] = {}
+        try:
+            self.stt_engine = create_stt_engine()
+        except Exception as e:
+            logger.warning(f"No STT engine ({e}) - audio transcription disabled. Use browser speech recognition.")
+            self.stt_engine = None
+        
+        # Turns are answered from the FAQ, then earlier model answers, then the model
+        self.answer_router = AnswerRouter(
+            self.faq_router,
+            generate=self.get_chatbot_response,
+            fallback=self.get_fallback_response,
+            cacheable=self.is_cacheable_response,
+            has_history=self.has_conversation_history
+        )
+        
+        # Runtime metrics
+        self.stt_latency = LatencyStats()
         
         # Default voice settings for hologram
         self.voice_settings = {
@@ -75,45 +101,73 @@ class VoiceConversationServer:
         self.chunk_duration = 0.5  # seconds
         self.chunk_size = int(self.sample_rate * self.chunk_duration)
         
+        # Pre-recorded clips (FAQ answers) decoded and encoded once
+        self.audio_cache = AudioClipCache(self.sample_rate)
+        
+        # Connected client sessions; retain a little more audio than the longest utterance
+        max_speech_duration = self.vad_handler.max_speech_duration if self.vad_handler else 30.0
+        self.session_manager = SessionManager(
+            max_sessions=max_sessions,
+            max_audio_seconds=max_speech_duration + 2.0,
+            sample_rate=self.sample_rate
+        )
+        self.reaper_task = None
+        
         logger.info(f"Voice server initialized on {host}:{port}")
     
-    async def register_client(self, websocket) -> str:
-        """Register a new client connection."""
-        client_id = f"client_{len(self.clients)}_{datetime.now().timestamp()}"
+    async def register_client(self, websocket) -> Optional[str]:
+        """
+        Register a new client connection.
         
-        self.clients[client_id] = {
-            'websocket': websocket,
-            'connected_at': datetime.now(),
-            'audio_buffer': [],
-            'conversation_state': 'idle',  # idle, listening, processing, speaking
-            'session_data': {}
-        }
+        Returns:
+            Client id, or None when the server is at capacity
+        """
+        session = self.session_manager.admit(websocket)
+        if session is None:
+            return None
         
-        logger.info(f"Client registered: {client_id}")
-        return client_id
+        session.speech_state.endpointer = AdaptiveEndpointer(self.endpointer_config_path)
+        
+        logger.info(f"Client registered: {session.client_id}")
+        return session.client_id
     
     async def unregister_client(self, client_id: str):
         """Unregister a client connection."""
-        if client_id in self.clients:
-            del self.clients[client_id]
+        if self.session_manager.remove(client_id) is not None:
             logger.info(f"Client unregistered: {client_id}")
     
     async def send_message(self, client_id: str, message: Dict):
-        """Send message to a specific client."""
-        if client_id not in self.clients:
+        """Queue a message for a specific client; the client's writer task sends it."""
+        session = self.session_manager.get(client_id)
+        if session is None:
             return
         
         try:
-            websocket = self.clients[client_id]['websocket']
-            await websocket.send(json.dumps(message))
+            tag = RESPONSE_AUDIO_TAG if message.get('type') in RESPONSE_AUDIO_TYPES else None
+            await session.outbound.put(json.dumps(message), tag)
         except Exception as e:
             logger.error(f"Error sending message to {client_id}: {e}")
-            await self.unregister_client(client_id)
     
-    async def broadcast_message(self, message: Dict):
-        """Broadcast message to all connected clients."""
-        for client_id in list(self.clients.keys()):
-            await self.send_message(client_id, message)
+    async def broadcast_message(self, message: Dict, coalesce_key: Optional[str] = None) -> int:
+        """
+        Broadcast message to all connected clients.
+        
+        The message is serialized once and offered to every client's
+        outbound queue without waiting, so a slow client never delays the
+        others; it drops messages (or, with ``coalesce_key``, only keeps
+        the latest one) instead.
+        
+        Returns:
+            Number of clients the message was queued for
+        """
+        payload = json.dumps(message)
+        queued = 0
+        
+        for session in self.session_manager.all():
+            if session.outbound.offer(payload, coalesce_key):
+                queued += 1
+        
+        return queued
     
     def decode_audio_data(self, audio_data: str) -> np.ndarray:
         """Decode base64 audio data to numpy array."""
@@ -121,13 +175,8 @@ class VoiceConversationServer:
             # Decode base64
             audio_bytes = base64.b64decode(audio_data)
             
-            # Convert to numpy array (assuming 16-bit PCM)
-            audio_np = np.frombuffer(audio_bytes, dtype=np.int16)
-            
-            # Normalize to [-1, 1]
-            audio_float = audio_np.astype(np.float32) / 32768.0
-            
-            return audio_float
+            # 16-bit PCM normalized to [-1, 1]
+            return pcm16_to_float(audio_bytes)
         except Exception as e:
             logger.error(f"Error decoding audio data: {e}")
             return np.array([])
@@ -135,11 +184,8 @@ class VoiceConversationServer:
     def encode_audio_data(self, audio: np.ndarray) -> str:
         """Encode numpy array to base64 audio data."""
         try:
-            # Convert to 16-bit PCM
-            audio_int16 = (audio * 32767).astype(np.int16)
-            
-            # Convert to bytes
-            audio_bytes = audio_int16.tobytes()
+            # Convert to 16-bit PCM bytes
+            audio_bytes = float_to_pcm16(audio).tobytes()
             
             # Encode to base64
             audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
@@ -158,35 +204,125 @@ class VoiceConversationServer:
             if len(audio_chunk) == 0:
                 return
             
-            # Add to client's audio buffer
-            self.clients[client_id]['audio_buffer'].extend(audio_chunk)
+            session = self.session_manager.get(client_id)
+            if session is None:
+                return
             
-            # Check for speech using VAD
-            buffer = np.array(self.clients[client_id]['audio_buffer'])
+            # Add to client's audio buffer
+            session.append_audio(audio_chunk)
             
-            if len(buffer) >= self.chunk_size:
+            if session.audio_samples >= self.chunk_size:
                 # Process chunk with VAD
-                speech_prob = await self.vad_handler.detect_speech(buffer[-self.chunk_size:])
+                recent_audio = session.recent_audio(self.chunk_size)
+                speech_prob = float(await self.vad_handler.detect_speech(recent_audio))
+                is_speech = speech_prob > self.vad_handler.threshold
                 
                 # Send VAD result to client
                 await self.send_message(client_id, {
                     'type': 'vad_result',
-                    'speech_probability': float(speech_prob),
-                    'is_speech': speech_prob > 0.5
+                    'speech_probability': speech_prob,
+                    'is_speech': is_speech
                 })
                 
-                # If speech detected and enough audio collected
-                if speech_prob > 0.5 and len(buffer) > self.sample_rate * 2:  # 2 seconds minimum
-                    await self.process_speech_segment(client_id, buffer)
+                await self.update_endpoint(session, recent_audio, speech_prob)
         
         except Exception as e:
             logger.error(f"Error processing audio chunk for {client_id}: {e}")
     
+    async def update_endpoint(self, session, recent_audio: np.ndarray, speech_prob: float):
+        """Track speech/silence for a client and process the utterance once it ends."""
+        client_id = session.client_id
+        timestamp = session.audio_total_samples / self.sample_rate
+        
+        state = self.vad_handler.update_speech_state(
+            speech_prob, timestamp, recent_audio, state=session.speech_state
+        )
+        event = state['event']
+        
+        if event == 'speech_start':
+            await self.interrupt_response(client_id)
+            return
+        
+        if event == 'silence' and not state['is_speaking']:
+            # No speech yet: keep only the last chunk as pre-roll
+            session.trim_audio(self.chunk_size)
+            return
+        
+        if event not in ('speech_end', 'speech_timeout'):
+            return
+        
+        buffer = session.get_audio()
+        session.clear_audio()
+        
+        if state['valid_speech']:
+            self.start_response(client_id, self.process_speech_segment(client_id, buffer))
+    
+    def start_response(self, client_id: str, response_coro):
+        """Run a response pipeline for a client in the background, replacing any in-flight one."""
+        session = self.session_manager.get(client_id)
+        if session is None:
+            response_coro.close()
+            return
+        
+        self.cancel_response(session)
+        session.response_task = asyncio.create_task(response_coro)
+    
+    def cancel_response(self, session) -> bool:
+        """
+        Cancel a client's in-flight response and drop its audio still waiting to be sent.
+        
+        Returns:
+            True if a response was cancelled
+        """
+        task = session.response_task
+        session.response_task = None
+        if task is None or task.done():
+            return False
+        
+        task.cancel()
+        dropped = session.outbound.discard(RESPONSE_AUDIO_TAG)
+        if dropped:
+            logger.debug(f"Dropped {dropped} queued audio messages for {session.client_id}")
+        return True
+    
+    def finish_response(self, session):
+        """Return to idle after a response, unless a newer response or a barge-in took over."""
+        if session.response_task is not asyncio.current_task():
+            return
+        
+        session.response_task = None
+        if session.state == SessionState.PROCESSING:
+            session.set_state(SessionState.IDLE)
+    
+    async def interrupt_response(self, client_id: str) -> bool:
+        """
+        Barge-in: cancel the in-flight response and its unsent audio.
+        
+        Audio the visitor has sent is kept; it is the start of their new turn.
+        
+        Returns:
+            True if a response was cancelled
+        """
+        session = self.session_manager.get(client_id)
+        if session is None or not self.cancel_response(session):
+            return False
+        
+        if session.state in ACTIVE_STATES:
+            session.set_state(SessionState.LISTENING)
+        logger.info(f"Barge-in: cancelled response for {client_id}")
+        
+        await self.send_message(client_id, {'type': 'response_cancelled'})
+        return True
+    
     async def process_speech_segment(self, client_id: str, audio_buffer: np.ndarray):
         """Process a complete speech segment."""
+        session = self.session_manager.get(client_id)
+        if session is None:
+            return
+        
         try:
             # Update client state
-            self.clients[client_id]['conversation_state'] = 'processing'
+            session.set_state(SessionState.PROCESSING)
             
             await self.send_message(client_id, {
                 'type': 'status',
@@ -211,206 +347,162 @@ class VoiceConversationServer:
                 'text': transcription
             })
             
-            # Route through FAQ system first (if available)
-            faq_response = None
-            if self.faq_router:
-                try:
-                    faq_response = await self.faq_router.check_faq(transcription)
-                except Exception as e:
-                    logger.error(f"Error checking FAQ: {e}")
-                    faq_response = None
-            
-            if faq_response:
-                # Use FAQ response
-                response_text = faq_response['text']
-                audio_file = faq_response.get('audio_file')
-                
-                await self.send_message(client_id, {
-                    'type': 'faq_response',
-                    'text': response_text,
-                    'confidence': faq_response.get('confidence', 0.0)
-                })
-            else:
-                # Route to main chatbot
-                response_text = await self.get_chatbot_response(transcription, client_id)
-                audio_file = None
-            
-            # Generate or load TTS audio
-            response_audio = None
-            
-            if audio_file and Path(audio_file).exists():
-                # Use pre-generated FAQ audio
-                response_audio = await self.load_audio_file(audio_file)
-                logger.info(f"Loaded pre-generated audio: {audio_file}")
-            else:
-                # Generate new TTS audio
-                logger.info("Generating TTS audio for response...")
-                response_audio = await self.generate_tts_audio(response_text)
-                
-                if response_audio is not None:
-                    logger.info(f"TTS audio generated: {len(response_audio)/self.sample_rate:.2f}s")
-                else:
-                    logger.error("TTS audio generation failed")
-            
-            # Send response to client
-            if response_audio is not None:
-                logger.info("Encoding audio for browser...")
-                audio_b64 = self.encode_audio_data(response_audio)
-                logger.info(f"Audio encoded: {len(audio_b64)} characters base64")
-                
-                await self.send_message(client_id, {
-                    'type': 'voice_response',
-                    'text': response_text,
-                    'audio_data': audio_b64,
-                    'sample_rate': self.sample_rate
-                })
-                logger.info("Voice response sent to client")
-            else:
-                logger.warning("No audio generated, sending text-only response")
-                await self.send_message(client_id, {
-                    'type': 'text_response',
-                    'text': response_text
-                })
-            
-            # Clear audio buffer and reset state
-            self.clients[client_id]['audio_buffer'] = []
-            self.clients[client_id]['conversation_state'] = 'idle'
-            
+            await self.respond(client_id, transcription)
+        
         except Exception as e:
             logger.error(f"Error processing speech segment for {client_id}: {e}")
             await self.send_message(client_id, {
                 'type': 'error',
                 'message': 'Error processing speech'
             })
+        finally:
+            # Reset state unless a barge-in, a newer response or the reaper already moved on
+            self.finish_response(session)
     
     async def transcribe_audio(self, audio: np.ndarray) -> Optional[str]:
-        """Transcribe audio to text using STT service."""
+        """Transcribe audio to text using the configured STT engine."""
         try:
             if len(audio) == 0:
                 return None
             
-            # Try OpenAI Whisper if API key is available
-            if hasattr(self, 'vonnegut_chatbot') and self.vonnegut_chatbot and self.vonnegut_chatbot.client:
-                return await self.transcribe_with_openai_whisper(audio)
-            else:
-                # Fallback: Use browser speech recognition instead
-                logger.warning("No OpenAI API key - audio transcription disabled. Use browser speech recognition.")
+            if self.stt_engine is None:
+                logger.warning("No STT engine - audio transcription disabled. Use browser speech recognition.")
                 return None
             
-        except Exception as e:
-            logger.error(f"Error in transcription: {e}")
-            return None
-    
-    async def transcribe_with_openai_whisper(self, audio: np.ndarray) -> Optional[str]:
-        """Transcribe audio using OpenAI Whisper API."""
-        try:
-            import tempfile
-            import os
-            
-            # Save audio to temporary WAV file
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                temp_path = temp_file.name
+            with self.stt_latency.timer():
+                transcription = await self.stt_engine.transcribe(audio, self.sample_rate)
             
-            try:
-                # Write audio data to file
-                sf.write(temp_path, audio, self.sample_rate)
-                
-                # Transcribe using OpenAI Whisper
-                with open(temp_path, 'rb') as audio_file:
-                    transcript = self.vonnegut_chatbot.client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=audio_file,
-                        language="en"
-                    )
-                
-                transcription_text = transcript.text.strip()
-                logger.info(f"Whisper transcription: {transcription_text}")
-                return transcription_text
-                
-            finally:
-                # Clean up temporary file
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-                    
+            logger.info(f"{self.stt_engine.name} transcription: {transcription}")
+            return transcription
+        
+        except asyncio.TimeoutError:
+            logger.error("Transcription timed out")
+            return None
         except Exception as e:
-            logger.error(f"Error in Whisper transcription: {e}")
+            logger.error(f"Error in transcription: {e}")
             return None
     
     async def process_text_input(self, client_id: str, text: str):
         """Process text input directly (from browser speech recognition)."""
+        session = self.session_manager.get(client_id)
+        if session is None:
+            return
+        
         try:
             # Update client state
-            self.clients[client_id]['conversation_state'] = 'processing'
+            session.set_state(SessionState.PROCESSING)
             
             await self.send_message(client_id, {
                 'type': 'status',
                 'status': 'processing'
             })
             
-            # Route directly to main chatbot (skip FAQ system)
-            response_text = await self.get_chatbot_response(text, client_id)
-            
-            # Always generate TTS audio for phone call experience
-            logger.info("Generating TTS audio for response...")
-            response_audio = await self.generate_tts_audio(response_text)
-            
-            if response_audio is not None:
-                logger.info(f"TTS audio generated: {len(response_audio)/self.sample_rate:.2f}s")
-                
-                # Encode and send voice response with audio
-                audio_b64 = self.encode_audio_data(response_audio)
-                
-                await self.send_message(client_id, {
-                    'type': 'voice_response',
-                    'text': response_text,
-                    'audio_data': audio_b64,
-                    'sample_rate': self.sample_rate
-                })
-                logger.info("Voice response with audio sent to client")
-            else:
-                logger.warning("No audio generated, sending text-only response")
-                await self.send_message(client_id, {
-                    'type': 'text_response',
-                    'text': response_text
-                })
-            
-            # Update conversation state
-            self.clients[client_id]['conversation_state'] = 'idle'
-            
+            await self.respond(client_id, text)
+        
         except Exception as e:
             logger.error(f"Error processing text input for {client_id}: {e}")
             await self.send_message(client_id, {
                 'type': 'error',
                 'message': 'Error processing your message'
             })
+        finally:
+            # Update conversation state
+            self.finish_response(session)
+    
+    async def respond(self, client_id: str, text: str):
+        """Answer a visitor turn from the cheapest tier that can and send it with audio."""
+        session = self.session_manager.get(client_id)
+        answer = await self.answer_router.answer(text, client_id)
+        response_text = answer['text']
+        audio_file = answer['audio_file']
+        
+        if answer['tier'] != 'llm' and session is not None:
+            # get_chatbot_response records model answers itself
+            session.add_exchange(text, response_text)
+        
+        if answer['tier'] == 'faq':
+            await self.send_message(client_id, {
+                'type': 'faq_response',
+                'text': response_text,
+                'confidence': answer['confidence']
+            })
+        
+        # Use pre-generated FAQ audio, already encoded in the clip cache
+        clip = await self.audio_cache.get(audio_file) if audio_file else None
+        if clip is not None:
+            await self.send_message(client_id, {
+                'type': 'voice_response',
+                'text': response_text,
+                'audio_data': clip.audio_b64,
+                'sample_rate': clip.sample_rate
+            })
+            logger.info(f"Sent pre-generated audio: {audio_file} ({clip.duration:.2f}s)")
+            return
+        
+        if session is not None and session.session_data.get('streaming_audio'):
+            # Stream sentence by sentence; falls back to a single response if nothing was synthesized
+            if await self.stream_voice_response(client_id, response_text):
+                return
+        
+        # Generate new TTS audio
+        logger.info("Generating TTS audio for response...")
+        response_audio = await self.generate_tts_audio(response_text)
+        
+        if response_audio is not None:
+            logger.info(f"TTS audio generated: {len(response_audio)/self.sample_rate:.2f}s")
+            
+            audio_b64 = self.encode_audio_data(response_audio)
+            await self.send_message(client_id, {
+                'type': 'voice_response',
+                'text': response_text,
+                'audio_data': audio_b64,
+                'sample_rate': self.sample_rate
+            })
+            logger.info("Voice response sent to client")
+        else:
+            logger.warning("No audio generated, sending text-only response")
+            await self.send_message(client_id, {
+                'type': 'text_response',
+                'text': response_text
+            })
     
     async def get_chatbot_response(self, text: str, client_id: str) -> str:
         """Get response from Vonnegut chatbot system."""
         try:
+            session = self.session_manager.get(client_id)
+            
             # Get conversation history for this client
-            conversation_history = self.clients[client_id].get('conversation_history', [])
+            conversation_history = list(session.conversation_history) if session else []
             
             # Generate Vonnegut response
             response = await self.vonnegut_chatbot.generate_response_async(text, conversation_history)
             
-            # Update conversation history
-            if 'conversation_history' not in self.clients[client_id]:
-                self.clients[client_id]['conversation_history'] = []
-            
-            self.clients[client_id]['conversation_history'].extend([
-                {"role": "user", "content": text},
-                {"role": "assistant", "content": response}
-            ])
-            
-            # Keep only last 10 exchanges (20 messages)
-            if len(self.clients[client_id]['conversation_history']) > 20:
-                self.clients[client_id]['conversation_history'] = self.clients[client_id]['conversation_history'][-20:]
+            # Update conversation history (bounded to the last 10 exchanges)
+            if session is not None:
+                session.add_exchange(text, response)
             
             return response
-            
+        
         except Exception as e:
             logger.error(f"Error getting chatbot response: {e}")
-            return "Listen: I seem to be having trouble connecting to my thoughts right now. So it goes."
+            return ERROR_RESPONSE
+    
+    def get_fallback_response(self, text: str) -> str:
+        """Offline answer for when the model is too slow."""
+        if self.vonnegut_chatbot is None:
+            return ERROR_RESPONSE
+        return self.vonnegut_chatbot.get_fallback_response(text)
+    
+    def has_conversation_history(self, client_id: str) -> bool:
+        """Whether the client has earlier exchanges (model answers then depend on them)."""
+        session = self.session_manager.get(client_id)
+        return session is not None and len(session.conversation_history) > 0
+    
+    def is_cacheable_response(self, response: str) -> bool:
+        """Only real model answers are reused (not offline or error lines)."""
+        return (self.vonnegut_chatbot is not None
+                and self.vonnegut_chatbot.async_client is not None
+                and response != ERROR_RESPONSE)
     
     async def generate_tts_audio(self, text: str) -> Optional[np.ndarray]:
         """Generate TTS audio using local TTS handler."""
@@ -428,41 +520,62 @@ class VoiceConversationServer:
                 # Send to TouchDesigner if available
                 if hasattr(self, 'td_bridge') and self.td_bridge:
                     try:
-                        self.td_bridge.send_audio_features(audio_data)
+                        self.td_bridge.send_audio_features(audio_data, self.local_tts.sample_rate)
                     except Exception as e:
                         logger.warning(f"TouchDesigner bridge failed: {e}")
             
             return audio_data
-            
+        
         except Exception as e:
             logger.error(f"Error generating TTS audio: {e}")
             return None
     
     
+    async def stream_voice_response(self, client_id: str, text: str) -> bool:
+        """
+        Send TTS audio as it is synthesized, one chunk per sentence.
+        
+        Returns:
+            True if any audio was sent
+        """
+        if not self.local_tts or not hasattr(self.local_tts, 'stream_speech'):
+            return False
+        
+        index = 0
+        async for chunk in self.local_tts.stream_speech(text):
+            await self.send_message(client_id, {
+                'type': 'voice_response_chunk',
+                'index': index,
+                'audio_data': self.encode_audio_data(chunk),
+                'sample_rate': self.local_tts.sample_rate
+            })
+            index += 1
+        
+        if index == 0:
+            return False
+        
+        await self.send_message(client_id, {
+            'type': 'voice_response_end',
+            'text': text,
+            'chunks': index
+        })
+        logger.info(f"Streamed voice response to client in {index} chunks")
+        return True
+    
     async def load_audio_file(self, audio_path: str) -> Optional[np.ndarray]:
-        """Load pre-generated audio file."""
-        try:
-            audio, sr = sf.read(audio_path)
-            
-            # Resample if needed
-            if sr != self.sample_rate:
-                # Simple resampling (use librosa for better quality)
-                ratio = self.sample_rate / sr
-                new_length = int(len(audio) * ratio)
-                audio = np.interp(
-                    np.linspace(0, len(audio), new_length),
-                    np.arange(len(audio)),
-                    audio
-                )
-            
-            return audio
-            
-        except Exception as e:
-            logger.error(f"Error loading audio file {audio_path}: {e}")
+        """Load pre-generated audio file (through the clip cache)."""
+        clip = await self.audio_cache.get(audio_path)
+        if clip is None:
             return None
+        
+        return pcm16_to_float(clip.pcm16.tobytes())
     
     async def handle_client_message(self, client_id: str, message: Dict):
         """Handle incoming message from client."""
+        session = self.session_manager.get(client_id)
+        if session is None:
+            return
+        
         try:
             message_type = message.get('type')
             
@@ -470,27 +583,37 @@ class VoiceConversationServer:
                 await self.process_audio_chunk(client_id, message.get('data', ''))
             
             elif message_type == 'start_listening':
-                self.clients[client_id]['conversation_state'] = 'listening'
-                self.clients[client_id]['audio_buffer'] = []
+                session.set_state(SessionState.LISTENING)
+                session.clear_audio()
                 await self.send_message(client_id, {
                     'type': 'status',
                     'status': 'listening'
                 })
             
             elif message_type == 'stop_listening':
-                self.clients[client_id]['conversation_state'] = 'idle'
+                if session.state == SessionState.LISTENING:
+                    session.set_state(SessionState.IDLE)
                 
                 # Process any remaining audio
-                buffer = np.array(self.clients[client_id]['audio_buffer'])
+                buffer = session.get_audio()
+                session.clear_audio()
                 if len(buffer) > self.sample_rate:  # At least 1 second
-                    await self.process_speech_segment(client_id, buffer)
+                    self.start_response(client_id, self.process_speech_segment(client_id, buffer))
+            
+            elif message_type == 'partial_transcript':
+                # Interim browser speech recognition result, used for endpointing
+                session.speech_state.endpointer.update_transcript(message.get('text', ''))
             
             elif message_type == 'transcribed_text':
                 # Handle text input directly (from browser speech recognition)
                 text = message.get('text', '').strip()
                 if text:
                     logger.info(f"Received transcribed text from {client_id}: {text}")
-                    await self.process_text_input(client_id, text)
+                    self.start_response(client_id, self.process_text_input(client_id, text))
+            
+            elif message_type == 'client_capabilities':
+                # Clients that can queue audio chunks get responses streamed per sentence
+                session.session_data['streaming_audio'] = bool(message.get('streaming_audio', False))
             
             elif message_type == 'voice_settings':
                 # Update voice settings for TTS and hologram
@@ -513,16 +636,65 @@ class VoiceConversationServer:
             elif message_type == 'ping':
                 await self.send_message(client_id, {'type': 'pong'})
             
+            elif message_type == 'get_stats':
+                await self.send_message(client_id, {
+                    'type': 'stats',
+                    'stats': self.get_stats()
+                })
+            
             else:
                 logger.warning(f"Unknown message type from {client_id}: {message_type}")
         
         except Exception as e:
             logger.error(f"Error handling message from {client_id}: {e}")
     
+    async def receive_client_message(self, client_id: str, message: Dict):
+        """
+        Handle a message as soon as it is read from the socket.
+        
+        Latency-sensitive control messages are answered here; everything
+        else goes through the bounded queue to the processing task.
+        """
+        message_type = message.get('type')
+        
+        if message_type == 'ping':
+            await self.send_message(client_id, {'type': 'pong'})
+        
+        elif message_type == 'speech_start':
+            # Client-side VAD heard the visitor start talking
+            await self.interrupt_response(client_id)
+        
+        else:
+            await self.session_manager.get(client_id).inbound_queue.put(message)
+    
+    async def process_client_messages(self, client_id: str):
+        """Processing task: handle queued messages for one client in order."""
+        inbound = self.session_manager.get(client_id).inbound_queue
+        
+        while True:
+            message = await inbound.get()
+            await self.handle_client_message(client_id, message)
+    
     async def client_handler(self, websocket, path):
         """Handle individual client connections."""
         client_id = await self.register_client(websocket)
         
+        if client_id is None:
+            # At capacity: tell the kiosk to retry later
+            try:
+                await websocket.send(json.dumps({
+                    'type': 'error',
+                    'message': 'Server busy, please try again shortly'
+                }))
+                await websocket.close(code=1013, reason="server at capacity")
+            except Exception as e:
+                logger.error(f"Error rejecting connection: {e}")
+            return
+        
+        session = self.session_manager.get(client_id)
+        writer = asyncio.create_task(session.outbound.run())
+        processor = asyncio.create_task(self.process_client_messages(client_id))
+        
         try:
             # Send welcome message
             await self.send_message(client_id, {
@@ -535,11 +707,12 @@ class VoiceConversationServer:
                 }
             })
             
-            # Handle messages
+            # Receive messages; processing happens in the processor task
             async for message_raw in websocket:
                 try:
                     message = json.loads(message_raw)
-                    await self.handle_client_message(client_id, message)
+                    session.touch()
+                    await self.receive_client_message(client_id, message)
                 except json.JSONDecodeError:
                     logger.error(f"Invalid JSON from {client_id}")
                 except Exception as e:
@@ -550,6 +723,8 @@ class VoiceConversationServer:
         except Exception as e:
             logger.error(f"Error with client {client_id}: {e}")
         finally:
+            processor.cancel()
+            writer.cancel()
             await self.unregister_client(client_id)
     
     async def start_server(self):
@@ -564,6 +739,7 @@ class VoiceConversationServer:
             except Exception as e:
                 logger.error(f"Error initializing FAQ router: {e}")
                 self.faq_router = None
+                self.answer_router.faq_router = None
         
         if self.local_tts and not getattr(self.local_tts, 'initialized', True):
             try:
@@ -573,6 +749,15 @@ class VoiceConversationServer:
                 logger.error(f"Error initializing TTS: {e}")
                 # Keep TTS but mark as not fully initialized
         
+        # Decode FAQ answers up front; entries are ordered by priority
+        if self.faq_router:
+            await self.audio_cache.preload(
+                entry['audio_file'] for entry in self.faq_router.faq_entries if entry.get('audio_file')
+            )
+        
+        # Close idle sessions and cancel stalled responses
+        self.reaper_task = asyncio.create_task(self.session_manager.run_reaper())
+        
         # Start WebSocket server
         server = await websockets.serve(
             self.client_handler,
@@ -585,17 +770,22 @@ class VoiceConversationServer:
         logger.info(f"Voice server running on ws://{self.host}:{self.port}")
         
         # Keep server running
-        await server.wait_closed()
+        try:
+            await server.wait_closed()
+        finally:
+            if self.faq_router:
+                # Write out journaled FAQ additions
+                await self.faq_router.close()
     
     async def apply_voice_settings_to_tts(self):
         """Apply current voice settings to TTS engine."""
         try:
-            if self.local_tts and self.local_tts.pyttsx3_engine:
-                # Apply speed setting
-                self.local_tts.pyttsx3_engine.setProperty('rate', self.voice_settings['speed'])
-                
-                # Apply volume setting 
-                self.local_tts.pyttsx3_engine.setProperty('volume', self.voice_settings['volume'])
+            if self.local_tts:
+                # Queued to the synthesis worker, which owns the engine
+                await self.local_tts.set_voice_settings(
+                    speed=self.voice_settings['speed'],
+                    volume=self.voice_settings['volume']
+                )
                 
                 logger.info(f"Applied TTS settings: speed={self.voice_settings['speed']}, volume={self.voice_settings['volume']}")
         except Exception as e:
@@ -610,24 +800,37 @@ class VoiceConversationServer:
             volume = hologram_data.get('volume', 0.9)
             
             # Log hologram data for integration with TouchDesigner/OSC
-            logger.info(f"Hologram particle data: intensity={intensity}, emotion={emotion}, volume={volume}")
+            logger.debug(f"Hologram particle data: intensity={intensity}, emotion={emotion}, volume={volume}")
             
             # TODO: Send to TouchDesigner via OSC bridge
             # TODO: Send to Audio2Face integration
             # TODO: Send to any other display systems
             
-            # For now, just broadcast to all clients for debugging
+            # For now, just broadcast to all clients for debugging; only the
+            # latest frame matters to a display that has fallen behind
             await self.broadcast_message({
                 'type': 'hologram_data',
                 'intensity': intensity,
                 'emotion': emotion,
                 'volume': volume,
                 'timestamp': hologram_data.get('timestamp')
-            })
-            
+            }, coalesce_key='hologram_data')
+        
         except Exception as e:
             logger.error(f"Error sending to hologram system: {e}")
     
+    def get_stats(self) -> Dict:
+        """Get server runtime statistics."""
+        return {
+            'connected_clients': len(self.session_manager),
+            'sessions': self.session_manager.get_stats(),
+            'stt_engine': self.stt_engine.get_config() if self.stt_engine else None,
+            'stt_latency': self.stt_latency.get_stats(),
+            'tts': self.local_tts.get_stats() if self.local_tts else None,
+            'answers': self.answer_router.get_stats(),
+            'audio_cache': self.audio_cache.get_stats()
+        }
+    
     def run(self):
         """Run the server."""
         try: